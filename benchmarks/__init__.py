@@ -0,0 +1,4 @@
+# -*- coding: UTF-8 -*-
+"""
+Benchmark harness: synthetic trees, fake WinMerge and the benchmark runner
+"""
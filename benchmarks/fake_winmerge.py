@@ -0,0 +1,164 @@
+# -*- coding: UTF-8 -*-
+"""
+Stand-in for WinMergeU.exe that writes WinMerge-style HTML reports
+
+Accepts the command line built by Config.get_winmerge_command
+(BASE LATEST [/options ...] OUTPUT.html) and writes the folder compare
+report plus one side-by-side report per differing text file into
+OUTPUT.files/, in the layout HTMLToExcelConverter parses. Lets the full
+WinMerge backend pipeline run (and be benchmarked) without WinMerge.
+
+Usage:
+    python fake_winmerge.py BASE LATEST [/options ...] OUTPUT.html
+"""
+import difflib
+import html
+import re
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Options followed by a value
+OPTIONS_WITH_VALUE = {'/cfg', '/dl', '/dr', '/dm', '/f'}
+
+# Switches are a single word ('/r', '/noninteractive'); absolute POSIX paths have more slashes
+OPTION_PATTERN = re.compile(r'[/-][A-Za-z]+')
+
+DIFF_STYLE = 'background-color: #efcb05'
+MISSING_STYLE = 'background-color: #c0c0c0'
+
+
+def parse_args(argv: List[str]):
+    """Get (base, latest, output) from a WinMerge command line"""
+    positional = []
+    skip = False
+    for arg in argv:
+        if skip:
+            skip = False
+        elif arg.lower() in OPTIONS_WITH_VALUE:
+            skip = True
+        elif not OPTION_PATTERN.fullmatch(arg):
+            positional.append(arg)
+
+    if len(positional) != 3:
+        raise SystemExit(f"usage: fake_winmerge.py BASE LATEST [/options ...] OUTPUT.html (got {positional})")
+    return Path(positional[0]), Path(positional[1]), Path(positional[2])
+
+
+def list_files(root: Path) -> Dict[str, Path]:
+    """Map relative paths (posix) to files under root"""
+    if root.is_file():
+        return {root.name: root}
+    return {path.relative_to(root).as_posix(): path for path in root.rglob('*') if path.is_file()}
+
+
+def read_lines(data: bytes) -> List[str]:
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('cp932', errors='replace')
+    return text.splitlines()  # Line endings are ignored (IgnoreEol=1)
+
+
+def file_date(path: Optional[Path]) -> str:
+    if path is None:
+        return ''
+    return datetime.fromtimestamp(path.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+
+
+def text_cell(text: str, style: Optional[str] = None) -> str:
+    style_attr = f' style="{style}"' if style else ''
+    return f'<td class="code"{style_attr}>{html.escape(text)}</td>'
+
+
+def line_no_cell(number: Optional[int]) -> str:
+    return f'<td class="ln">{number if number is not None else "."}</td>'
+
+
+def write_file_report(path: Path, left: Path, right: Path, a: List[str], b: List[str]) -> None:
+    """Write a side-by-side file compare report"""
+    out = ['<html><head><meta charset="utf-8"></head><body><table cellspacing="0">',
+           f'<tr><th></th><th>{html.escape(str(left))}</th><th></th><th>{html.escape(str(right))}</th></tr>']
+
+    matcher = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                out.append(f'<tr>{line_no_cell(i + 1)}{text_cell(a[i])}{line_no_cell(j + 1)}{text_cell(b[j])}</tr>')
+            continue
+
+        for offset in range(max(i2 - i1, j2 - j1)):
+            i, j = i1 + offset, j1 + offset
+            left_cells = (line_no_cell(i + 1) + text_cell(a[i], DIFF_STYLE) if i < i2
+                          else line_no_cell(None) + text_cell('', MISSING_STYLE))
+            right_cells = (line_no_cell(j + 1) + text_cell(b[j], DIFF_STYLE) if j < j2
+                           else line_no_cell(None) + text_cell('', MISSING_STYLE))
+            out.append(f'<tr>{left_cells}{right_cells}</tr>')
+
+    out.append('</table></body></html>')
+    path.write_text('\n'.join(out), encoding='utf-8')
+
+
+def compare(base: Path, latest: Path, output: Path) -> None:
+    """Compare two trees and write the reports"""
+    files_dir = output.with_name(output.stem + '.files')
+    files_dir.mkdir(parents=True, exist_ok=True)
+
+    left_files, right_files = list_files(base), list_files(latest)
+    rows = []
+    folders = set()
+
+    for rel in sorted(set(left_files) | set(right_files)):
+        folder, _, name = rel.rpartition('/')
+        if folder:
+            folders.add(folder)
+        left, right = left_files.get(rel), right_files.get(rel)
+        report = None
+
+        if left is None or right is None:
+            result = 'Right only' if left is None else 'Left only'
+        else:
+            left_data, right_data = left.read_bytes(), right.read_bytes()
+            if b'\0' in left_data[:8192] or b'\0' in right_data[:8192]:
+                result = 'Binary files are identical' if left_data == right_data else 'Binary files are different'
+            else:
+                a, b = read_lines(left_data), read_lines(right_data)
+                if a == b:
+                    result = 'Text files are identical'
+                else:
+                    result = 'Text files are different'
+                    report = f"{rel.replace('/', '_')}.html"
+                    write_file_report(files_dir / report, left, right, a, b)
+
+        link = f'{files_dir.name}/{report}' if report else f'{files_dir.name}/{rel.replace("/", "_")}.html'
+        rows.append(
+            f'<tr><td><a href="{html.escape(link)}">{html.escape(name)}</a></td>'
+            f'<td>{html.escape(folder.replace("/", chr(92)))}</td><td>{result}</td>'
+            f'<td>{file_date(left)}</td><td>{file_date(right)}</td>'
+            f'<td>{html.escape(name.rpartition(".")[2] if "." in name else "")}</td></tr>'
+        )
+
+    # Folder rows have no link; the converter skips them
+    for folder in sorted(folders):
+        parent, _, name = folder.rpartition('/')
+        rows.append(f'<tr><td>{html.escape(name)}</td><td>{html.escape(parent.replace("/", chr(92)))}</td>'
+                    f'<td>Folder</td><td></td><td></td><td></td></tr>')
+
+    header = ''.join(f'<th>{title}</th>' for title in
+                     ('Filename', 'Folder', 'Comparison result', 'Left Date', 'Right Date', 'Extension'))
+    output.write_text(
+        '<html><head><meta charset="utf-8"></head><body><table border="1">\n'
+        f'<tr>{header}</tr>\n' + '\n'.join(rows) + '\n</table></body></html>',
+        encoding='utf-8'
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    base, latest, output = parse_args(sys.argv[1:] if argv is None else argv)
+    compare(base, latest, output)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,239 @@
+# -*- coding: UTF-8 -*-
+"""
+Benchmark WinMergeXlsx.generate on synthetic trees
+
+Each run happens in a fresh child process, so peak RSS is per run. Stage
+timings come from the tracer; results are written as JSON tagged with the
+git commit and can be compared against an earlier result file.
+
+Usage:
+    python -m benchmarks.run --files 500 --backend all --json bench.json
+    python -m benchmarks.run --files 500 --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import asdict, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.treegen import TreeGenerator, TreeSpec
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FAKE_WINMERGE = Path(__file__).resolve().parent / 'fake_winmerge.py'
+BACKENDS = ['winmerge', 'native']
+
+
+def peak_rss_mb(children: bool = False) -> Optional[float]:
+    """Peak resident set size of this process (or of its waited-for children) in MB"""
+    try:
+        import resource
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF)
+        # ru_maxrss is in KB on Linux and in bytes on macOS
+        scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+        # No child processes ran (serial run without WinMerge)
+        return usage.ru_maxrss / scale if usage.ru_maxrss else None
+    except ImportError:
+        pass
+
+    if children:
+        return None
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+
+def fake_winmerge_launcher(workdir: Path) -> Path:
+    """Write an executable that runs fake_winmerge.py with this Python"""
+    workdir.mkdir(parents=True, exist_ok=True)
+    if os.name == 'nt':
+        launcher = workdir / 'fake_winmerge.cmd'
+        launcher.write_text(f'@"{sys.executable}" "{FAKE_WINMERGE}" %*\r\n', encoding='utf-8')
+    else:
+        launcher = workdir / 'fake_winmerge'
+        launcher.write_text(f'#!/bin/sh\nexec "{sys.executable}" "{FAKE_WINMERGE}" "$@"\n', encoding='utf-8')
+        launcher.chmod(0o755)
+    return launcher
+
+
+def git_commit() -> str:
+    """Current commit (with '-dirty' for uncommitted changes), or '' outside a git checkout"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def run_child(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one generate() in this process and return its measurements (child side)"""
+    import logging
+    from src.core.common import logger, tracer
+    from src.core.config import config
+    from src.core.winmergexlsx import WinMergeXlsx
+    from src.core.shardwriter import ShardWriter
+
+    logger.logger.setLevel(logging.WARNING)
+    config.winmerge.backend = job['backend']
+    config.winmerge.executable_path = job['winmerge']
+    config.parallel.workers = job['workers']
+    config.excel.write_only = job['write_only']
+
+    output = Path(job['output'])
+    start = time.perf_counter()
+    WinMergeXlsx(job['base'], job['latest'], str(output)).generate()
+    wall_s = time.perf_counter() - start
+
+    outputs = [output] + ShardWriter.existing_shards(output)
+    return {
+        'wall_s': wall_s,
+        'spans': tracer.totals(),
+        'counters': tracer.counters(),
+        'output_bytes': sum(path.stat().st_size for path in outputs if path.exists()),
+        'peak_rss_mb': peak_rss_mb(),
+        'workers_peak_rss_mb': peak_rss_mb(children=True),
+    }
+
+
+def run_scenario(name: str, job: Dict[str, Any], repeat: int) -> Dict[str, Any]:
+    """Run a scenario repeat times in child processes and aggregate the runs"""
+    runs = []
+    for index in range(repeat):
+        process = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.run', '--child', json.dumps(job)],
+            cwd=REPO_ROOT, capture_output=True, text=True
+        )
+        if process.returncode != 0:
+            raise RuntimeError(f"{name} run {index + 1} failed:\n{process.stderr[-4000:]}")
+        runs.append(json.loads(process.stdout.strip().splitlines()[-1]))
+        print(f"  {name} run {index + 1}/{repeat}: {runs[-1]['wall_s']:.2f} s", flush=True)
+
+    span_names = sorted({span for run in runs for span in run['spans']})
+    rss = [run['peak_rss_mb'] for run in runs if run['peak_rss_mb'] is not None]
+    workers_rss = [run['workers_peak_rss_mb'] for run in runs if run['workers_peak_rss_mb'] is not None]
+    return {
+        'wall_s': statistics.median(run['wall_s'] for run in runs),
+        'wall_s_runs': [run['wall_s'] for run in runs],
+        'stages_s': {
+            span: statistics.median(run['spans'].get(span, {}).get('total_s', 0.0) for run in runs)
+            for span in span_names
+        },
+        'counters': runs[-1]['counters'],
+        'output_bytes': runs[-1]['output_bytes'],
+        'peak_rss_mb': max(rss) if rss else None,
+        'workers_peak_rss_mb': max(workers_rss) if workers_rss else None,
+    }
+
+
+def print_report(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """Print wall time, stage times, memory and output size per scenario (with deltas to a baseline)"""
+    base_results = (baseline or {}).get('results', {})
+
+    def delta(value, old) -> str:
+        if value is None or not old:
+            return ''
+        return f" ({(value - old) / old * 100:+.1f}%)"
+
+    def mb(value) -> str:
+        return 'n/a' if value is None else f"{value:.1f} MB"
+
+    for name, result in results.items():
+        old = base_results.get(name, {})
+        print(f"\n{name}")
+        print(f"  wall          {result['wall_s']:8.2f} s{delta(result['wall_s'], old.get('wall_s'))}")
+        print(f"  peak RSS      {mb(result['peak_rss_mb'])}{delta(result['peak_rss_mb'], old.get('peak_rss_mb'))}"
+              f"  (workers {mb(result['workers_peak_rss_mb'])})")
+        print(f"  output        {result['output_bytes']:,} bytes"
+              f"{delta(result['output_bytes'], old.get('output_bytes'))}")
+        old_stages = old.get('stages_s', {})
+        for stage, seconds in sorted(result['stages_s'].items(), key=lambda item: -item[1]):
+            print(f"  {stage:<48} {seconds:8.3f} s{delta(seconds, old_stages.get(stage))}")
+        print("  " + ", ".join(f"{key}: {value:,}" for key, value in sorted(result['counters'].items())))
+
+    if baseline:
+        print(f"\nDeltas against {baseline.get('commit') or 'baseline'} ({baseline.get('date', '')})")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks.run', description=__doc__.strip().splitlines()[0])
+    defaults = TreeSpec()
+    for spec_field in fields(TreeSpec):
+        parser.add_argument(f"--{spec_field.name.replace('_', '-')}", type=type(getattr(defaults, spec_field.name)),
+                            default=getattr(defaults, spec_field.name),
+                            help=f"Tree spec {spec_field.name} (default: %(default)s)")
+    parser.add_argument('--backend', choices=BACKENDS + ['all'], default='all', help='Backend(s) to run')
+    parser.add_argument('--workers', type=int, default=0, help='Worker processes, 0 for one per CPU')
+    parser.add_argument('--mode', choices=['normal', 'write-only', 'all'], default='all', help='Workbook mode(s)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per scenario (median is reported)')
+    parser.add_argument('--workdir', type=Path, default=REPO_ROOT / 'bench_work',
+                        help='Folder for generated trees and outputs (default: %(default)s)')
+    parser.add_argument('--json', type=Path, help='Write results to this JSON file')
+    parser.add_argument('--baseline', type=Path, help='Earlier JSON result to compare against')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    if args.child:
+        print(json.dumps(run_child(json.loads(args.child))))
+        return 0
+
+    spec = TreeSpec(**{spec_field.name: getattr(args, spec_field.name) for spec_field in fields(TreeSpec)})
+    print(f"Generating trees ({spec.files} files, digest {spec.digest})...", flush=True)
+    base, latest = TreeGenerator.ensure(spec, args.workdir)
+    launcher = fake_winmerge_launcher(args.workdir)
+
+    backends = BACKENDS if args.backend == 'all' else [args.backend]
+    modes = ['normal', 'write-only'] if args.mode == 'all' else [args.mode]
+
+    results = {}
+    for backend in backends:
+        for mode in modes:
+            name = f"{backend}/{mode}"
+            job = {
+                'backend': backend,
+                'winmerge': str(launcher),
+                'workers': args.workers,
+                'write_only': mode == 'write-only',
+                'base': str(base),
+                'latest': str(latest),
+                'output': str(args.workdir / f"out_{backend}_{mode}.xlsx"),
+            }
+            results[name] = run_scenario(name, job, args.repeat)
+
+    report = {
+        'commit': git_commit(),
+        'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'workers': args.workers,
+        'spec': asdict(spec),
+        'results': results,
+    }
+
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8')) if args.baseline else None
+    if baseline and baseline.get('spec') != report['spec']:
+        print("Warning: baseline was run with a different tree spec", file=sys.stderr)
+    print_report(results, baseline)
+
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2), encoding='utf-8')
+        print(f"\nResults written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
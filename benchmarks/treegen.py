@@ -0,0 +1,142 @@
+# -*- coding: UTF-8 -*-
+"""
+Synthetic base/latest tree generator for benchmarks
+
+Trees are deterministic for a given TreeSpec (seeded random), so runs on
+different commits compare the same inputs.
+"""
+import hashlib
+import json
+import random
+import shutil
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import List, Tuple
+
+EXTENSIONS = ['.c', '.h', '.cpp', '.rc', '.txt', '.l', '.t']
+FOLDER_NAMES = ['modules', 'ctrl', 'tool', 'gui', 'etc', 'src', 'include', 'lib', 'SEQ', 'Res']
+
+# Marker file holding the spec a tree was generated from
+SPEC_FILE = 'treespec.json'
+
+
+@dataclass(frozen=True)
+class TreeSpec:
+    """Parameters of a synthetic tree pair"""
+    files: int = 200
+    lines: int = 400  # Mean lines per file (sizes vary from 1/4 to 7/4 of this)
+    line_length: int = 60  # Mean characters per line
+    changed: float = 0.25  # Fraction of files that differ between base and latest
+    edit_rate: float = 0.02  # Fraction of lines edited in a changed file
+    versioned: float = 0.1  # Fraction of base files with a version suffix (io.h.202334)
+    added: float = 0.02  # Fraction of files only in latest (and as many only in base)
+    depth: int = 3  # Folder levels
+    fanout: int = 4  # Subfolders per folder
+    seed: int = 1
+
+    @property
+    def digest(self) -> str:
+        """Short digest naming the generated trees"""
+        text = json.dumps(asdict(self), sort_keys=True)
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=6).hexdigest()
+
+
+class TreeGenerator:
+    """Writes base/ and latest/ trees for a TreeSpec"""
+
+    def __init__(self, spec: TreeSpec):
+        self.spec = spec
+        self.random = random.Random(spec.seed)
+
+    @staticmethod
+    def ensure(spec: TreeSpec, workdir: Path) -> Tuple[Path, Path]:
+        """
+        Generate the trees under workdir unless a matching pair already exists
+
+        Returns:
+            (base, latest) folders
+        """
+        root = workdir / f"tree_{spec.digest}"
+        base, latest = root / 'base', root / 'latest'
+        spec_path = root / SPEC_FILE
+
+        if spec_path.exists() and json.loads(spec_path.read_text(encoding='utf-8')) == asdict(spec):
+            return base, latest
+
+        shutil.rmtree(root, ignore_errors=True)
+        TreeGenerator(spec).write(base, latest)
+        spec_path.write_text(json.dumps(asdict(spec), indent=2), encoding='utf-8')
+        return base, latest
+
+    def write(self, base: Path, latest: Path) -> None:
+        """Write both trees"""
+        spec = self.spec
+        folders = self._folders()
+
+        for index in range(spec.files):
+            folder = folders[index % len(folders)]
+            name = f"{self._word()}_{index}{self.random.choice(EXTENSIONS)}"
+            lines = self._lines()
+            roll = self.random.random()
+
+            if roll < spec.added:
+                self._write_file(latest / folder / name, lines)
+                continue
+            if roll < 2 * spec.added:
+                self._write_file(base / folder / name, lines)
+                continue
+
+            base_name = name
+            if self.random.random() < spec.versioned:
+                base_name = f"{name}.{self.random.randint(202001, 202452)}"
+
+            self._write_file(base / folder / base_name, lines)
+            if self.random.random() < spec.changed:
+                lines = self._edit(lines)
+            self._write_file(latest / folder / name, lines)
+
+    def _folders(self) -> List[str]:
+        """Relative folder paths (posix) of a tree depth levels deep"""
+        folders = ['']
+        level = ['']
+        for _ in range(self.spec.depth):
+            level = [f"{parent}{self.random.choice(FOLDER_NAMES)}{index}/"
+                     for parent in level for index in range(self.spec.fanout)]
+            folders.extend(level)
+        return folders
+
+    def _word(self) -> str:
+        return ''.join(self.random.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(self.random.randint(3, 8)))
+
+    def _line(self) -> str:
+        length = self.random.randint(0, 2 * self.spec.line_length)
+        words = []
+        while sum(len(word) + 1 for word in words) < length:
+            words.append(self._word())
+        indent = '    ' * self.random.randint(0, 3)
+        return indent + ' '.join(words)
+
+    def _lines(self) -> List[str]:
+        count = self.random.randint(max(1, self.spec.lines // 4), max(1, self.spec.lines * 7 // 4))
+        return [self._line() for _ in range(count)]
+
+    def _edit(self, lines: List[str]) -> List[str]:
+        """Apply edit hunks (replace, insert or delete 1-5 lines) to a copy of lines"""
+        lines = list(lines)
+        hunks = max(1, int(len(lines) * self.spec.edit_rate / 3))
+        for _ in range(hunks):
+            position = self.random.randint(0, len(lines))
+            size = self.random.randint(1, 5)
+            kind = self.random.choice(('replace', 'insert', 'delete'))
+            if kind == 'replace':
+                lines[position:position + size] = [self._line() for _ in range(size)]
+            elif kind == 'insert':
+                lines[position:position] = [self._line() for _ in range(size)]
+            else:
+                del lines[position:position + size]
+        return lines
+
+    @staticmethod
+    def _write_file(path: Path, lines: List[str]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
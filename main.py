@@ -5,6 +5,7 @@ WinMerge Diff to Excel Exporter - Main Entry Point
 import sys
 import os
 import ctypes
+import multiprocessing
 from typing import NoReturn
 
 from PyQt6.QtWidgets import QApplication
@@ -91,4 +92,6 @@ def main() -> NoReturn:
 
 
 if __name__ == "__main__":
+    # Required for process pools in frozen (PyInstaller) Windows builds
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -2,3 +2,5 @@
 """
 WinMerge Diff Exporter - Source package
 """
+
+__version__ = "2.0"
@@ -0,0 +1,14 @@
+# -*- coding: UTF-8 -*-
+"""
+Headless entry point: python -m src
+"""
+import multiprocessing
+import sys
+
+from src.cli import main
+
+
+if __name__ == "__main__":
+    # Required for process pools in frozen (PyInstaller) Windows builds
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,208 @@
+# -*- coding: UTF-8 -*-
+"""
+Headless command line interface (no PyQt6 import)
+
+Usage:
+    python -m src BASE LATEST [-o OUTPUT]
+    python -m src --manifest pairs.json
+    python -m src cache {stats,prune,clear}
+"""
+import argparse
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+from src.core.classify import POLICIES, BINARY, OVERSIZE
+from src.core.common import logger
+from src.core.config import config
+from src.core.diffbackend import BACKENDS
+from src.core.exceptions import WinMergeDiffExporterError, ValidationError
+from src.core.resultcache import ResultCache
+from src.core.winmergexlsx import WinMergeXlsx
+
+# Exit codes
+EXIT_OK = 0
+EXIT_FAILED = 1  # One or more comparisons failed
+EXIT_USAGE = 2  # Invalid arguments or manifest
+
+
+class Comparison(NamedTuple):
+    """Single comparison job"""
+    base: Path
+    latest: Path
+    output: Path
+
+
+def load_manifest(path: Path) -> List[Comparison]:
+    """
+    Load a batch manifest
+
+    The manifest is a JSON list of objects with "base", "latest" and
+    "output" keys. Relative paths are resolved against the manifest folder.
+
+    Raises:
+        ValidationError: If the manifest cannot be read or is malformed
+    """
+    try:
+        entries = json.loads(path.read_text(encoding='utf-8'))
+    except (OSError, ValueError) as e:
+        raise ValidationError(f"Cannot read manifest: {path}", str(e))
+
+    if not isinstance(entries, list):
+        raise ValidationError(f"Manifest must be a JSON list: {path}")
+
+    comparisons = []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict) or not all(key in entry for key in ('base', 'latest', 'output')):
+            raise ValidationError(f"Manifest entry {index} needs 'base', 'latest' and 'output': {entry}")
+        comparisons.append(Comparison(*(path.parent / entry[key] for key in ('base', 'latest', 'output'))))
+
+    return comparisons
+
+
+def run_comparison(comparison: Comparison) -> bool:
+    """Run one comparison, returning False (after logging) if it failed"""
+    try:
+        WinMergeXlsx(str(comparison.base), str(comparison.latest), str(comparison.output)).generate()
+        return True
+    except WinMergeDiffExporterError as e:
+        logger.error(f"Comparison failed: {comparison.base} -> {comparison.latest}: {e}")
+    except Exception as e:
+        logger.error(f"Unexpected error: {comparison.base} -> {comparison.latest}: {e}", exc_info=True)
+    return False
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser"""
+    parser = argparse.ArgumentParser(
+        prog='python -m src',
+        description='Export folder or file diffs to Excel without the GUI'
+    )
+    parser.add_argument('base', nargs='?', help='Base file or folder')
+    parser.add_argument('latest', nargs='?', help='Latest file or folder')
+    parser.add_argument('-o', '--output', default=config.ui.default_output_file,
+                        help='Output Excel file (default: %(default)s)')
+    parser.add_argument('-m', '--manifest', type=Path,
+                        help='JSON list of {"base", "latest", "output"} comparisons to run')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default=config.winmerge.backend,
+                        help='Diff backend (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=config.parallel.workers,
+                        help='Worker processes, 0 for one per CPU (default: %(default)s)')
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                        help='Only compare files matching the pattern (repeatable)')
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                        help='Skip files and folders matching the pattern, e.g. obj (repeatable)')
+    parser.add_argument('--write-only', action='store_true',
+                        help='Stream sheets into a write-only workbook')
+    parser.add_argument('--shard-sheets', type=int, default=config.shard.max_sheets, metavar='N',
+                        help='Split per-file sheets into workbooks of at most N sheets (default: %(default)s = off)')
+    parser.add_argument('--shard-rows', type=int, default=config.shard.max_rows, metavar='N',
+                        help='Split per-file sheets into workbooks of at most N diff rows (default: %(default)s = off)')
+    parser.add_argument('--binary-policy', choices=POLICIES[BINARY], default=config.classify.binary_policy,
+                        help='Handling of changed binary files (default: %(default)s)')
+    parser.add_argument('--oversize-policy', choices=POLICIES[OVERSIZE], default=config.classify.oversize_policy,
+                        help='Handling of changed text files above the size limit (default: %(default)s)')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='Parse WinMerge reports while WinMerge is still writing them')
+    parser.add_argument('--intraline', action='store_true',
+                        help='Highlight the changed words inside modified lines (rich text)')
+    parser.add_argument('--cache', action='store_true',
+                        help='Reuse and store per-file results in the result cache')
+    parser.add_argument('--cache-dir', help='Result cache folder (default: per-user cache folder)')
+    parser.add_argument('--trace', action='store_true',
+                        help='Write OUTPUT.trace.json (Chrome trace_event format) and log a time summary per stage')
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='Stop a batch at the first failed comparison')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Only log warnings and errors')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Also log per-file debug messages')
+    return parser
+
+
+def build_cache_parser() -> argparse.ArgumentParser:
+    """Build the parser of the cache maintenance command"""
+    parser = argparse.ArgumentParser(prog='python -m src cache', description='Inspect or prune the result cache')
+    parser.add_argument('action', choices=['stats', 'prune', 'clear'],
+                        help='stats: show size, prune: evict down to the size limit, clear: remove all entries')
+    parser.add_argument('--cache-dir', help='Result cache folder (default: per-user cache folder)')
+    parser.add_argument('--max-bytes', type=int, help='Size limit for prune (default: configured limit)')
+    return parser
+
+
+def cache_main(argv: List[str]) -> int:
+    """Run the cache maintenance command"""
+    args = build_cache_parser().parse_args(argv)
+    cache = ResultCache(args.cache_dir)
+
+    if args.action == 'prune':
+        print(f"Removed {cache.prune(args.max_bytes)} entries")
+    elif args.action == 'clear':
+        print(f"Removed {cache.prune(0)} entries")
+
+    stats = cache.stats()
+    print(f"{cache.directory}: {stats.entries} entries, {stats.total_bytes / (1024 * 1024):.1f} MB "
+          f"(limit {cache.max_bytes / (1024 * 1024):.1f} MB)")
+    return EXIT_OK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the CLI and return the process exit code"""
+    if argv is None:
+        argv = sys.argv[1:]
+    if argv and argv[0] == 'cache':
+        return cache_main(argv[1:])
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.manifest is None and (args.base is None or args.latest is None):
+        parser.error('BASE and LATEST are required unless --manifest is given')
+    if args.manifest is not None and args.base is not None:
+        parser.error('BASE/LATEST cannot be combined with --manifest')
+
+    if args.quiet:
+        logger.logger.setLevel(logging.WARNING)
+    elif args.verbose:
+        logger.logger.setLevel(logging.DEBUG)
+
+    config.winmerge.backend = args.backend
+    config.parallel.workers = args.workers
+    config.excel.write_only = args.write_only or config.excel.write_only
+    config.shard.max_sheets = args.shard_sheets
+    config.shard.max_rows = args.shard_rows
+    config.intraline.enabled = args.intraline or config.intraline.enabled
+    config.winmerge.pipeline = args.pipeline or config.winmerge.pipeline
+    config.classify.binary_policy = args.binary_policy
+    config.classify.oversize_policy = args.oversize_policy
+    config.cache.enabled = args.cache or config.cache.enabled
+    config.trace.enabled = args.trace or config.trace.enabled
+    if args.include:
+        config.walk.include = args.include
+    if args.exclude:
+        config.walk.exclude = args.exclude
+    if args.cache_dir:
+        config.cache.directory = args.cache_dir
+
+    if args.manifest is not None:
+        try:
+            comparisons = load_manifest(args.manifest)
+        except ValidationError as e:
+            logger.error(str(e))
+            return EXIT_USAGE
+    else:
+        comparisons = [Comparison(Path(args.base), Path(args.latest), Path(args.output))]
+
+    failed = 0
+    for count, comparison in enumerate(comparisons, start=1):
+        logger.info(f"Comparison {count}/{len(comparisons)}: {comparison.base} -> {comparison.latest}")
+        if not run_comparison(comparison):
+            failed += 1
+            if args.fail_fast:
+                break
+
+    if failed:
+        logger.error(f"{failed} of {len(comparisons)} comparisons failed")
+        return EXIT_FAILED
+
+    return EXIT_OK
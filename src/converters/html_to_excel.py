@@ -2,144 +2,297 @@
 """
 HTML to Excel converter without COM dependencies
 """
+import codecs
+import itertools
+from collections import namedtuple
 from pathlib import Path
-from typing import Optional, Callable
-from bs4 import BeautifulSoup
+from typing import Iterator, List, Optional, Callable, Tuple
+from lxml import etree
 from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-from openpyxl.utils import get_column_letter
 
+from src.core.cancellation import CancellationToken
 from src.core.common import logger
+from src.core.config import config
+from src.core.exceptions import OperationCancelledError
+from src.core.diffmodel import FileDiff, SummaryEntry, SummaryTable
+from src.core.encoding import TextDecoder, FALLBACK_ENCODING
+from src.core.sheetwriter import DiffSheetWriter
 
 
-class HTMLToExcelConverter:
-    """Convert HTML tables to Excel without using Excel COM"""
+# Table cell as reported by the streaming parser
+HtmlCell = namedtuple('HtmlCell', ['tag', 'text', 'style', 'bgcolor', 'colspan', 'has_link'])
+
+# Bytes fed to the parser per step
+READ_CHUNK_SIZE = 256 * 1024
+
+
+class _TableRowTarget:
+    """
+    lxml parser target collecting the rows of the first <table> without building a tree
     
-    def __init__(self, log_callback: Optional[Callable[[str], None]] = None):
-        self.log_callback = log_callback
+    Cell text mirrors BeautifulSoup's get_text(strip=True): every text node
+    is stripped on its own and the non-empty pieces are concatenated.
+    """
+    
+    def __init__(self):
+        self.found_table = False
+        self.done = False
+        self._rows: List[List[HtmlCell]] = []
+        self._table_depth = 0
+        self._row: Optional[List[HtmlCell]] = None
+        self._cell: Optional[dict] = None
+        self._text: List[str] = []
     
+    def drain(self) -> List[List[HtmlCell]]:
+        """Return and forget the rows completed so far"""
+        rows, self._rows = self._rows, []
+        return rows
+    
+    def start(self, tag, attrib) -> None:
+        self._flush_text()
+        if self.done:
+            return
+        
+        if tag == 'table':
+            self._table_depth += 1
+            self.found_table = True
+        elif self._table_depth != 1:
+            return
+        elif tag == 'tr':
+            self._row = []
+        elif tag in ('td', 'th') and self._row is not None:
+            self._cell = {
+                'tag': tag,
+                'parts': [],
+                'style': attrib.get('style', ''),
+                'bgcolor': attrib.get('bgcolor', ''),
+                'colspan': attrib.get('colspan', '1'),
+                'has_link': False,
+            }
+        elif tag == 'a' and self._cell is not None:
+            self._cell['has_link'] = True
+    
+    def end(self, tag) -> None:
+        self._flush_text()
+        if self.done:
+            return
+        
+        if tag == 'table':
+            self._table_depth -= 1
+            if self._table_depth == 0:
+                self.done = True
+        elif self._table_depth != 1:
+            return
+        elif tag in ('td', 'th') and self._cell is not None:
+            cell = self._cell
+            self._row.append(HtmlCell(
+                cell['tag'], ''.join(cell['parts']), cell['style'], cell['bgcolor'],
+                int(cell['colspan']) if cell['colspan'].isdigit() else 1, cell['has_link']
+            ))
+            self._cell = None
+        elif tag == 'tr' and self._row is not None:
+            self._rows.append(self._row)
+            self._row = None
+    
+    def data(self, data) -> None:
+        if self._cell is not None:
+            self._text.append(data)
+    
+    def close(self) -> None:
+        self._flush_text()
+    
+    def _flush_text(self) -> None:
+        """Close the current text node (called at every tag boundary)"""
+        if self._text:
+            text = ''.join(self._text).strip()
+            if text and self._cell is not None:
+                self._cell['parts'].append(text)
+            self._text = []
+
+
+class HTMLToExcelConverter:
+    """Convert WinMerge HTML reports to the row model and Excel without using Excel COM"""
+
+    def __init__(self, log_callback: Optional[Callable[[str], None]] = None,
+                 cancel_token: Optional[CancellationToken] = None):
+        self.log_callback = log_callback
+        self.cancel_token = cancel_token or CancellationToken()
+        self.writer = DiffSheetWriter()
+
     def log(self, message: str) -> None:
         """Log message"""
         if self.log_callback:
             self.log_callback(message)
         logger.info(message)
-    
+
     def convert_html_file(self, html_path: Path, wb: Workbook, sheet_name: str) -> None:
         """
         Convert single HTML file to Excel worksheet
-        
+
         Args:
             html_path: Path to HTML file
             wb: Workbook to add sheet to
             sheet_name: Name for the new sheet
         """
+        file_diff = self.parse_diff_html(html_path, sheet_name)
+        if file_diff is not None:
+            self.writer.write_file_diff(wb, file_diff, sheet_name)
+
+    def parse_diff_html(self, html_path: Path, name: str) -> Optional[FileDiff]:
+        """
+        Parse a WinMerge file compare report into a FileDiff
+
+        Args:
+            html_path: Path to HTML file
+            name: Display filename of the compared file
+
+        Returns:
+            Parsed FileDiff, or None if the report has no table
+        """
         try:
-            with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
-                html_content = f.read()
-            
-            soup = BeautifulSoup(html_content, 'html.parser')
-            tables = soup.find_all('table')
-            
-            if not tables:
+            target = _TableRowTarget()
+            file_diff = self._convert_rows_to_file_diff(self._iter_table_rows(html_path, target), name)
+            if not target.found_table:
                 logger.warning(f"No tables found in {html_path}")
-                return
-            
-            # Create new worksheet
-            ws = wb.create_sheet(title=sheet_name[:31])  # Excel limit: 31 chars
-            
-            # Process the main table (usually the first one)
-            table = tables[0]
-            self._convert_table_to_sheet(table, ws)
-            
-            self.log(f"Converted: {sheet_name}")
-            
+                return None
+
+            logger.debug("Converted: %s", name)
+            return file_diff
+
+        except OperationCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Failed to convert {html_path}: {e}", exc_info=True)
-    
-    def _convert_table_to_sheet(self, table, ws) -> None:
-        """Convert HTML table to Excel worksheet"""
-        row_idx = 1
-        
-        # Process table rows
-        for tr in table.find_all('tr'):
-            col_idx = 1
-            
-            # Process cells (th or td)
-            for cell in tr.find_all(['th', 'td']):
-                # Get cell text
-                cell_text = cell.get_text(strip=True)
-                
-                # Remove "." from line number columns (columns 1 and 2)
-                if col_idx in [1, 2] and cell_text == '.':
-                    cell_text = ''
-                
-                # Write to Excel
-                excel_cell = ws.cell(row=row_idx, column=col_idx, value=cell_text)
-                
-                # Apply basic styling based on HTML attributes
-                self._apply_cell_styling(excel_cell, cell)
-                
-                # Handle colspan and rowspan
-                colspan = int(cell.get('colspan', 1))
-                rowspan = int(cell.get('rowspan', 1))
-                
-                if colspan > 1 or rowspan > 1:
-                    ws.merge_cells(
-                        start_row=row_idx,
-                        start_column=col_idx,
-                        end_row=row_idx + rowspan - 1,
-                        end_column=col_idx + colspan - 1
-                    )
-                
-                col_idx += colspan
-            
-            row_idx += 1
-        
-        # Auto-adjust column widths
-        self._auto_adjust_columns(ws)
-    
-    def _apply_cell_styling(self, excel_cell, html_cell) -> None:
-        """Apply styling from HTML cell to Excel cell"""
-        # Check for background color
-        style = html_cell.get('style', '')
-        bgcolor = html_cell.get('bgcolor', '')
-        
-        # Parse background color
-        if 'background-color' in style or bgcolor:
-            color = self._parse_color(style, bgcolor)
-            if color:
-                excel_cell.fill = PatternFill(
-                    start_color=color,
-                    end_color=color,
-                    fill_type='solid'
-                )
-        
-        # Check if it's a header cell
-        if html_cell.name == 'th':
-            excel_cell.font = Font(bold=True, size=11)
-            excel_cell.alignment = Alignment(horizontal='center', vertical='center')
-            if not excel_cell.fill.start_color.rgb:
-                excel_cell.fill = PatternFill(
-                    start_color='DDDDDD',
-                    end_color='DDDDDD',
-                    fill_type='solid'
-                )
-        
-        # Add borders
-        thin_border = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'),
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        excel_cell.border = thin_border
-    
+            return None
+
+    def _iter_table_rows(self, html_path: Path, target: _TableRowTarget) -> Iterator[List[HtmlCell]]:
+        """
+        Stream the rows of the main table (usually the first one) of an HTML file
+
+        The file is fed to lxml in chunks and no document tree is built, so
+        memory stays bounded by the chunk size plus the rows not yet consumed.
+        Reading stops as soon as the first table is closed, or with
+        OperationCancelledError between chunks once cancellation is requested.
+        The encoding is detected from the first chunk (see _report_encoding).
+        """
+        with open(html_path, 'rb') as f:
+            first = f.read(READ_CHUNK_SIZE)
+            sniffed = TextDecoder.sniff(first, truncated=len(first) == READ_CHUNK_SIZE)
+            chunks = itertools.chain([first], iter(lambda: f.read(READ_CHUNK_SIZE), b''))
+            if sniffed == 'utf-8':
+                chunks = self._utf8_or_fallback(chunks, html_path)
+            parser = etree.HTMLParser(target=target, encoding=self._report_encoding(sniffed))
+            for chunk in chunks:
+                self.cancel_token.check()
+                parser.feed(chunk)
+                yield from target.drain()
+                if target.done:
+                    break
+
+        parser.close()
+        yield from target.drain()
+
+    @staticmethod
+    def _report_encoding(sniffed: Optional[str]) -> str:
+        """
+        Parser encoding of a report from the encoding sniffed from its first chunk
+
+        WinMerge writes reports as UTF-8, but reports written in the ANSI
+        code page would otherwise come out garbled. Undecodable heads are
+        parsed as UTF-8, as before.
+        """
+        # libxml2 skips the UTF-8 BOM itself
+        return 'utf-8' if sniffed in (None, 'utf-8-sig') else sniffed
+
+    @staticmethod
+    def _utf8_or_fallback(chunks: Iterator[bytes], html_path: Path) -> Iterator[bytes]:
+        """
+        Pass UTF-8 chunks through, transcoding from CP932 from the first chunk that is not UTF-8
+
+        The first chunk may be plain ASCII ahead of CP932 text. Bytes of a
+        character split across chunks are held back until it is complete, so
+        the transcoded part starts at a character boundary.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        pending = b''
+        for chunk in chunks:
+            data = pending + chunk
+            try:
+                decoder.decode(chunk)
+            except UnicodeDecodeError:
+                logger.debug("%s is not UTF-8 after its first chunk, decoding as %s", html_path, FALLBACK_ENCODING)
+                break
+            pending = decoder.getstate()[0]
+            yield data[:len(data) - len(pending)]
+        else:
+            yield pending
+            return
+
+        fallback = codecs.getincrementaldecoder(FALLBACK_ENCODING)(errors='replace')
+        yield fallback.decode(data).encode('utf-8')
+        for chunk in chunks:
+            yield fallback.decode(chunk).encode('utf-8')
+        yield fallback.decode(b'', final=True).encode('utf-8')
+
+    def _convert_rows_to_file_diff(self, rows: Iterator[List[HtmlCell]], name: str) -> FileDiff:
+        """Convert WinMerge side-by-side HTML table rows to a FileDiff"""
+        file_diff = FileDiff(name=name)
+        yellow_color = config.diff.yellow_color
+        header_found = False
+
+        for cells in rows:
+            if not cells:
+                continue
+
+            texts, fills = self._expand_cells(cells)
+
+            if cells[0].tag == 'th':
+                if not header_found:
+                    file_diff.header = texts
+                    header_found = True
+                continue
+
+            # Layout: left line no, left text, right line no, right text
+            texts += [''] * (4 - len(texts))
+            fills += [None] * (4 - len(fills))
+
+            file_diff.append(
+                left_no=self._parse_line_no(texts[0]),
+                left_text=texts[1],
+                right_no=self._parse_line_no(texts[2]),
+                right_text=texts[3],
+                changed=yellow_color in (fills[1], fills[3]),
+                left_fill=fills[1],
+                right_fill=fills[3],
+            )
+
+        return file_diff
+
+    def _expand_cells(self, cells: List[HtmlCell]) -> Tuple[List[str], List[Optional[str]]]:
+        """Get cell texts and fill colors, expanding colspan into empty cells"""
+        texts: List[str] = []
+        fills: List[Optional[str]] = []
+
+        for cell in cells:
+            texts.append(cell.text)
+            fills.append(self._parse_color(cell.style, cell.bgcolor))
+
+            texts.extend([''] * (cell.colspan - 1))
+            fills.extend([None] * (cell.colspan - 1))
+
+        return texts, fills
+
+    @staticmethod
+    def _parse_line_no(text: str) -> Optional[int]:
+        """Parse line number cell ('.' or empty means no line on that side)"""
+        return int(text) if text.isdigit() else None
+
     def _parse_color(self, style: str, bgcolor: str) -> Optional[str]:
         """Parse color from HTML style or bgcolor attribute"""
         # Try bgcolor attribute first
         if bgcolor:
             return self._normalize_color(bgcolor)
-        
+
         # Parse from style attribute
         if 'background-color' in style:
             # Extract color value
@@ -147,127 +300,90 @@ class HTMLToExcelConverter:
             if len(parts) > 1:
                 color_part = parts[1].split(':')[1].split(';')[0].strip()
                 return self._normalize_color(color_part)
-        
+
         return None
-    
+
     def _normalize_color(self, color: str) -> Optional[str]:
         """Normalize HTML color to Excel RGB format"""
         color = color.strip().upper()
-        
+
         # Remove # if present
         if color.startswith('#'):
             color = color[1:]
-        
+
         # Convert 3-char hex to 6-char
         if len(color) == 3:
             color = ''.join([c*2 for c in color])
-        
+
         # Add FF prefix for full opacity if not present
         if len(color) == 6:
             color = 'FF' + color
-        
+
         return color if len(color) == 8 else None
-    
-    def _auto_adjust_columns(self, ws, max_width: int = 100) -> None:
-        """Auto-adjust column widths based on content"""
-        for column in ws.columns:
-            max_length = 0
-            column_letter = get_column_letter(column[0].column)
-            
-            for cell in column:
-                try:
-                    if cell.value:
-                        cell_length = len(str(cell.value))
-                        max_length = max(max_length, cell_length)
-                except:
-                    pass
-            
-            adjusted_width = min(max_length + 2, max_width)
-            ws.column_dimensions[column_letter].width = adjusted_width
-    
+
     def convert_summary_html(self, html_path: Path) -> Workbook:
         """
         Convert summary HTML file to a new Workbook
-        
+
         Args:
             html_path: Path to summary HTML file
-            
+
         Returns:
             New Workbook with summary sheet
         """
         wb = Workbook()
-        ws = wb.active
-        ws.title = "Summary"
-        
+        self.writer.write_summary(wb, self.parse_summary_html(html_path))
+        return wb
+
+    def parse_summary_html(self, html_path: Path) -> SummaryTable:
+        """
+        Parse WinMerge folder compare report into a SummaryTable
+
+        Args:
+            html_path: Path to summary HTML file
+
+        Returns:
+            Summary table (empty if the report could not be read)
+        """
+        summary = SummaryTable()
+
         try:
-            with open(html_path, 'r', encoding='utf-8', errors='ignore') as f:
-                html_content = f.read()
-            
-            soup = BeautifulSoup(html_content, 'html.parser')
-            tables = soup.find_all('table')
-            
-            if tables:
-                # Use special method for summary sheet to filter folder rows
-                self._convert_summary_table_to_sheet(tables[0], ws)
+            target = _TableRowTarget()
+
+            # Use special method for summary sheet to filter folder rows
+            self._convert_summary_rows(self._iter_table_rows(html_path, target), summary)
+
+            if target.found_table:
                 self.log("Converted summary HTML to Excel")
             else:
                 logger.warning(f"No tables found in summary HTML: {html_path}")
-        
+
+        except OperationCancelledError:
+            raise
         except Exception as e:
             logger.error(f"Failed to convert summary HTML: {e}", exc_info=True)
-        
-        return wb
-    
-    def _convert_summary_table_to_sheet(self, table, ws) -> None:
-        """Convert summary HTML table to Excel worksheet, skipping folder rows"""
-        row_idx = 1
-        
-        # Process table rows
-        for tr in table.find_all('tr'):
-            # Check if this is a folder row (skip folders in summary sheet)
-            cells = tr.find_all(['th', 'td'])
-            if len(cells) >= 1:
-                first_cell = cells[0]
-                # Check if row has a link (files have links, folders don't)
-                has_link = first_cell.find('a') is not None
-                is_header = first_cell.name == 'th'
-                
-                # Skip rows without links that are not headers (folder rows)
-                if not has_link and not is_header:
-                    continue
-            
-            col_idx = 1
-            
-            # Process cells (th or td)
-            for cell in tr.find_all(['th', 'td']):
-                # Get cell text
-                cell_text = cell.get_text(strip=True)
-                
-                # Remove "." from line number columns (columns 1 and 2)
-                if col_idx in [1, 2] and cell_text == '.':
-                    cell_text = ''
-                
-                # Write to Excel
-                excel_cell = ws.cell(row=row_idx, column=col_idx, value=cell_text)
-                
-                # Apply basic styling based on HTML attributes
-                self._apply_cell_styling(excel_cell, cell)
-                
-                # Handle colspan and rowspan
-                colspan = int(cell.get('colspan', 1))
-                rowspan = int(cell.get('rowspan', 1))
-                
-                if colspan > 1 or rowspan > 1:
-                    ws.merge_cells(
-                        start_row=row_idx,
-                        start_column=col_idx,
-                        end_row=row_idx + rowspan - 1,
-                        end_column=col_idx + colspan - 1
-                    )
-                
-                col_idx += colspan
-            
-            row_idx += 1
-        
-        # Auto-adjust column widths
-        self._auto_adjust_columns(ws)
+
+        return summary
+
+    def _convert_summary_rows(self, rows: Iterator[List[HtmlCell]], summary: SummaryTable) -> None:
+        """Convert summary HTML table rows to Summary entries, skipping folder rows"""
+        header_found = False
+
+        for cells in rows:
+            if not cells:
+                continue
+
+            first_cell = cells[0]
+            texts, fills = self._expand_cells(cells)
+
+            if first_cell.tag == 'th':
+                if not header_found:
+                    summary.header = texts
+                    header_found = True
+                continue
+
+            # Skip rows without links (folder rows); files have links
+            if not first_cell.has_link:
+                continue
+
+            summary.entries.append(SummaryEntry(cells=texts, fills=fills))
@@ -0,0 +1,76 @@
+# -*- coding: UTF-8 -*-
+"""
+Cooperative cancellation of a running comparison
+"""
+import threading
+from contextlib import contextmanager
+from typing import Callable, Iterator, List
+
+from .exceptions import OperationCancelledError
+from .common import logger
+
+
+class CancellationToken:
+    """
+    Thread-safe cancellation flag shared by the pipeline stages
+
+    The GUI thread calls cancel(); the worker checks the token between files
+    with check(). Work that cannot check the token itself (a child process)
+    registers a callback with on_cancel() that stops it immediately.
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        """True once cancel() has been called"""
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        """Request cancellation and run the registered callbacks"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks = list(self._callbacks)
+
+        logger.info("Cancellation requested")
+        for callback in callbacks:
+            self._run_callback(callback)
+
+    def check(self) -> None:
+        """
+        Raise if cancellation has been requested
+
+        Raises:
+            OperationCancelledError: If cancel() has been called
+        """
+        if self._event.is_set():
+            raise OperationCancelledError("Operation cancelled")
+
+    @contextmanager
+    def on_cancel(self, callback: Callable[[], None]) -> Iterator[None]:
+        """Run callback on cancellation while the block runs (immediately if already cancelled)"""
+        with self._lock:
+            already_cancelled = self._event.is_set()
+            if not already_cancelled:
+                self._callbacks.append(callback)
+
+        if already_cancelled:
+            self._run_callback(callback)
+        try:
+            yield
+        finally:
+            with self._lock:
+                if callback in self._callbacks:
+                    self._callbacks.remove(callback)
+
+    @staticmethod
+    def _run_callback(callback: Callable[[], None]) -> None:
+        try:
+            callback()
+        except Exception as e:
+            logger.warning(f"Cancellation callback failed: {e}")
@@ -0,0 +1,215 @@
+# -*- coding: UTF-8 -*-
+"""
+File classification: route binary and oversize files around the full diff
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple, Union
+
+from .config import config
+from .diffmodel import FileDiff, SummaryEntry
+from .diffbackend import NativeBackend
+from .diffengine import DiffRows
+from .encoding import TextDecoder
+from .exceptions import ConfigurationError
+from .prescan import FilePair, PreScanner, CHANGED, CLASSIFIED
+from .common import BoundedCache, logger
+
+# File classes
+TEXT = 'text'
+BINARY = 'binary'
+OVERSIZE = 'oversize'  # Text larger than config.classify.max_text_bytes
+
+# Class policies
+FULL = 'full'        # Compare with the diff backend as usual
+WINDOW = 'window'    # Diff, keeping only the rows around the hunks
+HASH = 'hash'        # Compare content hashes, Summary entry only
+SUMMARY = 'summary'  # Summary entry only, contents not compared
+
+POLICIES = {
+    BINARY: (FULL, HASH, SUMMARY),
+    OVERSIZE: (FULL, WINDOW, HASH, SUMMARY),
+}
+
+# Characters per cell in .xlsx
+EXCEL_MAX_CELL_CHARS = 32767
+
+# Row standing for the rows left out between two windows
+GAP_TEXT = '...'
+
+# Control bytes that do not occur in text files (tab, line breaks, form feed and escape do)
+CONTROL_BYTES = bytes(set(range(32)) - {9, 10, 12, 13, 27}) + b'\x7f'
+# Share of control bytes above which a head that is neither UTF-8 nor CP932 is binary
+MAX_CONTROL_RATIO = 0.1
+
+# Content hashes whose binary sniff result is remembered per process
+SNIFF_CACHE_SIZE = 65536
+
+
+class FileClassifier:
+    """
+    Classifies changed pairs as text, binary or oversize and applies the class policies
+
+    A file is binary when its head (config.classify.sniff_bytes) holds a NUL
+    byte and no UTF-16 byte order mark, or decodes neither as UTF-8 nor as
+    CP932 and is full of control bytes; it is oversize when it is text
+    larger than config.classify.max_text_bytes. Only the head and the stat
+    data from the walk are read; sniff results are kept by content hash (up
+    to SNIFF_CACHE_SIZE recently used hashes) for files the pre-scan or the
+    result cache already hashed.
+    """
+
+    _binary_by_hash = BoundedCache(SNIFF_CACHE_SIZE)
+
+    @staticmethod
+    def classify_pairs(pairs: List[FilePair]) -> Dict[str, int]:
+        """
+        Set the class of each changed pair and mark pairs whose policy replaces the diff as CLASSIFIED
+
+        Returns:
+            Number of pairs per class
+        """
+        for kind in (BINARY, OVERSIZE):
+            FileClassifier.policy(kind)  # Reject bad settings before reading any file
+
+        changed = [pair for pair in pairs if pair.status == CHANGED]
+        with ThreadPoolExecutor() as executor:
+            for pair, kind in zip(changed, executor.map(FileClassifier.classify, changed)):
+                pair.kind = kind
+                if FileClassifier.policy(kind) != FULL:
+                    pair.status = CLASSIFIED
+
+        counts = {kind: 0 for kind in (TEXT, BINARY, OVERSIZE)}
+        for pair in changed:
+            counts[pair.kind] += 1
+        return counts
+
+    @staticmethod
+    def classify(pair: FilePair) -> str:
+        """Class of a pair with files on both sides (binary wins over oversize)"""
+        sides = ((pair.left, pair.left_stat, pair.left_hash), (pair.right, pair.right_stat, pair.right_hash))
+        if any(FileClassifier.is_binary(path, digest) for path, _, digest in sides):
+            return BINARY
+
+        sizes = [stat.st_size if stat is not None else path.stat().st_size for path, stat, _ in sides]
+        return OVERSIZE if max(sizes) > config.classify.max_text_bytes else TEXT
+
+    @staticmethod
+    def is_binary(path, digest: Optional[str] = None) -> bool:
+        """Sniff the head of a file for binary content (cached by content hash when digest is given)"""
+        if digest is not None:
+            cached = FileClassifier._binary_by_hash.get(digest)
+            if cached is not None:
+                return cached
+
+        with open(path, 'rb') as f:
+            head = f.read(config.classify.sniff_bytes)
+            truncated = bool(f.read(1))
+        binary = TextDecoder.looks_binary(head) or (
+            TextDecoder.sniff(head, truncated) is None
+            and len(head) - len(head.translate(None, CONTROL_BYTES)) > MAX_CONTROL_RATIO * len(head)
+        )
+
+        if digest is not None:
+            FileClassifier._binary_by_hash.put(digest, binary)
+        return binary
+
+    @staticmethod
+    def policy(kind: str) -> str:
+        """Configured policy of a file class (FULL for text)"""
+        if kind == TEXT:
+            return FULL
+
+        policy = getattr(config.classify, f"{kind}_policy")
+        if policy not in POLICIES[kind]:
+            raise ConfigurationError(
+                f"Unknown {kind} file policy: {policy}",
+                f"Available policies: {', '.join(POLICIES[kind])}"
+            )
+        return policy
+
+    @staticmethod
+    def summary_result(pair: FilePair) -> str:
+        """Summary 'Comparison result' of a pair under the HASH or SUMMARY policy"""
+        label = 'Binary files' if pair.kind == BINARY else 'Text files'
+        if FileClassifier.policy(pair.kind) == SUMMARY:
+            return f"{label}, not compared" + (' (too large)' if pair.kind == OVERSIZE else '')
+
+        if pair.left_hash is None or pair.right_hash is None:
+            left_size = (pair.left_stat or pair.left.stat()).st_size
+            if left_size != (pair.right_stat or pair.right.stat()).st_size:
+                return f"{label} are different"
+            pair.left_hash = pair.left_hash or PreScanner.file_hash(pair.left)
+            pair.right_hash = pair.right_hash or PreScanner.file_hash(pair.right)
+        return f"{label} are {'identical' if pair.left_hash == pair.right_hash else 'different'}"
+
+    @staticmethod
+    def windowed_diff(pair: FilePair) -> Tuple[SummaryEntry, Optional[FileDiff]]:
+        """Diff an oversize pair natively, building only the rows around its hunks (runs in worker processes)"""
+        return NativeBackend.compare_pair(pair, FileClassifier._build_windowed)
+
+    @staticmethod
+    def _build_windowed(left_lines: List[str], right_lines: List[str], windowed: FileDiff) -> FileDiff:
+        """compare_pair row builder: window the diff rows straight from the opcodes"""
+        return FileClassifier.window(DiffRows(left_lines, right_lines), windowed=windowed)
+
+    @staticmethod
+    def window(file_diff: Union[FileDiff, DiffRows], context: Optional[int] = None, max_rows: Optional[int] = None,
+               windowed: Optional[FileDiff] = None) -> FileDiff:
+        """
+        Cut a file diff down to the rows around its hunks
+
+        Rows left out between two windows are replaced by one GAP_TEXT row
+        and texts are clipped to Excel's cell limit. The windowed diff has at
+        most max_rows rows: when rows are left out for lack of room, the
+        last one is a GAP_TEXT row. Only the kept rows are read from
+        file_diff, so a DiffRows source never builds the others.
+
+        Args:
+            file_diff: Full diff of an oversize file (FileDiff or DiffRows)
+            context: Unchanged rows kept before and after each hunk
+            max_rows: Rows in the windowed diff, GAP_TEXT rows included
+            windowed: Empty FileDiff to fill (required for a DiffRows
+                source; defaults to one named like file_diff)
+        """
+        context = config.classify.window_lines if context is None else context
+        max_rows = config.classify.max_window_rows if max_rows is None else max_rows
+        if windowed is None:
+            windowed = FileDiff(name=file_diff.name, header=file_diff.header, key=file_diff.key)
+
+        def truncated() -> FileDiff:
+            last = windowed.row(len(windowed) - 1) if len(windowed) else None
+            if last is None or last.left_no is not None or last.left_text != GAP_TEXT:
+                windowed.append(None, GAP_TEXT, None, GAP_TEXT)
+            logger.debug("Windowed diff of %s truncated at %d rows", windowed.name, len(windowed))
+            return windowed
+
+        previous_end = 0
+        for start, end in FileClassifier._windows(file_diff.hunks, context, len(file_diff)):
+            if start > previous_end:
+                if len(windowed) >= max_rows - 1:
+                    return truncated()
+                windowed.append(None, GAP_TEXT, None, GAP_TEXT)
+            for index in range(start, end):
+                # Keep the last row for the GAP_TEXT row unless this is the last row of the file
+                if len(windowed) >= max_rows - 1 and index + 1 < len(file_diff):
+                    return truncated()
+                row = file_diff.row(index)
+                windowed.append(row.left_no, row.left_text[:EXCEL_MAX_CELL_CHARS], row.right_no,
+                                row.right_text[:EXCEL_MAX_CELL_CHARS], row.changed, row.left_fill, row.right_fill)
+            previous_end = end
+
+        if previous_end < len(file_diff):
+            windowed.append(None, GAP_TEXT, None, GAP_TEXT)
+        return windowed
+
+    @staticmethod
+    def _windows(hunks: List[Tuple[int, int]], context: int, row_count: int) -> List[Tuple[int, int]]:
+        """Merge hunks widened by context rows into (start, end) row ranges"""
+        windows: List[Tuple[int, int]] = []
+        for start, end in hunks:
+            start, end = max(start - context, 0), min(end + context, row_count)
+            if windows and start <= windows[-1][1]:
+                windows[-1] = (windows[-1][0], max(windows[-1][1], end))
+            else:
+                windows.append((start, end))
+        return windows
@@ -3,54 +3,286 @@
 Common utilities and base classes
 """
 
+import atexit
+import json
+import os
+import queue
+import threading
 import time
 import logging
-from logging.handlers import RotatingFileHandler
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
-from typing import Optional
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Minimum seconds between two ProgressLog messages
+PROGRESS_INTERVAL = 1.0
+
+
+class SpanRecord(NamedTuple):
+    """Finished span (times in nanoseconds since the epoch)"""
+    name: str
+    category: str  # 'stage' or 'file'
+    start_ns: int
+    duration_ns: int
+    pid: int
+    tid: int
+    args: Dict[str, Any]
+
+
+class Tracer:
+    """
+    Thread-safe span tracer for stages and per-file work
+
+    Spans are recorded with the process and thread that ran them, and
+    counters (files, rows, cells, bytes) are summed per run. Worker processes
+    hand their spans back with drain(), and the parent adds them with merge().
+    A run is exported as Chrome trace_event JSON (chrome://tracing, Perfetto)
+    and summarized as a table of total and mean time per span name.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._spans: List[SpanRecord] = []
+        self._counters: Dict[str, int] = defaultdict(int)
+
+    def reset(self) -> None:
+        """Drop recorded spans and counters (start of a run)"""
+        self.drain()
+
+    @contextmanager
+    def span(self, name: str, category: str = 'stage', **args) -> Iterator[Dict[str, Any]]:
+        """
+        Record the enclosed block as a span (also usable as a decorator)
+
+        Yields the span's args dict, so the block can attach values to it.
+        """
+        start_ns = time.time_ns()
+        try:
+            yield args
+        finally:
+            self.record(name, category, start_ns, time.time_ns() - start_ns, args)
+
+    def record(self, name: str, category: str, start_ns: int, duration_ns: int,
+               args: Optional[Dict[str, Any]] = None) -> None:
+        """Record a finished span run by the current thread"""
+        span = SpanRecord(name, category, start_ns, duration_ns, os.getpid(), threading.get_ident(), args or {})
+        with self._lock:
+            self._spans.append(span)
+
+    def count(self, name: str, value: int = 1) -> None:
+        """Add value to a run counter"""
+        with self._lock:
+            self._counters[name] += value
+
+    def drain(self) -> Tuple[List[SpanRecord], Dict[str, int]]:
+        """Take and clear the recorded spans and counters"""
+        with self._lock:
+            spans, counters = self._spans, dict(self._counters)
+            self._spans, self._counters = [], defaultdict(int)
+        return spans, counters
+
+    def merge(self, spans: List[SpanRecord], counters: Dict[str, int]) -> None:
+        """Add spans and counters drained in another process"""
+        with self._lock:
+            self._spans.extend(spans)
+            for name, value in counters.items():
+                self._counters[name] += value
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Recorded spans as a Chrome trace_event document (complete 'X' events, microseconds)"""
+        with self._lock:
+            spans, counters = list(self._spans), dict(self._counters)
+
+        events = [{
+            'name': span.name,
+            'cat': span.category,
+            'ph': 'X',
+            'ts': span.start_ns / 1000,
+            'dur': span.duration_ns / 1000,
+            'pid': span.pid,
+            'tid': span.tid,
+            'args': span.args,
+        } for span in spans]
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'otherData': {'counters': counters}}
+
+    def write_chrome_trace(self, path: Path) -> None:
+        """Write the Chrome trace_event JSON file"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.chrome_trace(), f, default=str)
+
+    def totals(self) -> Dict[str, Dict[str, Any]]:
+        """Aggregate spans by name: category, count, total and max seconds"""
+        with self._lock:
+            spans = list(self._spans)
+
+        totals: Dict[str, Dict[str, Any]] = {}
+        for span in spans:
+            total = totals.setdefault(span.name, {'category': span.category, 'count': 0, 'total_s': 0.0, 'max_s': 0.0})
+            total['count'] += 1
+            total['total_s'] += span.duration_ns / 1e9
+            total['max_s'] = max(total['max_s'], span.duration_ns / 1e9)
+        return totals
+
+    def counters(self) -> Dict[str, int]:
+        """Current run counters"""
+        with self._lock:
+            return dict(self._counters)
+
+    def summary(self) -> List[str]:
+        """Summary table lines: count, total, mean and max time per span name, then the counters"""
+        totals = self.totals()
+
+        width = max([len(name) for name in totals] + [4])
+        lines = [f"{'Span':<{width}} {'Category':<8} {'Count':>7} {'Total s':>9} {'Mean ms':>9} {'Max ms':>9}"]
+        for name, total in sorted(totals.items(), key=lambda item: -item[1]['total_s']):
+            lines.append(
+                f"{name:<{width}} {total['category']:<8} {total['count']:>7} {total['total_s']:>9.2f} "
+                f"{total['total_s'] / total['count'] * 1000:>9.1f} {total['max_s'] * 1000:>9.1f}"
+            )
+        for name, value in sorted(self.counters().items()):
+            lines.append(f"{name}: {value:,}")
+        return lines
+
+
+# Global tracer instance (one per process)
+tracer = Tracer()
 
 
 class Timer:
-    """Performance timer for measuring execution time"""
+    """
+    Stage timer recording start/stop pairs as spans in the global tracer
+
+    Sessions nest per thread; progress goes to the debug log instead of stdout.
+    """
     
     def __init__(self, label: str = "Processing"):
         self.label = label
-        self._sessions = []
-        self._memos = []
+        self._local = threading.local()
+    
+    def _sessions(self) -> List[Tuple[str, int]]:
+        """(memo, start time) of the open sessions of the current thread"""
+        if not hasattr(self._local, 'sessions'):
+            self._local.sessions = []
+        return self._local.sessions
     
     def start(self, memo: Optional[str] = None) -> None:
         """Start timing a new session"""
-        self._sessions.append({'start': time.time(), 'end': None})
-        indent = '_' * (len(self._sessions) * 2)
-        self._memos.append(memo or "")
-        print(f"{indent}{self.label} {memo} started...")
+        self._sessions().append((memo or "", time.time_ns()))
+        logger.debug("%s %s started...", self.label, memo)
 
     def stop(self) -> None:
         """Stop timing the current session"""
-        if not self._sessions or self._sessions[-1]['end'] is not None:
-            print(f"{self.label} has not been started yet.")
+        sessions = self._sessions()
+        if not sessions:
+            logger.debug("%s has not been started yet.", self.label)
             return
 
-        self._sessions[-1]['end'] = time.time()
-        elapsed = self._sessions[-1]['end'] - self._sessions[-1]['start']
-        indent = '_' * (len(self._sessions) * 2)
-        memo = self._memos[-1]
-        print(f"{indent}{self.label} {memo} completed. Elapsed time: {elapsed:.2f} seconds")
-
-        # Remove completed session
-        self._sessions.pop()
-        self._memos.pop()
+        memo, start_ns = sessions.pop()
+        duration_ns = time.time_ns() - start_ns
+        tracer.record(f"{self.label} {memo}".strip(), 'stage', start_ns, duration_ns)
+        logger.debug("%s %s completed. Elapsed time: %.2f seconds", self.label, memo, duration_ns / 1e9)
 
     def elapsed_all(self) -> float:
-        """Calculate total elapsed time across all sessions"""
-        return sum(
-            (s['end'] or time.time()) - s['start']
-            for s in self._sessions
-        )
+        """Calculate total elapsed time across the open sessions of the current thread"""
+        now = time.time_ns()
+        return sum(now - start_ns for _, start_ns in self._sessions()) / 1e9
+
+
+class ProgressLog:
+    """
+    Rate-limited progress messages for per-file loops
+
+    update() only counts; a "<label> done/total <unit>..." message is passed
+    to the log function at most once per interval, and finish() reports the
+    final count if the last message did not. Safe to update from threads.
+    """
+
+    def __init__(self, log: Optional[Callable[[str], None]], label: str, total: Optional[int] = None,
+                 unit: str = 'files', interval: float = PROGRESS_INTERVAL):
+        self.log = log
+        self.label = label
+        self.total = total
+        self.unit = unit
+        self.interval = interval
+        self.done = 0
+        self._reported = 0
+        self._next_report = 0.0
+        self._lock = threading.Lock()
+
+    def update(self, count: int = 1) -> None:
+        """Count finished items, logging progress when the interval has passed"""
+        with self._lock:
+            self.done += count
+            now = time.monotonic()
+            if self.log is None or now < self._next_report:
+                return
+            self._next_report = now + self.interval
+            self._reported = self.done
+            message = self._message()
+        self.log(message)
+
+    def finish(self) -> None:
+        """Log the final count unless it was the last message"""
+        with self._lock:
+            if self.log is None or self.done == self._reported:
+                return
+            self._reported = self.done
+            message = self._message()
+        self.log(message)
+
+    def _message(self) -> str:
+        if self.total is None:
+            return f"{self.label} {self.done} {self.unit}..."
+        return f"{self.label} {self.done}/{self.total} {self.unit}..."
+
+
+class BoundedCache:
+    """
+    Thread-safe mapping that keeps the most recently used max_size entries
+
+    For per-process memos keyed by content hash, which would otherwise grow
+    with every file seen by a long-running process (GUI sessions, reused
+    worker pools).
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._entries:
+                return default
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
 
 
 class Logger:
-    """Centralized logging handler with console and file output"""
+    """
+    Centralized logging handler with console and file output
+
+    By default records are put on a queue and written by a background
+    thread (QueueListener), so console and file I/O stay off the calling
+    thread. Messages below the logger level are dropped before a record is
+    built; pass %-style args instead of an f-string to also skip formatting.
+    """
     
     def __init__(
         self,
@@ -58,7 +290,8 @@ class Logger:
         level: int = logging.INFO,
         log_file: Optional[Path] = None,
         max_bytes: int = 1_000_000,  # 1MB
-        backup_count: int = 3
+        backup_count: int = 3,
+        use_queue: bool = True
     ):
         """
         Initialize logger with console and optional file handlers
@@ -69,10 +302,14 @@ class Logger:
             log_file: Optional file path for log output
             max_bytes: Maximum size of log file before rotation
             backup_count: Number of backup log files to keep
+            use_queue: Write records from a background thread
         """
         self.logger = logging.getLogger(name)
         self.logger.setLevel(level)
         self.logger.propagate = False
+        self.listener: Optional[QueueListener] = None
+        self._handlers: List[logging.Handler] = []
+        self._queue_handler: Optional[QueueHandler] = None
 
         if not self.logger.handlers:
             formatter = logging.Formatter(
@@ -83,7 +320,7 @@ class Logger:
             # Console handler
             console_handler = logging.StreamHandler()
             console_handler.setFormatter(formatter)
-            self.logger.addHandler(console_handler)
+            self._handlers.append(console_handler)
 
             # File handler with rotation
             if log_file:
@@ -93,27 +330,64 @@ class Logger:
                     log_file, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8"
                 )
                 file_handler.setFormatter(formatter)
-                self.logger.addHandler(file_handler)
+                self._handlers.append(file_handler)
+
+            if use_queue:
+                self._start_listener()
+                atexit.register(self.stop)
+                if hasattr(os, 'register_at_fork'):
+                    # A forked worker inherits the queue but not the writer thread
+                    os.register_at_fork(after_in_child=self._start_listener)
+            else:
+                for handler in self._handlers:
+                    self.logger.addHandler(handler)
+
+    def _start_listener(self) -> None:
+        """Route records through a new queue to a background writer thread"""
+        if self._queue_handler is not None:
+            self.logger.removeHandler(self._queue_handler)
+
+        log_queue = queue.SimpleQueue()
+        self.listener = QueueListener(log_queue, *self._handlers, respect_handler_level=True)
+        self.listener.start()
+        self._queue_handler = QueueHandler(log_queue)
+        self.logger.addHandler(self._queue_handler)
+
+    def flush(self) -> None:
+        """Wait until the queued records are written"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+            self.listener.start()
+
+    def stop(self) -> None:
+        """Write the queued records and stop the writer thread (at exit)"""
+        if self.listener is not None and self.listener._thread is not None:
+            self.listener.stop()
+
+    @property
+    def debug_enabled(self) -> bool:
+        """Whether debug messages are logged (check before building expensive messages)"""
+        return self.logger.isEnabledFor(logging.DEBUG)
 
-    def debug(self, message: str, exc_info: bool = False) -> None:
+    def debug(self, message: str, *args, exc_info: bool = False) -> None:
         """Log debug message"""
-        self.logger.debug(message, exc_info=exc_info)
+        self.logger.debug(message, *args, exc_info=exc_info)
 
-    def info(self, message: str, exc_info: bool = False) -> None:
+    def info(self, message: str, *args, exc_info: bool = False) -> None:
         """Log info message"""
-        self.logger.info(message, exc_info=exc_info)
+        self.logger.info(message, *args, exc_info=exc_info)
 
-    def warning(self, message: str, exc_info: bool = False) -> None:
+    def warning(self, message: str, *args, exc_info: bool = False) -> None:
         """Log warning message"""
-        self.logger.warning(message, exc_info=exc_info)
+        self.logger.warning(message, *args, exc_info=exc_info)
 
-    def error(self, message: str, exc_info: bool = False) -> None:
+    def error(self, message: str, *args, exc_info: bool = False) -> None:
         """Log error message"""
-        self.logger.error(message, exc_info=exc_info)
+        self.logger.error(message, *args, exc_info=exc_info)
 
-    def critical(self, message: str, exc_info: bool = False) -> None:
+    def critical(self, message: str, *args, exc_info: bool = False) -> None:
         """Log critical message"""
-        self.logger.critical(message, exc_info=exc_info)
+        self.logger.critical(message, *args, exc_info=exc_info)
 
 
 # Global logger instance
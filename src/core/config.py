@@ -11,7 +11,18 @@ from typing import Dict, List, Any
 class WinMergeConfig:
     """WinMerge configuration"""
     executable_path: str = r'C:\Program Files\WinMerge\WinMergeU.exe'
+    backend: str = 'winmerge'  # Diff backend: 'winmerge' (WinMergeU.exe) or 'native' (pure Python)
     options: List[str] = field(default_factory=list)
+    # Concurrent WinMerge processes, each comparing a subtree (0 = one per CPU, 1 = one run for the whole tree)
+    max_processes: int = 0
+    min_subtree_bytes: int = 16 * 1024 * 1024  # Input bytes per subtree below which fewer processes are started
+    # Timeout of a WinMerge run: base seconds plus seconds per MB of input compared
+    timeout_base: float = 120.0
+    timeout_per_mb: float = 10.0
+    # Parse per-file reports while WinMerge is still writing them
+    pipeline: bool = False
+    pipeline_queue: int = 64  # Parsed files (or parses in flight) buffered ahead of the workbook writer
+    report_poll_interval: float = 0.2  # Seconds between checks for new reports
     
     def __post_init__(self):
         if not self.options:
@@ -33,12 +44,13 @@ class WinMergeConfig:
 class ExcelConfig:
     """Excel formatting configuration"""
     summary_ws_num: int = 1
-    summary_start_row: int = 6
-    summary_name_col_index: int = 1
-    summary_folder_col_index: int = 2
     diff_start_row: int = 2
     diff_zoom_ratio: int = 85
     home_position: str = 'A1'
+    # Stream sheets into a write-only workbook (bounded memory for large diffs)
+    write_only: bool = False
+    # When the output is locked, look for the Excel process holding it (psutil; slow on busy hosts)
+    find_lock_holder: bool = False
     
     # Excel constants
     xl_up: int = -4162
@@ -53,8 +65,7 @@ class UIConfig:
     window_title: str = "WinMerge Diff to Excel"
     window_geometry: tuple = (100, 100, 800, 500)
     default_output_file: str = "output.xlsx"
-    progress_animation_interval: int = 50
-    progress_animation_step: int = 2
+    log_flush_interval: int = 100  # Milliseconds between batched log/progress updates from the worker
 
 
 @dataclass
@@ -62,7 +73,88 @@ class DiffConfig:
     """Diff processing configuration"""
     context_lines: int = 4
     yellow_color: str = 'FFEFCB05'  # WinMerge diff color (yellow)
+    missing_color: str = 'FFC0C0C0'  # WinMerge deleted-line color (gray)
     sheet_start_index: int = 2
+    max_edit_cost: int = 2000  # Myers search limit before a hunk is reported as a full replace
+
+
+@dataclass
+class IntralineConfig:
+    """Character/word-level highlighting inside changed line pairs"""
+    enabled: bool = False
+    color: str = 'FFC00000'  # Font color of changed spans (shown bold)
+    max_line_length: int = 2000  # Longer line pairs keep the whole-row highlight only
+    max_cost: int = 10000  # Token comparisons allowed before changes are approximated as one span
+
+
+@dataclass
+class ScanConfig:
+    """Pre-scan (identical file detection) configuration"""
+    enabled: bool = True
+    trust_mtime: bool = False  # Treat same size and mtime as identical without hashing (opt-in)
+    hash_chunk_size: int = 1024 * 1024
+    mmap_threshold: int = 8 * 1024 * 1024  # Hash files of this size and larger via mmap
+
+
+@dataclass
+class ClassifyConfig:
+    """Binary and oversize file handling"""
+    enabled: bool = True
+    sniff_bytes: int = 8192  # Head of each changed file checked for binary content
+    max_text_bytes: int = 64 * 1024 * 1024  # Larger text files are 'oversize'
+    # Policies: 'full' (diff backend), 'window' (rows around the hunks only, oversize files),
+    # 'hash' (content hash compare, Summary only) or 'summary' (Summary only, not compared)
+    binary_policy: str = 'hash'
+    oversize_policy: str = 'window'
+    window_lines: int = 20  # Unchanged rows kept around each hunk of a windowed diff
+    max_window_rows: int = 100000  # Rows of a windowed diff, including the gap rows
+
+
+@dataclass
+class WalkConfig:
+    """Input tree walking configuration"""
+    include: List[str] = field(default_factory=list)  # Glob patterns of files to compare (empty = all files)
+    exclude: List[str] = field(default_factory=list)  # Glob patterns of files/folders to skip, e.g. ['.git', 'obj', 'bin']
+    workers: int = 8  # Threads listing directories concurrently
+
+
+@dataclass
+class StagingConfig:
+    """Staging (normalized copy of input trees for WinMerge) configuration"""
+    mode: str = 'link'  # 'link' (reflink/hardlink, copy across devices) or 'copy'
+    in_place: bool = True  # Use input trees directly when no file needs renaming or skipping
+
+
+@dataclass
+class ParallelConfig:
+    """Process pool configuration for per-file parsing and diffing"""
+    workers: int = 0  # Worker processes (0 = one per CPU, 1 = serial)
+    min_items: int = 8  # Below this many files the work runs serially
+
+
+@dataclass
+class ShardConfig:
+    """Split per-file sheets across several workbooks (0 = no limit)"""
+    max_sheets: int = 0  # Per-file sheets per shard workbook
+    max_rows: int = 0  # Diff rows per shard workbook (size budget)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_sheets > 0 or self.max_rows > 0
+
+
+@dataclass
+class CacheConfig:
+    """Persistent per-file result cache configuration"""
+    enabled: bool = False
+    directory: str = ''  # Empty = per-user cache folder (see ResultCache.default_directory)
+    max_bytes: int = 512 * 1024 * 1024  # Least recently used entries are evicted above this size
+
+
+@dataclass
+class TraceConfig:
+    """Stage tracing output configuration"""
+    enabled: bool = False  # Write <output>.trace.json (Chrome trace_event format) and log a summary table
 
 
 class Config:
@@ -73,6 +165,15 @@ class Config:
         self.excel = ExcelConfig()
         self.ui = UIConfig()
         self.diff = DiffConfig()
+        self.intraline = IntralineConfig()
+        self.scan = ScanConfig()
+        self.classify = ClassifyConfig()
+        self.walk = WalkConfig()
+        self.staging = StagingConfig()
+        self.parallel = ParallelConfig()
+        self.cache = CacheConfig()
+        self.shard = ShardConfig()
+        self.trace = TraceConfig()
         
         # Diff formats configuration
         self.diff_formats = {
@@ -91,6 +192,8 @@ class Config:
     
     def validate(self) -> bool:
         """Validate configuration settings"""
+        if self.winmerge.backend != 'winmerge':
+            return True
         winmerge_path = Path(self.winmerge.executable_path)
         if not winmerge_path.exists():
             return False
@@ -0,0 +1,624 @@
+# -*- coding: UTF-8 -*-
+"""
+Pluggable diff backends producing the shared row model
+
+- WinMergeBackend: runs WinMergeU.exe and parses its HTML reports
+- NativeBackend: pure-Python diff engine, no external process or HTML
+"""
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+from .config import config
+from .exceptions import WinMergeNotFoundError, ExcelProcessingError, ConfigurationError
+from .cancellation import CancellationToken
+from .utils import FileNormalizer, PathManager
+from .diffengine import build_rows
+from .encoding import TextDecoder
+from .diffmodel import DiffResult, FileDiff, SummaryEntry, SummaryTable
+from .prescan import FilePair
+from .subtreeplan import SubtreePlanner
+from .parallel import parallel_map, process_pool, resolve_workers, traced_call
+from .pipeline import PipelineQueue
+from .common import ProgressLog, Timer, logger, tracer
+
+timer_DB = Timer("DiffBackend")
+
+
+class DiffBackend:
+    """Base class for diff backends"""
+
+    name = ''
+
+    def __init__(self, log: Callable[[str], None], path_manager: PathManager,
+                 cancel_token: Optional[CancellationToken] = None):
+        self.log = log
+        self.path_manager = path_manager
+        self.cancel_token = cancel_token or CancellationToken()
+
+    def validate(self) -> None:
+        """Validate that the backend can run (raises on failure)"""
+
+    def file_order(self, key: str) -> str:
+        """Sort key of a file diff, matching the order compare() produces them in"""
+        return key
+
+    def compare(self, base: Path, latest: Path, pairs: List[FilePair], output_html: Path) -> DiffResult:
+        """
+        Compare the given file pairs of the base and latest trees
+
+        Args:
+            base: Base file or folder
+            latest: Latest file or folder
+            pairs: Pre-scanned file pairs; pairs that do not need a diff
+                (identical or cached) are listed in Summary by the caller
+            output_html: Summary report path (used by report-based backends)
+
+        Returns:
+            Summary table and per-file diffs (files are produced lazily)
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def summary_entry(name: str, folder: str, result: str,
+                      left: Optional[Path], right: Optional[Path]) -> SummaryEntry:
+        """Build a Summary entry in WinMerge report column order"""
+        def file_date(path: Optional[Path]) -> str:
+            if path is None:
+                return ''
+            return datetime.fromtimestamp(path.stat().st_mtime).strftime('%Y-%m-%d %H:%M:%S')
+
+        extension = name.rpartition('.')[2] if '.' in name else ''
+        return SummaryEntry(cells=[name, folder, result, file_date(left), file_date(right), extension])
+
+    @staticmethod
+    def file_header(left: Path, right: Path) -> List[str]:
+        """Header row of a file diff in WinMerge report column order (line number, path, line number, path)"""
+        return ['', str(left), '', str(right)]
+
+
+class WinMergeBackend(DiffBackend):
+    """Diff backend driving WinMergeU.exe and parsing its HTML reports"""
+
+    name = 'winmerge'
+
+    def validate(self) -> None:
+        winmerge_path = Path(config.winmerge.executable_path)
+        if not winmerge_path.exists():
+            raise WinMergeNotFoundError(f"WinMerge not found at: {winmerge_path}")
+
+    def file_order(self, key: str) -> str:
+        # Reports are parsed in report file name order
+        return key.replace('/', '_') + '.html'
+
+    def compare(self, base: Path, latest: Path, pairs: List[FilePair], output_html: Path) -> DiffResult:
+        to_diff = [pair for pair in pairs if pair.needs_diff]
+        if not to_diff:
+            self.log("No changed files, skipping WinMerge")
+            return DiffResult()
+
+        subtrees = self._plan_subtrees(base, latest, to_diff)
+        if config.winmerge.pipeline:
+            result = DiffResult()
+            result.files = self._iter_pipelined(base, latest, pairs, subtrees, output_html, result.summary)
+            return result
+
+        if len(subtrees) > 1:
+            summary = self._run_subtrees(base, latest, subtrees, output_html)
+            return self._parse_reports(output_html, to_diff, summary)
+
+        normalized_base, normalized_latest = self._normalize_files(base, latest, pairs)
+        self._generate_html_by_winmerge(normalized_base, normalized_latest, output_html, self._timeout(to_diff))
+        return self._parse_reports(output_html, to_diff)
+
+    @staticmethod
+    def _process_count() -> int:
+        """Concurrent WinMerge processes allowed by config.winmerge.max_processes"""
+        return config.winmerge.max_processes or os.cpu_count() or 1
+
+    @staticmethod
+    def _timeout(pairs: List[FilePair]) -> float:
+        """Timeout in seconds of a WinMerge run comparing the given pairs (grows with their size)"""
+        megabytes = sum(pair.size for pair in pairs) / (1024 * 1024)
+        return config.winmerge.timeout_base + config.winmerge.timeout_per_mb * megabytes
+
+    def _plan_subtrees(self, base: Path, latest: Path, pairs: List[FilePair]) -> List[List[FilePair]]:
+        """Split the pairs into subtree jobs, one per WinMerge process (a single job for small trees)"""
+        if not (base.is_dir() and latest.is_dir()):
+            return [pairs]
+
+        total_bytes = sum(pair.size for pair in pairs)
+        count = min(self._process_count(), total_bytes // max(config.winmerge.min_subtree_bytes, 1))
+        return SubtreePlanner.plan(pairs, count) if count > 1 else [pairs]
+
+    def _normalize_files(self, base: Path, latest: Path, pairs: List[FilePair]):
+        """
+        Stage the non-identical files under normalized names in temporary directories
+
+        Staging is skipped and the input folders are used directly when every
+        file is compared, no walk patterns filter the trees and none of the
+        files needs a versioned name rewritten.
+        """
+        logger.info("Normalizing files")
+
+        left_files = [pair.left for pair in pairs if pair.needs_diff and pair.left is not None]
+        right_files = [pair.right for pair in pairs if pair.needs_diff and pair.right is not None]
+
+        if (config.staging.in_place and base.is_dir() and latest.is_dir()
+                and all(pair.needs_diff for pair in pairs)
+                and not (config.walk.include or config.walk.exclude)
+                and not FileNormalizer.needs_rename(left_files + right_files)):
+            self.log("No files need normalizing, comparing input folders in place")
+            return base, latest
+
+        temp_base = self.path_manager.create_temp_dir()
+        temp_latest = self.path_manager.create_temp_dir()
+
+        FileNormalizer.copy_and_normalize(
+            base, temp_base,
+            lambda msg: self.log(f"Base: {msg}"),
+            files=left_files,
+            cancel_token=self.cancel_token
+        )
+        FileNormalizer.copy_and_normalize(
+            latest, temp_latest,
+            lambda msg: self.log(f"Latest: {msg}"),
+            files=right_files,
+            cancel_token=self.cancel_token
+        )
+
+        return temp_base, temp_latest
+
+    @tracer.span("DiffBackend run_winmerge")
+    def _generate_html_by_winmerge(self, base: Path, latest: Path, output_html: Path, timeout: float) -> None:
+        """Generate HTML report using WinMerge (the process is killed on cancellation)"""
+        self.cancel_token.check()
+        self.log("Generating HTML report with WinMerge...")
+        self._run_winmerge(base, latest, output_html, timeout, self.cancel_token)
+        self.log("WinMerge HTML generation completed")
+
+    @staticmethod
+    def _run_winmerge(base: Path, latest: Path, output_html: Path, timeout: float,
+                      cancel_token: CancellationToken) -> None:
+        """Run one WinMerge process writing output_html (killed when cancel_token is cancelled)"""
+        command = config.get_winmerge_command(str(base), str(latest), str(output_html))
+
+        logger.debug(f"WinMerge command: {' '.join(command)}")
+
+        try:
+            with subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True) as process:
+                with cancel_token.on_cancel(process.kill):
+                    try:
+                        stdout, stderr = process.communicate(timeout=timeout)
+                    except subprocess.TimeoutExpired:
+                        process.kill()
+                        process.communicate()
+                        raise
+
+            # A killed process exits with an error: report the cancellation instead
+            cancel_token.check()
+            if process.returncode:
+                raise subprocess.CalledProcessError(process.returncode, command, stdout, stderr)
+
+            if stdout:
+                logger.debug(f"WinMerge output: {stdout}")
+        except subprocess.TimeoutExpired:
+            raise ExcelProcessingError(f"WinMerge execution timed out after {timeout:.0f} seconds")
+        except subprocess.CalledProcessError as e:
+            error_msg = f"WinMerge execution failed: {e}"
+            if e.stderr:
+                error_msg += f"\nError output: {e.stderr}"
+            raise ExcelProcessingError(error_msg)
+
+    @tracer.span("DiffBackend run_winmerge subtrees")
+    def _run_subtrees(self, base: Path, latest: Path, subtrees: List[List[FilePair]],
+                      output_html: Path) -> SummaryTable:
+        """
+        Compare each subtree with its own WinMerge process and merge their Summary tables
+
+        At most config.winmerge.max_processes run at once. Per-file reports
+        end up in the usual report folder; when one run fails (or the token
+        is cancelled) the other processes are killed.
+        """
+        self.cancel_token.check()
+        workers = min(self._process_count(), len(subtrees))
+        self.log(f"Generating HTML reports with WinMerge ({len(subtrees)} subtrees, {workers} processes)...")
+
+        output_html_files = output_html.with_name(output_html.stem + '.files')
+        output_html_files.mkdir(parents=True, exist_ok=True)
+
+        summaries: List[Optional[SummaryTable]] = [None] * len(subtrees)
+        progress = ProgressLog(self.log, "Compared", len(subtrees), unit='subtrees')
+        subtree_token = CancellationToken()
+
+        with self.cancel_token.on_cancel(subtree_token.cancel), ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(self._run_subtree, base, latest, pairs,
+                                output_html_files / f"subtree{index}", subtree_token): index
+                for index, pairs in enumerate(subtrees)
+            }
+            try:
+                for future in as_completed(futures):
+                    summaries[futures[future]] = future.result()
+                    progress.update()
+            except BaseException:
+                # Stop the other runs before leaving the executor
+                subtree_token.cancel()
+                raise
+
+        self.cancel_token.check()
+        self.log("WinMerge HTML generation completed")
+
+        summary = SummaryTable(header=summaries[0].header)
+        for subtree_summary in summaries:
+            summary.entries.extend(subtree_summary.entries)
+        return summary
+
+    def _run_subtree(self, base: Path, latest: Path, pairs: List[FilePair], work_dir: Path,
+                     cancel_token: CancellationToken) -> SummaryTable:
+        """Stage one subtree, compare it with WinMerge and move its per-file reports to the report folder"""
+        from src.converters.html_to_excel import HTMLToExcelConverter
+
+        cancel_token.check()
+        with tracer.span('run_winmerge subtree', category='file', item=work_dir.name, files=len(pairs)):
+            temp_base = self.path_manager.create_temp_dir()
+            temp_latest = self.path_manager.create_temp_dir()
+            FileNormalizer.copy_and_normalize(base, temp_base, files=[pair.left for pair in pairs if pair.left],
+                                              cancel_token=cancel_token)
+            FileNormalizer.copy_and_normalize(latest, temp_latest, files=[pair.right for pair in pairs if pair.right],
+                                              cancel_token=cancel_token)
+
+            work_dir.mkdir(parents=True, exist_ok=True)
+            report = work_dir / 'report.html'
+            self._run_winmerge(temp_base, temp_latest, report, self._timeout(pairs), cancel_token)
+
+            summary = HTMLToExcelConverter(cancel_token=cancel_token).parse_summary_html(report)
+            for html_file in report.with_name(report.stem + '.files').glob('**/*.html'):
+                os.replace(html_file, work_dir.parent / html_file.name)
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return summary
+
+    def _iter_pipelined(self, base: Path, latest: Path, pairs: List[FilePair], subtrees: List[List[FilePair]],
+                        output_html: Path, summary: SummaryTable) -> Iterator[FileDiff]:
+        """
+        Run WinMerge and parse its per-file reports while it is still running
+
+        A producer thread runs the WinMerge process(es) and watches the report
+        folder: each expected report (named after a file on both sides) is handed
+        to the parse pool once it is complete, in report name order, through
+        a bounded queue the workbook writer consumes. A report counts as
+        complete when it ends with '</html>' or when its run has finished;
+        subtree runs deliver their reports when they finish. Summary entries
+        are added to summary as the runs finish.
+        """
+        output_html_files = output_html.with_name(output_html.stem + '.files')
+        stem_to_key = {pair.key.replace('/', '_'): pair.key for pair in pairs if pair.needs_diff}
+        # Files on one side only get no report: waiting for theirs would stall the stream until the run ends
+        run_of_stem = {pair.key.replace('/', '_'): index
+                       for index, subtree in enumerate(subtrees) for pair in subtree
+                       if pair.left is not None and pair.right is not None}
+        runs_done = [threading.Event() for _ in subtrees]
+        summary_lock = threading.Lock()
+
+        pipeline_token = CancellationToken()
+        hand_off = PipelineQueue(config.winmerge.pipeline_queue, pipeline_token)
+        workers = resolve_workers()
+        executor = process_pool(workers) if workers > 1 else None
+
+        def parse(html_file: Path) -> Future:
+            job = (_parse_report_job,
+                   (html_file, self.extract_filename_from_stem(html_file.stem), stem_to_key.get(html_file.stem, '')),
+                   html_file.name)
+            if executor is not None:
+                return executor.submit(traced_call, job)
+            future = Future()
+            with tracer.span(_parse_report_job.__qualname__, category='file', item=html_file.name):
+                future.set_result((_parse_report_job(job[1]), ([], {})))
+            return future
+
+        def run(index: int, subtree: List[FilePair]) -> None:
+            from src.converters.html_to_excel import HTMLToExcelConverter
+
+            if len(subtrees) == 1:
+                with tracer.span("DiffBackend run_winmerge"):
+                    normalized_base, normalized_latest = self._normalize_files(base, latest, pairs)
+                    self._run_winmerge(normalized_base, normalized_latest, output_html,
+                                       self._timeout(subtree), pipeline_token)
+                run_summary = HTMLToExcelConverter(cancel_token=pipeline_token).parse_summary_html(output_html)
+            else:
+                run_summary = self._run_subtree(base, latest, subtree, output_html_files / f"subtree{index}",
+                                                pipeline_token)
+            with summary_lock:
+                summary.header = run_summary.header
+                summary.entries.extend(run_summary.entries)
+            runs_done[index].set()
+
+        def produce() -> None:
+            try:
+                with ThreadPoolExecutor(max_workers=min(self._process_count(), len(subtrees))) as runs:
+                    try:
+                        run_futures = [runs.submit(run, index, subtree) for index, subtree in enumerate(subtrees)]
+                        seen = set()
+                        for stem in sorted(run_of_stem):
+                            html_file = output_html_files / f"{stem}.html"
+                            done = runs_done[run_of_stem[stem]]
+                            while True:
+                                for future in run_futures:
+                                    if future.done() and future.exception() is not None:
+                                        raise future.exception()
+                                finished = done.is_set()
+                                if html_file.exists() and (finished or self._report_complete(html_file)):
+                                    hand_off.put(parse(html_file))
+                                    seen.add(html_file.name)
+                                    break
+                                if finished:
+                                    break  # No report: identical text or binary
+                                pipeline_token.check()
+                                done.wait(config.winmerge.report_poll_interval)
+                        for future in run_futures:
+                            future.result()
+                    except BaseException:
+                        # Kill the WinMerge processes before waiting for their threads
+                        pipeline_token.cancel()
+                        raise
+
+                # Reports WinMerge named differently from the pre-scanned paths
+                for html_file in sorted(output_html_files.glob('**/*.html')):
+                    if html_file.name not in seen:
+                        hand_off.put(parse(html_file))
+                hand_off.close()
+            except BaseException as e:
+                pipeline_token.cancel()
+                hand_off.close(e)
+
+        self.log("Generating HTML report with WinMerge (reports are parsed as they are written)...")
+        producer = threading.Thread(target=produce, name='WinMergePipeline', daemon=True)
+        progress = ProgressLog(self.log, "Processed")
+        with self.cancel_token.on_cancel(pipeline_token.cancel):
+            producer.start()
+            try:
+                for future in hand_off:
+                    file_diff, (spans, counters) = future.result()
+                    tracer.merge(spans, counters)
+                    self.cancel_token.check()
+                    if file_diff is not None:
+                        yield file_diff
+                    progress.update()
+                progress.finish()
+                self.log("WinMerge HTML generation completed")
+            finally:
+                # The consumer stopped early (error, cancellation): stop the producer
+                if producer.is_alive():
+                    pipeline_token.cancel()
+                producer.join()
+                if executor is not None:
+                    executor.shutdown(cancel_futures=True)
+
+    @staticmethod
+    def _report_complete(html_file: Path) -> bool:
+        """Whether a report WinMerge may still be writing is complete (ends with '</html>')"""
+        try:
+            with open(html_file, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 64))
+                return f.read().rstrip().lower().endswith(b'</html>')
+        except OSError:
+            return False
+
+    def _parse_reports(self, output_html: Path, pairs: List[FilePair],
+                       summary: Optional[SummaryTable] = None) -> DiffResult:
+        """Parse summary (unless already merged from subtree runs) and per-file HTML reports into the row model"""
+        from src.converters.html_to_excel import HTMLToExcelConverter
+
+        if summary is None:
+            converter = HTMLToExcelConverter(log_callback=self.log, cancel_token=self.cancel_token)
+            summary = converter.parse_summary_html(output_html)
+        result = DiffResult(summary=summary)
+
+        output_html_files = output_html.with_name(output_html.stem + '.files')
+        html_files = sorted(output_html_files.glob('**/*.html'))
+        self.log(f"Processing {len(html_files)} diff HTML files...")
+
+        # Reports are named after the relative path with separators replaced by '_'
+        stem_to_key = {pair.key.replace('/', '_'): pair.key for pair in pairs}
+
+        jobs = []
+        for html_file in html_files:
+            # HTML file names follow pattern: folder1_folder2_..._filename.ext
+            filename = self.extract_filename_from_stem(html_file.stem)
+
+            logger.debug("HTML file: %s, stem: '%s', extracted filename: '%s'",
+                         html_file.name, html_file.stem, filename)
+            jobs.append((html_file, filename, stem_to_key.get(html_file.stem, '')))
+
+        result.files = self._iter_file_diffs(jobs)
+        return result
+
+    def _iter_file_diffs(self, jobs) -> Iterator[FileDiff]:
+        """Yield parsed per-file reports in sorted file order"""
+        # Parsing is independent per file; results come back in sorted file order
+        file_diffs = parallel_map(_parse_report_job, jobs, label=lambda job: job[0].name)
+        progress = ProgressLog(self.log, "Processed", len(jobs))
+        for file_diff in file_diffs:
+            self.cancel_token.check()
+            if file_diff is not None:
+                yield file_diff
+            progress.update()
+        progress.finish()
+
+    @staticmethod
+    def extract_filename_from_stem(stem: str) -> str:
+        """
+        Extract actual filename from HTML file stem.
+
+        HTML files from WinMerge use pattern: folder1_folder2_..._filename
+        We need to identify where the path ends and filename begins.
+
+        Strategy:
+        1. Look for file extension (contains '.')
+        2. Scan backwards from extension to find filename pattern
+        3. Consider common folder names (modules, ctrl, tool, etc.) as path components
+
+        Examples:
+            "modcommon_modules_SPM_SEQ_spm_tbl_rinse.t" -> "spm_tbl_rinse.t"
+            "sc2stb_ctrl_v4_LINK_CTRLA_SP3_2.l" -> "CTRLA_SP3_2.l"
+            "sc2stb_modules_SPM_tool_gui_Gui_Res_spm_en-US.rc" -> "spm_en-US.rc"
+            "sc2stb_etc_cset_file.SP3" -> "cset_file.SP3"
+        """
+        parts = stem.split('_')
+
+        # Common folder names that are NOT part of filenames
+        folder_keywords = {
+            'modules', 'ctrl', 'tool', 'gui', 'etc', 'src', 'include',
+            'lib', 'bin', 'obj', 'SEQ', 'u', 'v4', 'LINK', 'Res',
+            'modcommon', 'sc2stb', 'Gui'
+        }
+
+        # Find the extension position (last part with '.')
+        ext_index = -1
+        for i in range(len(parts) - 1, -1, -1):
+            if '.' in parts[i]:
+                ext_index = i
+                break
+
+        if ext_index == -1:
+            # No extension found, return last part
+            return parts[-1]
+
+        # Scan backwards from extension to find start of filename
+        # A filename typically starts after a known folder keyword
+        filename_start = 0
+
+        for i in range(ext_index, -1, -1):
+            part = parts[i]
+
+            # Check if this part is a folder keyword
+            if part in folder_keywords:
+                filename_start = i + 1
+                break
+
+            # If we reach the beginning, include from start
+            if i == 0:
+                filename_start = 0
+
+        # Special case: if filename_start is too close to extension,
+        # take at least 2 parts before extension
+        if ext_index - filename_start < 1:
+            filename_start = max(0, ext_index - 1)
+
+        # Build filename from identified parts
+        filename_parts = parts[filename_start:ext_index + 1]
+        filename = '_'.join(filename_parts)
+
+        return filename
+
+
+class NativeBackend(DiffBackend):
+    """Pure-Python diff backend (no WinMerge process, no HTML reports)"""
+
+    name = 'native'
+
+    def compare(self, base: Path, latest: Path, pairs: List[FilePair], output_html: Path) -> DiffResult:
+        pairs = [pair for pair in pairs if pair.needs_diff]
+        self.log(f"Comparing {len(pairs)} files with native diff engine...")
+
+        result = DiffResult()
+        result.files = self._iter_file_diffs(pairs, result)
+        return result
+
+    def _iter_file_diffs(self, pairs: List[FilePair], result: DiffResult) -> Iterator[FileDiff]:
+        """Diff pairs in order, adding Summary entries and yielding changed files"""
+        timer_DB.start(memo="native compare")
+
+        try:
+            results = parallel_map(NativeBackend.compare_pair, pairs, label=lambda pair: pair.key)
+            progress = ProgressLog(self.log, "Processed", len(pairs))
+            for entry, file_diff in results:
+                self.cancel_token.check()
+                result.summary.entries.append(entry)
+                if file_diff is not None:
+                    yield file_diff
+                progress.update()
+            progress.finish()
+        finally:
+            timer_DB.stop()
+
+    @staticmethod
+    def compare_pair(pair: FilePair, build: Callable[[List[str], List[str], FileDiff], FileDiff] = build_rows):
+        """
+        Compare one file pair and build its Summary entry and FileDiff (runs in worker processes)
+
+        Args:
+            pair: Pre-scanned file pair
+            build: Fills the empty FileDiff from the decoded left and right
+                lines (build_rows, or a windowed variant for oversize files)
+        """
+        name = pair.name
+        folder = SummaryEntry.display_folder(pair.folder)
+        left, right = pair.left, pair.right
+
+        if left is None or right is None:
+            result = 'Right only' if left is None else 'Left only'
+            return DiffBackend.summary_entry(name, folder, result, left, right), None
+
+        left_data = left.read_bytes()
+        right_data = right.read_bytes()
+        tracer.count('input bytes', len(left_data) + len(right_data))
+
+        if TextDecoder.looks_binary(left_data[:8192]) or TextDecoder.looks_binary(right_data[:8192]):
+            result = 'Binary files are identical' if left_data == right_data else 'Binary files are different'
+            return DiffBackend.summary_entry(name, folder, result, left, right), None
+
+        if left_data == right_data:
+            return DiffBackend.summary_entry(name, folder, 'Text files are identical', left, right), None
+
+        left_lines = NativeBackend._decode_lines(left_data, pair.left_hash)
+        right_lines = NativeBackend._decode_lines(right_data, pair.right_hash)
+        file_diff = build(left_lines, right_lines,
+                          FileDiff(name=name, header=DiffBackend.file_header(left, right), key=pair.key))
+        if not file_diff.hunks:
+            # Only line endings differ (WinMerge runs with IgnoreEol=1)
+            return DiffBackend.summary_entry(name, folder, 'Text files are identical', left, right), None
+
+        return DiffBackend.summary_entry(name, folder, 'Text files are different', left, right), file_diff
+
+    @staticmethod
+    def _decode_lines(data: bytes, digest: Optional[str] = None) -> List[str]:
+        """Decode file contents (BOM, UTF-8, falling back to CP932) and split into lines"""
+        return TextDecoder.decode(data, digest)[0].splitlines()
+
+
+def _parse_report_job(job) -> Optional[FileDiff]:
+    """Parse one per-file WinMerge report (runs in worker processes)"""
+    from src.converters.html_to_excel import HTMLToExcelConverter
+
+    html_file, filename, key = job
+    tracer.count('report bytes', html_file.stat().st_size)
+    file_diff = HTMLToExcelConverter().parse_diff_html(html_file, filename)
+    if file_diff is not None:
+        file_diff.key = key
+    return file_diff
+
+
+BACKENDS = {
+    WinMergeBackend.name: WinMergeBackend,
+    NativeBackend.name: NativeBackend,
+}
+
+
+def create_backend(name: str, log: Callable[[str], None], path_manager: PathManager,
+                   cancel_token: Optional[CancellationToken] = None) -> DiffBackend:
+    """Create the diff backend selected in config.winmerge.backend"""
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ConfigurationError(
+            f"Unknown diff backend: {name}",
+            f"Available backends: {', '.join(sorted(BACKENDS))}"
+        )
+    return backend_class(log, path_manager, cancel_token)
@@ -2,33 +2,59 @@
 """
 Diff detail sheet creator module
 """
+from dataclasses import replace
 from typing import List, Tuple
-from openpyxl.styles import Font, Color, PatternFill
-from openpyxl import load_workbook
+from openpyxl import Workbook
 from openpyxl.utils import column_index_from_string
 
 from .config import config
 from .utils import ExcelFormatter
+from .diffmodel import FileDiff
+from .sheetwriter import StreamingSheetWriter, BLANK_FILLS
+from .styles import Styles
+from .cancellation import CancellationToken
 from .common import Timer, logger
 
 timer_DDSC = Timer("DiffDetailSheetCreator")
 
+# Rows per worksheet in .xlsx
+EXCEL_MAX_ROWS = 1048576
+
 class DiffDetailSheetCreator:
-    """Creates detailed diff sheets from Excel workbook"""
+    """
+    Creates detailed diff sheets in an Excel workbook
+    
+    With a normal workbook, generate() builds the compare sheet from the
+    per-file sheets. With a write-only workbook, the compare sheet is streamed
+    instead: call add_file() for each file diff as its sheet is written.
     
-    def __init__(self, file_path: str, start_index: int = None, context_lines: int = None, sheet_name_to_filename: dict = None):
-        self.file_path = file_path
-        self.wb = load_workbook(self.file_path)
+    Diff rows come from the row model (FileDiff.hunks); cell fill colors
+    are only scanned for sheets missing from hunks_by_sheet.
+    """
+    
+    def __init__(self, wb: Workbook, start_index: int = None, context_lines: int = None, sheet_name_to_filename: dict = None,
+                 hunks_by_sheet: dict = None, cancel_token: CancellationToken = None):
+        self.wb = wb
         self.start_index = start_index or config.diff.sheet_start_index
         self.context_lines = context_lines or config.diff.context_lines
         self.detail_ws = self.wb.create_sheet(index=0, title='compare')
         self.row_cursor = 2
-        self.sheet_name_to_filename = sheet_name_to_filename or {}
+        # Keep the caller's dict: in write-only mode it is filled while streaming
+        self.sheet_name_to_filename = {} if sheet_name_to_filename is None else sheet_name_to_filename
+        self.hunks_by_sheet = hunks_by_sheet or {}
+        self.cancel_token = cancel_token or CancellationToken()
+        
+        self.stream = None
+        if self.wb.write_only:
+            self.stream = StreamingSheetWriter()
+            self.stream.start_diff_sheet(self.detail_ws)
+            self._pending_blank_rows = 0
+            self._detail_sheet_count = 1
         
-        logger.info(f"DiffDetailSheetCreator initialized for: {file_path}")
+        logger.info(f"DiffDetailSheetCreator initialized for {len(self.wb.worksheets)} worksheets")
 
     def generate(self) -> None:
-        """Generate detailed diff sheet"""
+        """Generate detailed diff sheet (the caller is responsible for saving the workbook)"""
         timer_DDSC.start(memo="generate")
         
         try:
@@ -36,14 +62,13 @@ class DiffDetailSheetCreator:
             logger.info(f"Processing {len(worksheets_to_process)} worksheets for compare sheet")
             
             for ws in worksheets_to_process:
-                logger.info(f"[DEBUG] Processing sheet: '{ws.title}'")
+                self.cancel_token.check()
                 file_name = self._extract_filename(ws.title)
-                logger.info(f"[DEBUG] Extracted filename: '{file_name}'")
+                logger.debug("Processing sheet: '%s' (file: '%s')", ws.title, file_name)
                 self._write_filename_label(file_name)
                 self._process_sheet(ws)
             
             ExcelFormatter.set_worksheet_format(self.detail_ws)
-            self.wb.save(self.file_path)
             logger.info("Diff detail sheet generation completed")
             
         except Exception as e:
@@ -52,47 +77,109 @@ class DiffDetailSheetCreator:
         finally:
             timer_DDSC.stop()
 
+    def add_file(self, sheet_name: str, file_diff: FileDiff, hyperlink: str = None) -> None:
+        """
+        Stream the diff blocks of one file into the write-only compare sheet
+        
+        Produces the same rows as generate() does for the file's sheet, with
+        diff rows taken from the row model instead of cell colors. When the
+        sheet reaches Excel's row limit, it continues in compare_2, compare_3...
+        
+        Args:
+            sheet_name: Name of the file's diff sheet
+            file_diff: Diff written to that sheet
+            hyperlink: Optional link target for the file name label
+        """
+        file_name = self._extract_filename(sheet_name)
+        self._write_filename_label(file_name, hyperlink)
+        
+        first_row = config.excel.diff_start_row
+        max_row = first_row + len(file_diff) - 1
+        diff_ranges = self._to_sheet_ranges(file_diff.hunks)
+        blocks = self._merge_diff_blocks(diff_ranges)
+        
+        logger.debug("Found %d diff ranges in %d blocks for sheet: %s", len(diff_ranges), len(blocks), sheet_name)
+        
+        for block_start, block_end in blocks:
+            for row in range(block_start, block_end + 1):
+                if row <= max_row:
+                    diff_row = file_diff.row(row - first_row)
+                    diff_row = replace(
+                        diff_row,
+                        left_fill=None if diff_row.left_fill in BLANK_FILLS else diff_row.left_fill,
+                        right_fill=None if diff_row.right_fill in BLANK_FILLS else diff_row.right_fill,
+                    )
+                    self._append_row(self.stream.diff_row(self.detail_ws, diff_row, Styles.font()))
+                else:
+                    # Context past the end of the file stays empty
+                    self._append_row(self.stream.diff_row(self.detail_ws, None, Styles.font(), line_no_fill=False))
+            self._pending_blank_rows += 2  # Add spacing between blocks
+        
+        self._pending_blank_rows += 2  # Add spacing after processing each file
+    
+    def _append_row(self, cells) -> None:
+        """Append a row to the write-only compare sheet, writing pending spacer rows first"""
+        for _ in range(self._pending_blank_rows):
+            self._emit_row(self.stream.diff_row(self.detail_ws, None, line_no_fill=False))
+        self._pending_blank_rows = 0
+        
+        self._emit_row(cells)
+    
+    def _emit_row(self, cells) -> None:
+        """Write a row, continuing on a new compare sheet past Excel's row limit"""
+        if self.row_cursor > EXCEL_MAX_ROWS:
+            self._detail_sheet_count += 1
+            title = f"compare_{self._detail_sheet_count}"
+            logger.warning(f"Compare sheet row limit reached, continuing in sheet: {title}")
+            self.detail_ws = self.wb.create_sheet(index=self.wb.index(self.detail_ws) + 1, title=title)
+            self.stream.start_diff_sheet(self.detail_ws)
+            self.row_cursor = 2
+        
+        self.detail_ws.append(cells)
+        self.row_cursor += 1
+
     def _extract_filename(self, sheet_name: str) -> str:
         """Extract filename from sheet name using mapping or fallback logic"""
-        logger.info(f"[DEBUG] _extract_filename input: '{sheet_name}'")
-        
         # First, try to use the mapping provided by WinMergeXlsx
         if sheet_name in self.sheet_name_to_filename:
-            filename = self.sheet_name_to_filename[sheet_name]
-            logger.info(f"[DEBUG] Found in mapping: '{sheet_name}' -> '{filename}'")
-            return filename
+            return self.sheet_name_to_filename[sheet_name]
         
         # Fallback: Extract from sheet name
         # Sheet name format: folder1_folder2_..._filename
         # Convert underscores to backslashes temporarily
         path_like = sheet_name.replace('_', '\\')
-        logger.info(f"[DEBUG] After underscore replacement: '{path_like}'")
         
         # Split by backslash and get the last component (filename)
         if '\\' in path_like:
-            result = path_like.split('\\')[-1]
-            logger.info(f"[DEBUG] Extracted last component: '{result}'")
-            return result
+            return path_like.split('\\')[-1]
         
         # If no backslash, return as-is (it's already just a filename)
-        logger.info(f"[DEBUG] No backslash found, returning as-is: '{sheet_name}'")
         return sheet_name
 
-    def _write_filename_label(self, file_name: str) -> None:
+    def _write_filename_label(self, file_name: str, hyperlink: str = None) -> None:
         """Write filename label in the detail sheet"""
+        if self.stream is not None:
+            cells = self.stream.diff_row(self.detail_ws, None, line_no_fill=False, label=file_name)
+            if hyperlink:
+                cells[0].hyperlink = hyperlink
+            self._append_row(cells)
+            return
+        
         cell = self.detail_ws.cell(row=self.row_cursor, column=1)
         cell.value = file_name
-        cell.font = Font(bold=True, size=12)
-        cell.fill = PatternFill(start_color='CCFFFF', end_color='CCFFFF', fill_type='solid')
+        Styles.apply(cell, font=Styles.font(bold=True, size=12), fill=Styles.fill('CCFFFF'))
         self.row_cursor += 1
 
     def _process_sheet(self, ws) -> None:
         """Process individual worksheet for diff detection"""
-        max_row = self._get_max_colored_row(ws)
-        diff_rows = self._detect_diff_rows(ws, max_row)
-        blocks = self._merge_diff_blocks(diff_rows)
+        if ws.title in self.hunks_by_sheet:
+            diff_ranges = self._to_sheet_ranges(self.hunks_by_sheet[ws.title])
+        else:
+            max_row = self._get_max_colored_row(ws)
+            diff_ranges = [(row, row) for row in self._detect_diff_rows(ws, max_row)]
+        blocks = self._merge_diff_blocks(diff_ranges)
 
-        logger.info(f"Found {len(diff_rows)} diff rows in {len(blocks)} blocks for sheet: {ws.title}")
+        logger.debug("Found %d diff ranges in %d blocks for sheet: %s", len(diff_ranges), len(blocks), ws.title)
 
         for block_start, block_end in blocks:
             self._copy_block(ws, block_start, block_end)
@@ -100,6 +187,12 @@ class DiffDetailSheetCreator:
 
         self.row_cursor += 2  # Add spacing after processing each sheet
 
+    @staticmethod
+    def _to_sheet_ranges(hunks: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Convert FileDiff hunks (end exclusive) to inclusive diff sheet row ranges (data starts at diff_start_row)"""
+        first_row = config.excel.diff_start_row
+        return [(first_row + start, first_row + end - 1) for start, end in hunks]
+
     def _get_max_colored_row(self, ws) -> int:
         """Find the maximum row with colored cells"""
         for row in reversed(range(1, ws.max_row + 1)):
@@ -137,24 +230,25 @@ class DiffDetailSheetCreator:
         
         # Log detected colors for debugging
         if unique_colors:
-            logger.info(f"[DEBUG] Sheet '{ws.title}' - Unique colors found: {unique_colors}")
-            logger.info(f"[DEBUG] Looking for color: '{yellow_color}'")
+            logger.debug("Sheet '%s' - Unique colors found: %s (looking for '%s')",
+                         ws.title, unique_colors, yellow_color)
         
         timer_DDSC.stop()
         return sorted(diff_rows)
 
-    def _merge_diff_blocks(self, diff_rows: List[int]) -> List[Tuple[int, int]]:
-        """Merge adjacent diff rows into blocks with context"""
+    def _merge_diff_blocks(self, diff_ranges: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
+        """Merge sorted ranges of diff rows into blocks with context"""
         timer_DDSC.start(memo="merge_diff_blocks")
         
-        if not diff_rows:
+        if not diff_ranges:
+            timer_DDSC.stop()
             return []
 
         # Create ranges with context
         ranges = []
-        for row in diff_rows:
-            start = max(row - self.context_lines, config.excel.diff_start_row)
-            end = row + self.context_lines
+        for first, last in diff_ranges:
+            start = max(first - self.context_lines, config.excel.diff_start_row)
+            end = last + self.context_lines
             ranges.append((start, end))
 
         # Merge overlapping ranges
@@ -185,31 +279,22 @@ class DiffDetailSheetCreator:
                 target.value = source.value
 
                 # Copy font with color
+                font = Styles.font()
                 if source.font and source.font.color:
                     font_color = getattr(source.font.color, 'rgb', None)
                     if font_color and isinstance(font_color, str) and font_color not in ('00000000', '0'):
-                        target.font = Font(color=Color(rgb=font_color))
-                    else:
-                        target.font = Font()
-                else:
-                    target.font = Font()
+                        font = Styles.font(color=font_color)
 
                 # Copy fill color (only if it's actually colored, not white or black)
+                # and use no fill (white background) otherwise
+                fill = Styles.fill()
                 if source.fill and source.fill.start_color:
                     fill_color = getattr(source.fill.start_color, 'rgb', None)
                     # Check if fill color is valid and not default colors
                     if fill_color and isinstance(fill_color, str) and fill_color not in ('FFFFFFFF', '00000000', 'FFFFFF', '000000'):
-                        target.fill = PatternFill(
-                            start_color=fill_color, 
-                            end_color=fill_color, 
-                            fill_type='solid'
-                        )
-                    else:
-                        # No fill (white background)
-                        target.fill = PatternFill(fill_type=None)
-                else:
-                    # No fill (white background)
-                    target.fill = PatternFill(fill_type=None)
+                        fill = Styles.fill(fill_color)
+
+                Styles.apply(target, font=font, fill=fill)
 
             self.row_cursor += 1
 
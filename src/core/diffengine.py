@@ -0,0 +1,299 @@
+# -*- coding: UTF-8 -*-
+"""
+Pure-Python line diff engine (patience anchoring + Myers O(ND) diff)
+"""
+import bisect
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from .config import config
+from .diffmodel import DiffRow, FileDiff
+
+# difflib-style opcode: (tag, i1, i2, j1, j2)
+Opcode = Tuple[str, int, int, int, int]
+
+
+def _intern_lines(a: Sequence[Hashable], b: Sequence[Hashable]) -> Tuple[List[int], List[int]]:
+    """Map lines to small integers so comparisons in the hot loops are cheap"""
+    ids: Dict[Hashable, int] = {}
+    a_ids = [ids.setdefault(line, len(ids)) for line in a]
+    b_ids = [ids.setdefault(line, len(ids)) for line in b]
+    return a_ids, b_ids
+
+
+def _myers(a: List[int], a_lo: int, a_hi: int, b: List[int], b_lo: int, b_hi: int,
+           max_cost: int) -> List[str]:
+    """
+    Myers greedy O(ND) diff of a[a_lo:a_hi] against b[b_lo:b_hi]
+
+    Returns:
+        Edit script as a list of '=', '-' (delete from a) and '+' (insert from b).
+        If the edit distance exceeds max_cost, the whole range is reported as
+        delete + insert instead of searching further.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    max_d = min(n + m, max_cost)
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)
+    trace = []
+
+    found = False
+    for d in range(max_d + 1):
+        # Snapshot of k in [-d-1, d+1] before this step, used for backtracking
+        trace.append(v[offset - d - 1:offset + d + 2])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[a_lo + x] == b[b_lo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                found = True
+                break
+        if found:
+            break
+
+    if not found:
+        return ['-'] * n + ['+'] * m
+
+    script: List[str] = []
+    x, y = n, m
+    for d in range(len(trace) - 1, -1, -1):
+        snapshot = trace[d]
+        k = x - y
+        if k == -d or (k != d and snapshot[k - 1 + d + 1] < snapshot[k + 1 + d + 1]):
+            prev_k = k + 1
+        else:
+            prev_k = k - 1
+        prev_x = snapshot[prev_k + d + 1]
+        prev_y = prev_x - prev_k
+        while x > prev_x and y > prev_y:
+            script.append('=')
+            x -= 1
+            y -= 1
+        if d > 0:
+            script.append('-' if x > prev_x else '+')
+        x, y = prev_x, prev_y
+
+    script.reverse()
+    return script
+
+
+def _unique_anchors(a: List[int], a_lo: int, a_hi: int,
+                    b: List[int], b_lo: int, b_hi: int) -> List[Tuple[int, int]]:
+    """Patience anchors: longest increasing run of lines unique in both ranges"""
+    counts: Dict[int, List[int]] = {}
+    for i in range(a_lo, a_hi):
+        entry = counts.setdefault(a[i], [0, 0, i])
+        entry[0] += 1
+    for j in range(b_lo, b_hi):
+        entry = counts.get(b[j])
+        if entry is not None:
+            entry[1] += 1
+            entry.append(j)
+
+    pairs = sorted(
+        (entry[2], entry[3]) for entry in counts.values()
+        if entry[0] == 1 and entry[1] == 1
+    )
+    if not pairs:
+        return []
+
+    # Longest increasing subsequence on the b indices (patience sorting)
+    tails: List[int] = []
+    tail_idx: List[int] = []
+    prev: List[int] = [-1] * len(pairs)
+    for idx, (_, j) in enumerate(pairs):
+        lo, hi = 0, len(tails)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if tails[mid] < j:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo > 0:
+            prev[idx] = tail_idx[lo - 1]
+        if lo == len(tails):
+            tails.append(j)
+            tail_idx.append(idx)
+        else:
+            tails[lo] = j
+            tail_idx[lo] = idx
+
+    anchors = []
+    idx = tail_idx[-1] if tail_idx else -1
+    while idx >= 0:
+        anchors.append(pairs[idx])
+        idx = prev[idx]
+    anchors.reverse()
+    return anchors
+
+
+def _diff_range(a: List[int], a_lo: int, a_hi: int, b: List[int], b_lo: int, b_hi: int,
+                max_cost: int, script: List[str]) -> None:
+    """Append the edit script for a[a_lo:a_hi] vs b[b_lo:b_hi] to script"""
+    # Trim common prefix and suffix
+    while a_lo < a_hi and b_lo < b_hi and a[a_lo] == b[b_lo]:
+        script.append('=')
+        a_lo += 1
+        b_lo += 1
+    suffix = 0
+    while a_lo < a_hi and b_lo < b_hi and a[a_hi - 1] == b[b_hi - 1]:
+        suffix += 1
+        a_hi -= 1
+        b_hi -= 1
+
+    if a_lo == a_hi or b_lo == b_hi:
+        script.extend(['-'] * (a_hi - a_lo))
+        script.extend(['+'] * (b_hi - b_lo))
+    else:
+        anchors = _unique_anchors(a, a_lo, a_hi, b, b_lo, b_hi)
+        if anchors:
+            for i, j in anchors:
+                _diff_range(a, a_lo, i, b, b_lo, j, max_cost, script)
+                script.append('=')
+                a_lo, b_lo = i + 1, j + 1
+            _diff_range(a, a_lo, a_hi, b, b_lo, b_hi, max_cost, script)
+        else:
+            script.extend(_myers(a, a_lo, a_hi, b, b_lo, b_hi, max_cost))
+
+    script.extend(['='] * suffix)
+
+
+def diff_opcodes(a: Sequence[Hashable], b: Sequence[Hashable], max_cost: int = None) -> List[Opcode]:
+    """
+    Compute difflib-compatible opcodes between two line sequences
+
+    Args:
+        a: Left (base) lines
+        b: Right (latest) lines
+        max_cost: Edit distance limit per Myers search (defaults to config)
+
+    Returns:
+        List of (tag, i1, i2, j1, j2) with tags 'equal', 'replace', 'delete', 'insert'
+    """
+    if max_cost is None:
+        max_cost = config.diff.max_edit_cost
+
+    a_ids, b_ids = _intern_lines(a, b)
+    script: List[str] = []
+    _diff_range(a_ids, 0, len(a_ids), b_ids, 0, len(b_ids), max_cost, script)
+
+    opcodes: List[Opcode] = []
+    i = j = 0
+    pos = 0
+    while pos < len(script):
+        if script[pos] == '=':
+            start = pos
+            while pos < len(script) and script[pos] == '=':
+                pos += 1
+            count = pos - start
+            opcodes.append(('equal', i, i + count, j, j + count))
+            i += count
+            j += count
+        else:
+            deleted = inserted = 0
+            while pos < len(script) and script[pos] != '=':
+                if script[pos] == '-':
+                    deleted += 1
+                else:
+                    inserted += 1
+                pos += 1
+            tag = 'replace' if deleted and inserted else ('delete' if deleted else 'insert')
+            opcodes.append((tag, i, i + deleted, j, j + inserted))
+            i += deleted
+            j += inserted
+    return opcodes
+
+
+def build_rows(left_lines: Sequence[str], right_lines: Sequence[str], file_diff: FileDiff) -> FileDiff:
+    """
+    Append side-by-side diff rows with the same layout as WinMerge reports to file_diff
+
+    Changed lines are filled with the WinMerge diff color and the missing
+    side of an added/removed line with the WinMerge "deleted" color.
+    """
+    changed_fill = config.diff.yellow_color
+    missing_fill = config.diff.missing_color
+    append = file_diff.append
+
+    for tag, i1, i2, j1, j2 in diff_opcodes(left_lines, right_lines):
+        if tag == 'equal':
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                append(i + 1, left_lines[i], j + 1, right_lines[j])
+            continue
+
+        for offset in range(max(i2 - i1, j2 - j1)):
+            i = i1 + offset
+            j = j1 + offset
+            has_left = i < i2
+            has_right = j < j2
+            append(
+                i + 1 if has_left else None,
+                left_lines[i] if has_left else '',
+                j + 1 if has_right else None,
+                right_lines[j] if has_right else '',
+                True,
+                changed_fill if has_left else missing_fill,
+                changed_fill if has_right else missing_fill,
+            )
+    return file_diff
+
+
+class DiffRows:
+    """
+    Side-by-side rows of a line diff, built on demand from its opcodes
+
+    Row i is the row build_rows would append i-th, but only the lines, the
+    opcodes and the first row of each opcode are held, so callers that keep
+    a few rows of a long diff (see FileClassifier.window) never build the
+    others. Offers the parts of the FileDiff interface they read: len(),
+    row() and hunks.
+    """
+
+    def __init__(self, left_lines: Sequence[str], right_lines: Sequence[str],
+                 opcodes: Optional[List[Opcode]] = None):
+        self.left_lines = left_lines
+        self.right_lines = right_lines
+        self.opcodes = diff_opcodes(left_lines, right_lines) if opcodes is None else opcodes
+        self.hunks: List[Tuple[int, int]] = []
+        self._starts: List[int] = []  # First row of each opcode
+
+        row = 0
+        for tag, i1, i2, j1, j2 in self.opcodes:
+            self._starts.append(row)
+            count = i2 - i1 if tag == 'equal' else max(i2 - i1, j2 - j1)
+            if tag != 'equal':
+                self.hunks.append((row, row + count))
+            row += count
+        self._row_count = row
+
+    def __len__(self) -> int:
+        return self._row_count
+
+    def row(self, index: int) -> DiffRow:
+        """Build one row (same numbers, texts and fills as build_rows)"""
+        position = bisect.bisect_right(self._starts, index) - 1
+        tag, i1, i2, j1, j2 = self.opcodes[position]
+        i = i1 + index - self._starts[position]
+        j = j1 + index - self._starts[position]
+        if tag == 'equal':
+            return DiffRow(i + 1, self.left_lines[i], j + 1, self.right_lines[j])
+
+        has_left = i < i2
+        has_right = j < j2
+        changed_fill = config.diff.yellow_color
+        missing_fill = config.diff.missing_color
+        return DiffRow(
+            i + 1 if has_left else None,
+            self.left_lines[i] if has_left else '',
+            j + 1 if has_right else None,
+            self.right_lines[j] if has_right else '',
+            True,
+            changed_fill if has_left else missing_fill,
+            changed_fill if has_right else missing_fill,
+        )
@@ -0,0 +1,243 @@
+# -*- coding: UTF-8 -*-
+"""
+Row model shared by diff backends, converters and sheet writers
+"""
+from array import array
+from collections.abc import Sequence
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+
+# Default Summary columns (same order as the WinMerge folder compare report)
+SUMMARY_HEADER = ['Filename', 'Folder', 'Comparison result', 'Left Date', 'Right Date', 'Extension']
+# 0-based Summary columns of the file name, folder and comparison result
+SUMMARY_NAME_COL = 0
+SUMMARY_FOLDER_COL = 1
+SUMMARY_RESULT_COL = 2
+
+
+@dataclass
+class DiffRow:
+    """Single aligned row of a side-by-side file diff"""
+    left_no: Optional[int]
+    left_text: str
+    right_no: Optional[int]
+    right_text: str
+    changed: bool = False
+    left_fill: Optional[str] = None
+    right_fill: Optional[str] = None
+
+
+# Row change kinds (FileDiff.kinds)
+UNCHANGED = 0
+MODIFIED = 1  # Changed, with a line on both sides
+DELETED = 2   # Changed, left side only
+ADDED = 3     # Changed, right side only
+
+# Stored line number of a side without a line (line numbers start at 1)
+NO_LINE = 0
+
+
+class FileDiff:
+    """
+    Side-by-side diff of one file pair, stored column-wise
+
+    Line numbers are kept in array('i'), change kinds and fill colors in
+    small integer arrays (fill colors index the palette) and the texts in
+    two lists whose equal strings share one object, so a row costs a few
+    bytes plus its texts instead of a DiffRow object. Pickling sends the
+    arrays as raw bytes and every distinct text once, which keeps process
+    pool transfers and cache entries cheap.
+
+    hunks holds the (start, end) index ranges (end exclusive) of the runs of
+    changed rows, so consumers can find the diff blocks without scanning
+    every row. Add rows with append() or add_row() to keep it up to date;
+    rows is a read-only sequence of DiffRow views for the writers.
+    """
+
+    __slots__ = ('name', 'header', 'key', 'left_nos', 'right_nos', 'left_texts', 'right_texts',
+                 'kinds', 'left_fills', 'right_fills', 'palette', 'hunks', '_strings', '_fill_index')
+
+    def __init__(self, name: str, rows: Iterable[DiffRow] = (), header: Optional[List[str]] = None,
+                 key: str = ''):
+        self.name = name
+        self.header = header if header is not None else ['', '', '', '']
+        self.key = key  # Relative path (posix style) of the compared pair, if known
+        self.left_nos = array('i')
+        self.right_nos = array('i')
+        self.left_texts: List[str] = []
+        self.right_texts: List[str] = []
+        self.kinds = bytearray()
+        self.left_fills = array('H')
+        self.right_fills = array('H')
+        self.palette: List[Optional[str]] = [None]  # Fill colors; index 0 is no fill
+        self.hunks: List[Tuple[int, int]] = []
+        self._strings: Dict[str, str] = {}
+        self._fill_index: Dict[Optional[str], int] = {None: 0}
+        for row in rows:
+            self.add_row(row)
+
+    def __len__(self) -> int:
+        return len(self.kinds)
+
+    def __repr__(self) -> str:
+        return f"FileDiff(name={self.name!r}, key={self.key!r}, rows={len(self)}, hunks={len(self.hunks)})"
+
+    def __getstate__(self):
+        # The lookup tables only serve append(): the text one starts over, the fill one is rebuilt
+        return (self.name, self.header, self.key, self.left_nos, self.right_nos, self.left_texts,
+                self.right_texts, self.kinds, self.left_fills, self.right_fills, self.palette, self.hunks)
+
+    def __setstate__(self, state):
+        (self.name, self.header, self.key, self.left_nos, self.right_nos, self.left_texts,
+         self.right_texts, self.kinds, self.left_fills, self.right_fills, self.palette, self.hunks) = state
+        self._strings = {}
+        self._fill_index = {color: index for index, color in enumerate(self.palette)}
+
+    def append(self, left_no: Optional[int], left_text: str, right_no: Optional[int], right_text: str,
+               changed: bool = False, left_fill: Optional[str] = None, right_fill: Optional[str] = None) -> None:
+        """Append a row, extending the hunk index if it is changed"""
+        index = len(self.kinds)
+        if changed:
+            if left_no is None and right_no is not None:
+                kind = ADDED
+            elif right_no is None and left_no is not None:
+                kind = DELETED
+            else:
+                kind = MODIFIED
+            if self.hunks and self.hunks[-1][1] == index:
+                self.hunks[-1] = (self.hunks[-1][0], index + 1)
+            else:
+                self.hunks.append((index, index + 1))
+        else:
+            kind = UNCHANGED
+
+        strings = self._strings
+        fill_index = self._fill_index
+        self.left_nos.append(NO_LINE if left_no is None else left_no)
+        self.right_nos.append(NO_LINE if right_no is None else right_no)
+        self.left_texts.append(strings.setdefault(left_text, left_text))
+        self.right_texts.append(strings.setdefault(right_text, right_text))
+        self.kinds.append(kind)
+        self.left_fills.append(fill_index[left_fill] if left_fill in fill_index else self._add_fill(left_fill))
+        self.right_fills.append(fill_index[right_fill] if right_fill in fill_index else self._add_fill(right_fill))
+
+    def add_row(self, row: DiffRow) -> None:
+        """Append a DiffRow"""
+        self.append(row.left_no, row.left_text, row.right_no, row.right_text,
+                    row.changed, row.left_fill, row.right_fill)
+
+    def row(self, index: int) -> DiffRow:
+        """Build the DiffRow view of one row"""
+        left_no = self.left_nos[index]
+        right_no = self.right_nos[index]
+        return DiffRow(
+            left_no=left_no if left_no != NO_LINE else None,
+            left_text=self.left_texts[index],
+            right_no=right_no if right_no != NO_LINE else None,
+            right_text=self.right_texts[index],
+            changed=self.kinds[index] != UNCHANGED,
+            left_fill=self.palette[self.left_fills[index]],
+            right_fill=self.palette[self.right_fills[index]],
+        )
+
+    @property
+    def rows(self) -> 'FileDiffRows':
+        """Rows as a sequence of DiffRow (built on access)"""
+        return FileDiffRows(self)
+
+    def _add_fill(self, fill: str) -> int:
+        """Add a fill color to the palette and return its index"""
+        index = len(self.palette)
+        self.palette.append(fill)
+        self._fill_index[fill] = index
+        return index
+
+
+class FileDiffRows(Sequence):
+    """Read-only DiffRow sequence over the columns of a FileDiff"""
+
+    __slots__ = ('file_diff',)
+
+    def __init__(self, file_diff: FileDiff):
+        self.file_diff = file_diff
+
+    def __len__(self) -> int:
+        return len(self.file_diff)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.file_diff.row(idx) for idx in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('row index out of range')
+        return self.file_diff.row(index)
+
+    def __iter__(self) -> Iterator[DiffRow]:
+        file_diff = self.file_diff
+        palette = file_diff.palette
+        columns = zip(file_diff.left_nos, file_diff.left_texts, file_diff.right_nos, file_diff.right_texts,
+                      file_diff.kinds, file_diff.left_fills, file_diff.right_fills)
+        for left_no, left_text, right_no, right_text, kind, left_fill, right_fill in columns:
+            # NO_LINE is 0, so 'or None' restores the missing line numbers
+            yield DiffRow(left_no or None, left_text, right_no or None, right_text,
+                          kind != UNCHANGED, palette[left_fill], palette[right_fill])
+
+
+@dataclass
+class SummaryEntry:
+    """Single file row of the Summary sheet"""
+    cells: List[str]
+    fills: List[Optional[str]] = field(default_factory=list)
+
+    @property
+    def name(self) -> str:
+        return self._cell(SUMMARY_NAME_COL)
+
+    @property
+    def folder(self) -> str:
+        return self._cell(SUMMARY_FOLDER_COL)
+
+    @property
+    def result(self) -> str:
+        return self._cell(SUMMARY_RESULT_COL)
+
+    @property
+    def key(self) -> str:
+        """Relative path of the file (posix style), matching FilePair.key"""
+        folder = self.folder.replace('\\', '/')
+        return f"{folder}/{self.name}" if folder else self.name
+
+    @staticmethod
+    def display_folder(folder: str) -> str:
+        """Folder cell text of a relative folder: '\\'-separated as in WinMerge reports, on every host"""
+        return folder.replace('/', '\\')
+
+    def normalize_folder(self) -> None:
+        """Rewrite the folder cell with display_folder (entries parsed from reports keep WinMerge's text)"""
+        if len(self.cells) > SUMMARY_FOLDER_COL:
+            self.cells[SUMMARY_FOLDER_COL] = self.display_folder(self.folder)
+
+    def _cell(self, index: int) -> str:
+        return self.cells[index] if index < len(self.cells) else ''
+
+
+@dataclass
+class SummaryTable:
+    """Summary sheet contents: column headers and one entry per file"""
+    header: List[str] = field(default_factory=lambda: list(SUMMARY_HEADER))
+    entries: List[SummaryEntry] = field(default_factory=list)
+
+
+@dataclass
+class DiffResult:
+    """
+    Output of a diff backend: Summary table plus per-file diffs
+
+    files may be a lazy iterator that produces each FileDiff as it is parsed
+    or diffed; consume it once, in order. Backends may keep adding Summary
+    entries until it is exhausted.
+    """
+    summary: SummaryTable = field(default_factory=SummaryTable)
+    files: Iterable[FileDiff] = field(default_factory=list)
@@ -0,0 +1,109 @@
+# -*- coding: UTF-8 -*-
+"""
+Text encoding detection and decoding for trees mixing UTF-8 and Shift-JIS (CP932) files
+"""
+import codecs
+from typing import Optional, Tuple
+
+from .common import BoundedCache
+
+# Byte order marks, longest first (Python codec names)
+BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Encoding of files without a BOM that are not valid UTF-8
+FALLBACK_ENCODING = 'cp932'
+
+# Content hashes whose encoding is remembered per process
+ENCODING_CACHE_SIZE = 65536
+
+
+class TextDecoder:
+    """
+    Detects the encoding of a file and decodes it in one bulk call
+
+    Detection order: byte order mark, then UTF-8 (a strict decode, which
+    validates and decodes in the same pass), then CP932. The encoding that
+    decoded a file is kept by content hash, so content seen before (the
+    same file in another comparison, duplicated files) is decoded directly
+    without trying UTF-8 first (up to ENCODING_CACHE_SIZE recently used
+    hashes).
+    """
+
+    _encoding_by_hash = BoundedCache(ENCODING_CACHE_SIZE)
+
+    @staticmethod
+    def bom_encoding(data: bytes) -> Optional[str]:
+        """Encoding announced by a byte order mark at the start of data, if any"""
+        for bom, encoding in BOMS:
+            if data.startswith(bom):
+                return encoding
+        return None
+
+    @staticmethod
+    def looks_binary(head: bytes) -> bool:
+        """Whether the head of a file holds a NUL byte and no BOM (UTF-16 text is full of NULs)"""
+        return b'\0' in head and TextDecoder.bom_encoding(head) is None
+
+    @staticmethod
+    def sniff(head: bytes, truncated: bool = False) -> Optional[str]:
+        """
+        Guess the encoding from the head of a file
+
+        Args:
+            head: First bytes of the file
+            truncated: Whether the file goes on after head (its last
+                character may be cut off)
+
+        Returns:
+            Encoding, or None when head is neither UTF-8 nor CP932 text
+        """
+        encoding = TextDecoder.bom_encoding(head)
+        if encoding is not None:
+            return encoding
+
+        for encoding in ('utf-8', FALLBACK_ENCODING):
+            try:
+                head.decode(encoding)
+                return encoding
+            except UnicodeDecodeError as e:
+                # Only the last, cut-off character failed
+                if truncated and e.start >= len(head) - 3 and e.reason in ('unexpected end of data',
+                                                                           'incomplete multibyte sequence'):
+                    return encoding
+        return None
+
+    @staticmethod
+    def decode(data: bytes, digest: Optional[str] = None) -> Tuple[str, str]:
+        """
+        Decode whole file contents
+
+        Args:
+            data: File contents
+            digest: Content hash of the file, if known (caches the encoding)
+
+        Returns:
+            Decoded text (BOM removed; undecodable CP932 bytes replaced) and its encoding
+        """
+        encoding = None
+        if digest is not None:
+            encoding = TextDecoder._encoding_by_hash.get(digest)
+        if encoding is None:
+            encoding = TextDecoder.bom_encoding(data)
+
+        if encoding is not None:
+            text = data.decode(encoding, errors='replace')
+        else:
+            try:
+                text = data.decode('utf-8')
+                encoding = 'utf-8'
+            except UnicodeDecodeError:
+                encoding = FALLBACK_ENCODING
+                text = data.decode(encoding, errors='replace')
+
+        if digest is not None:
+            TextDecoder._encoding_by_hash.put(digest, encoding)
+        return text, encoding
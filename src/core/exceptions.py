@@ -42,3 +42,8 @@ class ValidationError(WinMergeDiffExporterError):
 class ConfigurationError(WinMergeDiffExporterError):
     """Raised when configuration is invalid"""
     pass
+
+
+class OperationCancelledError(WinMergeDiffExporterError):
+    """Raised when the user cancels a running comparison"""
+    pass
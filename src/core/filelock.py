@@ -0,0 +1,96 @@
+# -*- coding: UTF-8 -*-
+"""
+Cheap detection of output files held open by another program
+"""
+import os
+from pathlib import Path
+from typing import List, Optional
+
+from .common import logger
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+
+class FileLockProbe:
+    """
+    Tells in milliseconds whether a file is held open by another program
+
+    Instead of listing the open files of every process, the probe looks at
+    the target itself: an owner file next to it (Excel's ~$name,
+    LibreOffice's .~lock.name#), an open for writing (denied on Windows while
+    Excel has the file open) and, on POSIX, a non-blocking exclusive flock.
+    The psutil process scan (find_holder) is an opt-in diagnostic.
+    """
+
+    @staticmethod
+    def owner_files(path: Path) -> List[Path]:
+        """Owner file names spreadsheet programs create next to an open document"""
+        name = path.name
+        # Excel prefixes '~$', replacing the first two characters of longer names
+        names = [f"~${name}", f"~${name[2:]}", f".~lock.{name}#"]
+        return [path.with_name(owner) for owner in dict.fromkeys(names)]
+
+    @staticmethod
+    def probe(path: Path) -> Optional[str]:
+        """
+        Check whether a file is in use
+
+        Returns:
+            Why the file looks locked, or None when it is free or does not exist
+        """
+        path = Path(path)
+        for owner in FileLockProbe.owner_files(path):
+            if owner.exists():
+                return f"owner file {owner.name} exists"
+
+        try:
+            fd = os.open(path, os.O_RDWR | getattr(os, 'O_BINARY', 0))
+        except FileNotFoundError:
+            return None
+        except PermissionError:
+            return "opening for writing was denied"
+        except OSError as e:
+            logger.debug("Lock probe of %s failed: %s", path, e)
+            return None
+
+        try:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    fcntl.flock(fd, fcntl.LOCK_UN)
+                except BlockingIOError:
+                    return "locked by another process"
+        finally:
+            os.close(fd)
+        return None
+
+    @staticmethod
+    def find_holder(path: Path) -> Optional[int]:
+        """
+        Find an Excel process with the file open (slow: lists every process's open files)
+
+        Returns:
+            PID of the process, or None if none was found or psutil is not installed
+        """
+        try:
+            import psutil
+        except ImportError:
+            logger.debug("psutil not available, skipping Excel process check")
+            return None
+
+        target = str(path).lower()
+        try:
+            for proc in psutil.process_iter(['pid', 'name', 'open_files']):
+                try:
+                    if proc.info['name'] and 'excel' in proc.info['name'].lower():
+                        for file in proc.info['open_files'] or []:
+                            if target in file.path.lower():
+                                return proc.info['pid']
+                except (psutil.NoSuchProcess, psutil.AccessDenied):
+                    continue
+        except Exception as e:
+            logger.warning(f"Error checking Excel processes: {e}")
+        return None
@@ -0,0 +1,155 @@
+# -*- coding: UTF-8 -*-
+"""
+Intraline (word/character level) change highlighting for changed line pairs
+"""
+import re
+from difflib import SequenceMatcher
+from functools import lru_cache
+from typing import List, Optional, Tuple, Union
+
+from openpyxl.cell.rich_text import CellRichText, TextBlock
+from openpyxl.cell.text import InlineFont
+from openpyxl.utils import column_index_from_string
+
+from .config import config
+from .diffmodel import DiffRow
+
+# Words, runs of whitespace and single punctuation characters
+TOKEN_PATTERN = re.compile(r'\w+|\s+|[^\w\s]')
+
+Spans = Tuple[Tuple[int, int], ...]  # (start, end) character ranges
+
+# Line pairs whose spans are kept (lines repeat between file and compare sheets)
+SPAN_CACHE_SIZE = 16384
+
+# Token multiset similarity (SequenceMatcher.quick_ratio, linear time) below which
+# the changed middle part is highlighted as a whole instead of token by token
+MIN_SIMILARITY = 0.5
+
+
+class IntralineDiff:
+    """
+    Finds the changed parts of a modified line pair and renders them as rich text
+
+    The cost is bounded: the common prefix and suffix are stripped first,
+    pairs longer than config.intraline.max_line_length are not diffed, and
+    when the token diff would exceed config.intraline.max_cost comparisons or
+    the lines are mostly rewritten, the whole middle part is reported as one
+    changed span. Results are cached
+    by line pair, so a line rendered in both its file sheet and the compare
+    sheet is diffed once.
+    """
+
+    @staticmethod
+    def changed_spans(left: str, right: str) -> Optional[Tuple[Spans, Spans]]:
+        """Changed character ranges of left and right, or None above the line length limit"""
+        settings = config.intraline
+        return IntralineDiff.compute_spans(left, right, settings.max_line_length, settings.max_cost)
+
+    @staticmethod
+    @lru_cache(maxsize=SPAN_CACHE_SIZE)
+    def compute_spans(left: str, right: str, max_line_length: int, max_cost: int) -> Optional[Tuple[Spans, Spans]]:
+        """Span computation behind changed_spans (cached by line pair and limits)"""
+        if len(left) + len(right) > max_line_length:
+            return None
+
+        prefix = 0
+        limit = min(len(left), len(right))
+        while prefix < limit and left[prefix] == right[prefix]:
+            prefix += 1
+        suffix = 0
+        limit -= prefix
+        while suffix < limit and left[-1 - suffix] == right[-1 - suffix]:
+            suffix += 1
+
+        left_mid = left[prefix:len(left) - suffix]
+        right_mid = right[prefix:len(right) - suffix]
+        if not left_mid or not right_mid:
+            return IntralineDiff._span(prefix, left_mid), IntralineDiff._span(prefix, right_mid)
+
+        left_tokens = TOKEN_PATTERN.findall(left_mid)
+        right_tokens = TOKEN_PATTERN.findall(right_mid)
+        if len(left_tokens) * len(right_tokens) > max_cost:
+            # Approximate: everything between the common prefix and suffix
+            return IntralineDiff._span(prefix, left_mid), IntralineDiff._span(prefix, right_mid)
+
+        left_offsets = IntralineDiff._offsets(left_tokens, prefix)
+        right_offsets = IntralineDiff._offsets(right_tokens, prefix)
+        left_spans: List[Tuple[int, int]] = []
+        right_spans: List[Tuple[int, int]] = []
+
+        matcher = SequenceMatcher(None, left_tokens, right_tokens, autojunk=False)
+        if matcher.quick_ratio() < MIN_SIMILARITY:
+            # Mostly rewritten: token spans would highlight nearly everything anyway
+            return IntralineDiff._span(prefix, left_mid), IntralineDiff._span(prefix, right_mid)
+
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            if tag == 'equal':
+                continue
+            if i1 < i2:
+                IntralineDiff._add_span(left_spans, left_offsets[i1], left_offsets[i2])
+            if j1 < j2:
+                IntralineDiff._add_span(right_spans, right_offsets[j1], right_offsets[j2])
+
+        return tuple(left_spans), tuple(right_spans)
+
+    @staticmethod
+    def rich_text(text: str, spans: Spans, font: InlineFont) -> Union[str, CellRichText]:
+        """Render text with the spans in the highlight font (plain text when nothing is highlighted)"""
+        if not spans:
+            return text
+
+        parts = []
+        position = 0
+        for start, end in spans:
+            if start > position:
+                parts.append(text[position:start])
+            parts.append(TextBlock(font, text[start:end]))
+            position = end
+        if position < len(text):
+            parts.append(text[position:])
+        return CellRichText(parts)
+
+    @staticmethod
+    def highlight_fonts() -> Tuple[InlineFont, InlineFont]:
+        """Bold highlight-color fonts for the left (B) and right (D) text columns, keeping their code fonts"""
+        names = {column_index_from_string(fmt['col']): fmt.get('font') for fmt in config.diff_formats['code']}
+        return tuple(InlineFont(rFont=names.get(col_idx), b=True, color=config.intraline.color) for col_idx in (2, 4))
+
+    @staticmethod
+    def render(row: DiffRow, fonts: Tuple[InlineFont, InlineFont]):
+        """
+        Get the (left, right) cell values of a diff row
+
+        Modified line pairs (changed, text on both sides) get rich text with
+        their changed spans highlighted; other rows keep their plain texts.
+        """
+        if not (config.intraline.enabled and row.changed and row.left_text and row.right_text):
+            return row.left_text, row.right_text
+
+        spans = IntralineDiff.changed_spans(row.left_text, row.right_text)
+        if spans is None:
+            return row.left_text, row.right_text
+
+        return (IntralineDiff.rich_text(row.left_text, spans[0], fonts[0]),
+                IntralineDiff.rich_text(row.right_text, spans[1], fonts[1]))
+
+    @staticmethod
+    def _span(start: int, text: str) -> Spans:
+        return ((start, start + len(text)),) if text else ()
+
+    @staticmethod
+    def _offsets(tokens: List[str], start: int) -> List[int]:
+        """Character offset of each token, plus the end offset"""
+        offsets = [start]
+        for token in tokens:
+            offsets.append(offsets[-1] + len(token))
+        return offsets
+
+    @staticmethod
+    def _add_span(spans: List[Tuple[int, int]], start: int, end: int) -> None:
+        """Append a span, merging it with the previous one when they touch"""
+        if spans and spans[-1][1] >= start:
+            spans[-1] = (spans[-1][0], max(spans[-1][1], end))
+        else:
+            spans.append((start, end))
@@ -0,0 +1,96 @@
+# -*- coding: UTF-8 -*-
+"""
+Process pool helpers for CPU-bound per-file stages
+"""
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator, Optional, Sequence, TypeVar
+
+from .config import config, Config
+from .common import logger, tracer
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+# Items submitted ahead per worker process (bounds the pending items and results held)
+IN_FLIGHT_PER_WORKER = 4
+
+
+def resolve_workers(workers: Optional[int] = None) -> int:
+    """Resolve worker count (0 or None means one per CPU)"""
+    if workers is None:
+        workers = config.parallel.workers
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _init_worker(parent_config: Config) -> None:
+    """Apply the parent's runtime configuration in a worker process (needed with spawn)"""
+    config.__dict__.update(parent_config.__dict__)
+    # Forked workers inherit the parent's spans; only report their own
+    tracer.reset()
+
+
+def traced_call(job):
+    """Run func on an item in a worker, returning the result with the spans and counters it recorded"""
+    func, item, label = job
+    with tracer.span(func.__qualname__, category='file', item=label):
+        result = func(item)
+    return result, tracer.drain()
+
+
+def process_pool(workers: int) -> ProcessPoolExecutor:
+    """Process pool whose workers run with the parent's runtime configuration"""
+    return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,))
+
+
+def parallel_map(func: Callable[[T], R], items: Sequence[T], workers: Optional[int] = None,
+                 label: Optional[Callable[[T], str]] = None) -> Iterator[R]:
+    """
+    Map func over items in a process pool, yielding results in input order
+
+    Falls back to a serial map for a single worker or when there are too few
+    items to pay for starting the pool. Results are yielded in the same order
+    as items, so output does not depend on the worker count. At most
+    IN_FLIGHT_PER_WORKER items per worker are submitted ahead of the
+    consumer, so a slow consumer does not pile up finished results. Each
+    call is traced as a 'file' span, including the ones run in worker
+    processes.
+
+    Args:
+        func: Module-level (picklable) function
+        items: Picklable work items
+        workers: Worker process count (defaults to config.parallel.workers)
+        label: Names an item in its span (e.g. the file's relative path)
+    """
+    workers = min(resolve_workers(workers), len(items))
+    labels = [label(item) if label else '' for item in items]
+
+    if workers <= 1 or len(items) < config.parallel.min_items:
+        for item, item_label in zip(items, labels):
+            with tracer.span(func.__qualname__, category='file', item=item_label):
+                result = func(item)
+            yield result
+        return
+
+    logger.info(f"Processing {len(items)} items with {workers} worker processes")
+
+    executor = process_pool(workers)
+    pending = deque()
+    try:
+        for item, item_label in zip(items, labels):
+            if len(pending) >= workers * IN_FLIGHT_PER_WORKER:
+                yield _collect(pending.popleft())
+            pending.append(executor.submit(traced_call, (func, item, item_label)))
+        while pending:
+            yield _collect(pending.popleft())
+    finally:
+        # Drop queued items when the consumer stops early (error or cancellation)
+        executor.shutdown(cancel_futures=True)
+
+
+def _collect(future):
+    """Wait for a traced call, raising its error, and take over its spans"""
+    result, (spans, counters) = future.result()
+    tracer.merge(spans, counters)
+    return result
@@ -0,0 +1,69 @@
+# -*- coding: UTF-8 -*-
+"""
+Bounded hand-off between pipelined stages
+"""
+import queue
+import threading
+from typing import Any, Iterator, Optional
+
+from .cancellation import CancellationToken
+
+# Seconds between cancellation checks while waiting on a full or empty queue
+POLL_INTERVAL = 0.1
+
+
+class PipelineQueue:
+    """
+    Bounded queue from a producer thread to a consuming generator
+
+    put() blocks while the queue is full, which holds the producer back to
+    the consumer's pace, and raises once the cancel token is set. Iterating
+    yields the queued items until the producer calls close(), then re-raises
+    the producer's error if it failed.
+    """
+
+    _CLOSED = object()
+
+    def __init__(self, maxsize: int, cancel_token: CancellationToken):
+        self._queue = queue.Queue(maxsize=max(maxsize, 1))
+        self.cancel_token = cancel_token
+        self._error: Optional[BaseException] = None
+        self._closed = threading.Event()
+
+    def put(self, item: Any) -> None:
+        """Add an item, waiting for room (raises OperationCancelledError once cancelled)"""
+        while True:
+            self.cancel_token.check()
+            try:
+                self._queue.put(item, timeout=POLL_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def close(self, error: Optional[BaseException] = None) -> None:
+        """
+        End the stream (with the producer's error, if any)
+
+        Never blocks: the consumer sees the closed flag once it has taken
+        the items already queued, even when the end marker finds no room.
+        """
+        self._error = error
+        self._closed.set()
+        try:
+            self._queue.put_nowait(self._CLOSED)
+        except queue.Full:
+            pass
+
+    def __iter__(self) -> Iterator[Any]:
+        while True:
+            try:
+                item = self._queue.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                if not self._closed.is_set():
+                    continue
+                item = self._CLOSED
+            if item is self._CLOSED:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
@@ -0,0 +1,183 @@
+# -*- coding: UTF-8 -*-
+"""
+Pre-scan stage: pair base/latest files and skip identical ones before diffing
+"""
+import hashlib
+import mmap
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .config import config
+from .utils import FileNormalizer
+from .walker import TreeWalker
+from .common import Timer, logger
+
+timer_PS = Timer("PreScanner")
+
+# Pair status values
+IDENTICAL = 'identical'
+CHANGED = 'changed'
+ADDED = 'added'
+REMOVED = 'removed'
+CACHED = 'cached'  # Changed, with the diff result taken from the result cache
+CLASSIFIED = 'classified'  # Changed, handled by the policy of its file class (see classify.py)
+
+
+@dataclass
+class FilePair:
+    """Base/latest files sharing the same normalized relative path"""
+    key: str
+    left: Optional[Path] = None
+    right: Optional[Path] = None
+    status: str = CHANGED
+    left_hash: Optional[str] = None
+    right_hash: Optional[str] = None
+    left_stat: Optional[os.stat_result] = None  # Stat data from the walk, if known
+    right_stat: Optional[os.stat_result] = None
+    kind: str = 'text'  # File class set by FileClassifier: 'text', 'binary' or 'oversize'
+
+    @property
+    def needs_diff(self) -> bool:
+        """Whether a diff backend has to compare this pair"""
+        return self.status not in (IDENTICAL, CACHED, CLASSIFIED)
+
+    @property
+    def size(self) -> int:
+        """Combined size in bytes of the base and latest file"""
+        size = 0
+        for path, stat in ((self.left, self.left_stat), (self.right, self.right_stat)):
+            if stat is not None:
+                size += stat.st_size
+            elif path is not None:
+                try:
+                    size += path.stat().st_size
+                except OSError:
+                    pass
+        return size
+
+    @property
+    def name(self) -> str:
+        return self.key.rpartition('/')[2]
+
+    @property
+    def folder(self) -> str:
+        return self.key.rpartition('/')[0]
+
+
+class PreScanner:
+    """Pairs files by normalized relative path and detects identical pairs cheaply"""
+
+    @staticmethod
+    def collect_files(root: Path) -> Dict[str, Tuple[Path, Optional[os.stat_result]]]:
+        """Map normalized relative paths (posix style) to files under root and their stat data"""
+        if root.is_file():
+            return {FileNormalizer.normalize_filename(root.name): (root, None)}
+
+        files = {}
+        for f in TreeWalker.walk(root):
+            rel_parent, _, name = f.rel.rpartition('/')
+            norm_name = FileNormalizer.normalize_filename(name)
+            files[f"{rel_parent}/{norm_name}" if rel_parent else norm_name] = (f.path, f.stat)
+        return files
+
+    @staticmethod
+    def pair_files(base: Path, latest: Path) -> List[FilePair]:
+        """Pair base and latest files by normalized relative path (sorted by key)"""
+        if base.is_file() and latest.is_file():
+            return [FilePair(FileNormalizer.normalize_filename(latest.name), base, latest)]
+
+        pairs: Dict[str, FilePair] = {}
+        for key, (path, stat) in PreScanner.collect_files(base).items():
+            pairs[key] = FilePair(key, left=path, left_stat=stat)
+        for key, (path, stat) in PreScanner.collect_files(latest).items():
+            pair = pairs.setdefault(key, FilePair(key))
+            pair.right, pair.right_stat = path, stat
+
+        return [pairs[key] for key in sorted(pairs)]
+
+    @staticmethod
+    def file_hash(path: Path) -> str:
+        """
+        Streaming content hash of a file
+
+        Files larger than config.scan.mmap_threshold are hashed through mmap
+        to avoid copying their contents into Python buffers.
+        """
+        chunk_size = config.scan.hash_chunk_size
+        digest = hashlib.blake2b(digest_size=20)
+
+        with open(path, 'rb') as f:
+            size = f.seek(0, 2)
+            f.seek(0)
+            if size >= config.scan.mmap_threshold:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    view = memoryview(mm)
+                    try:
+                        for offset in range(0, size, chunk_size):
+                            digest.update(view[offset:offset + chunk_size])
+                    finally:
+                        view.release()
+            else:
+                for chunk in iter(lambda: f.read(chunk_size), b''):
+                    digest.update(chunk)
+
+        return digest.hexdigest()
+
+    @staticmethod
+    def _classify(pair: FilePair) -> str:
+        """Classify a pair: size/mtime short-circuit first, then content hash"""
+        if pair.left is None:
+            return ADDED
+        if pair.right is None:
+            return REMOVED
+
+        left_stat = pair.left_stat or pair.left.stat()
+        right_stat = pair.right_stat or pair.right.stat()
+        if left_stat.st_size != right_stat.st_size:
+            return CHANGED
+        if config.scan.trust_mtime and left_stat.st_mtime_ns == right_stat.st_mtime_ns:
+            return IDENTICAL
+        pair.left_hash = PreScanner.file_hash(pair.left)
+        pair.right_hash = PreScanner.file_hash(pair.right)
+        if pair.left_hash == pair.right_hash:
+            return IDENTICAL
+        return CHANGED
+
+    @staticmethod
+    def scan(base: Path, latest: Path) -> List[FilePair]:
+        """
+        Pair files and classify each pair as identical, changed, added or removed
+
+        Args:
+            base: Base file or folder
+            latest: Latest file or folder
+
+        Returns:
+            File pairs sorted by normalized relative path
+        """
+        timer_PS.start(memo="scan")
+
+        try:
+            pairs = PreScanner.pair_files(base, latest)
+
+            if config.scan.enabled:
+                with ThreadPoolExecutor() as executor:
+                    for pair, status in zip(pairs, executor.map(PreScanner._classify, pairs)):
+                        pair.status = status
+            else:
+                for pair in pairs:
+                    pair.status = ADDED if pair.left is None else REMOVED if pair.right is None else CHANGED
+
+            counts = {status: 0 for status in (IDENTICAL, CHANGED, ADDED, REMOVED)}
+            for pair in pairs:
+                counts[pair.status] += 1
+            logger.info(
+                f"Pre-scan: {counts[IDENTICAL]} identical, {counts[CHANGED]} changed, "
+                f"{counts[ADDED]} added, {counts[REMOVED]} removed"
+            )
+            return pairs
+        finally:
+            timer_PS.stop()
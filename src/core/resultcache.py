@@ -0,0 +1,172 @@
+# -*- coding: UTF-8 -*-
+"""
+Persistent content-addressed cache of per-file diff results
+
+Entries are keyed by the relative path and content hashes of both files,
+the diff options and the exporter version, and hold the comparison result
+plus the parsed FileDiff (row columns and hunk index). Re-running against a
+new drop only diffs the pairs whose contents changed since a cached run.
+"""
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+
+from .. import __version__
+from .config import config
+from .diffmodel import FileDiff
+from .prescan import FilePair, PreScanner, CHANGED
+from .common import logger
+
+# Bump when the pickled entry layout changes
+CACHE_FORMAT = 2
+
+ENTRY_SUFFIX = '.pkl'
+
+
+class CachedResult(NamedTuple):
+    """Cached comparison of one file pair"""
+    result: str  # Summary "Comparison result" text
+    file_diff: Optional[FileDiff]
+
+
+class CacheStats(NamedTuple):
+    """Size of the cache directory"""
+    entries: int
+    total_bytes: int
+
+
+class ResultCache:
+    """Size-bounded on-disk cache with least-recently-used eviction"""
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.directory = Path(directory or config.cache.directory or self.default_directory())
+        self.max_bytes = config.cache.max_bytes if max_bytes is None else max_bytes
+
+    @staticmethod
+    def default_directory() -> Path:
+        """Per-user cache folder (%LOCALAPPDATA% on Windows, ~/.cache elsewhere)"""
+        base = os.environ.get('LOCALAPPDATA') or Path.home() / '.cache'
+        return Path(base) / 'WinMergeDiffExporter' / 'results'
+
+    @staticmethod
+    def options_digest() -> str:
+        """Digest of everything besides file contents that affects a diff result"""
+        options = {
+            'format': CACHE_FORMAT,
+            'version': __version__,
+            # Scheduling settings (processes, timeouts, pipelining) do not change results
+            'winmerge': {name: getattr(config.winmerge, name) for name in ('executable_path', 'options', 'backend')},
+            'diff': asdict(config.diff),
+        }
+        return hashlib.blake2b(json.dumps(options, sort_keys=True).encode('utf-8'), digest_size=20).hexdigest()
+
+    @staticmethod
+    def entry_key(pair: FilePair, options: str) -> str:
+        """Cache key of a changed pair (its content hashes must be set)"""
+        text = '\0'.join((options, pair.key, pair.left_hash, pair.right_hash))
+        return hashlib.blake2b(text.encode('utf-8'), digest_size=20).hexdigest()
+
+    def keys_for(self, pairs: List[FilePair]) -> Dict[str, str]:
+        """
+        Get cache keys of the changed pairs by pair key, hashing files not hashed by the pre-scan
+
+        Added and removed files are cheap to compare and are not cached.
+        """
+        changed = [pair for pair in pairs if pair.status == CHANGED]
+
+        def hash_pair(pair: FilePair) -> None:
+            if pair.left_hash is None:
+                pair.left_hash = PreScanner.file_hash(pair.left)
+            if pair.right_hash is None:
+                pair.right_hash = PreScanner.file_hash(pair.right)
+
+        with ThreadPoolExecutor() as executor:
+            list(executor.map(hash_pair, changed))
+
+        options = self.options_digest()
+        return {pair.key: self.entry_key(pair, options) for pair in changed}
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """Load an entry (marking it recently used), or None on a miss"""
+        path = self._entry_path(key)
+        try:
+            with open(path, 'rb') as f:
+                entry = pickle.load(f)
+            os.utime(path)
+            return entry
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+    def put(self, key: str, entry: CachedResult) -> None:
+        """Store an entry atomically (failures are logged, not raised)"""
+        path = self._entry_path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=path.parent)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Failed to write cache entry {path}: {e}")
+
+    def stats(self) -> CacheStats:
+        """Count entries and bytes in the cache"""
+        entries = self._entries()
+        return CacheStats(len(entries), sum(size for _, size, _ in entries))
+
+    def prune(self, max_bytes: Optional[int] = None) -> int:
+        """
+        Evict least recently used entries until the cache fits in max_bytes
+
+        Args:
+            max_bytes: Size limit (defaults to the configured limit; 0 clears the cache)
+
+        Returns:
+            Number of entries removed
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self._entries()
+        total = sum(size for _, size, _ in entries)
+
+        removed = 0
+        for path, size, _ in sorted(entries, key=lambda entry: entry[2]):
+            if total <= max_bytes:
+                break
+            try:
+                path.unlink()
+                total -= size
+                removed += 1
+            except OSError as e:
+                logger.warning(f"Failed to evict cache entry {path}: {e}")
+
+        if removed:
+            logger.info(f"Evicted {removed} cache entries ({total} bytes left)")
+        return removed
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + ENTRY_SUFFIX)
+
+    def _entries(self):
+        """List (path, size, last use time) of all entries"""
+        entries = []
+        if not self.directory.is_dir():
+            return entries
+
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(ENTRY_SUFFIX):
+                    stat = entry.stat()
+                    entries.append((Path(entry.path), stat.st_size, stat.st_mtime))
+        return entries
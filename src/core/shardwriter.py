@@ -0,0 +1,117 @@
+# -*- coding: UTF-8 -*-
+"""
+Sharded output: per-file sheets split across several workbooks written in parallel
+"""
+from collections import deque
+from pathlib import Path
+from typing import Callable, Deque, Dict, List, Tuple
+
+from openpyxl import Workbook
+
+from .config import config
+from .diffmodel import FileDiff
+from .sheetwriter import StreamingSheetWriter
+from .parallel import process_pool, resolve_workers, traced_call
+from .common import logger, tracer
+
+
+def _write_shard(job: Tuple[Path, List[Tuple[str, FileDiff]]]) -> Path:
+    """Write one shard workbook (runs in worker processes)"""
+    path, sheets = job
+    wb = Workbook(write_only=True)
+    writer = StreamingSheetWriter()
+    for sheet_name, file_diff in sheets:
+        writer.write_file_diff(wb.create_sheet(title=sheet_name), file_diff)
+    wb.save(str(path))
+    return path
+
+
+class ShardWriter:
+    """
+    Collects per-file sheets into shard workbooks next to the output file
+
+    A shard is closed once it reaches config.shard.max_sheets sheets or
+    config.shard.max_rows diff rows, and is written by a worker process while
+    the next one fills up. At most one shard per worker is in flight, which
+    bounds the file diffs held in memory.
+    """
+
+    def __init__(self, output: Path, log: Callable[[str], None]):
+        self.output = output
+        self.log = log
+        self.shards: List[Path] = []
+        # Sheet name to the file name of the shard holding it
+        self.sheet_files: Dict[str, str] = {}
+
+        self._sheets: List[Tuple[str, FileDiff]] = []
+        self._rows = 0
+        self._workers = resolve_workers()
+        self._executor = process_pool(self._workers) if self._workers > 1 else None
+        self._pending: Deque = deque()
+
+    @staticmethod
+    def shard_path(output: Path, index: int) -> Path:
+        """Path of the shard with the given 0-based index"""
+        return output.with_name(f"{output.stem}_{index + 1:03d}{output.suffix}")
+
+    @staticmethod
+    def existing_shards(output: Path) -> List[Path]:
+        """Shard files left next to the output by earlier runs"""
+        return sorted(output.parent.glob(f"{output.stem}_[0-9][0-9][0-9]{output.suffix}"))
+
+    def add(self, sheet_name: str, file_diff: FileDiff) -> str:
+        """
+        Add a per-file sheet to the current shard
+
+        Returns:
+            File name of the shard the sheet is written to
+        """
+        max_sheets, max_rows = config.shard.max_sheets, config.shard.max_rows
+        if self._sheets and ((max_sheets and len(self._sheets) >= max_sheets)
+                             or (max_rows and self._rows + len(file_diff) > max_rows)):
+            self._flush()
+
+        self._sheets.append((sheet_name, file_diff))
+        self._rows += len(file_diff)
+        self.sheet_files[sheet_name] = self.shard_path(self.output, len(self.shards)).name
+        return self.sheet_files[sheet_name]
+
+    def close(self) -> None:
+        """Write the last shard and wait for all shards to be saved"""
+        try:
+            if self._sheets:
+                self._flush()
+            while self._pending:
+                self._collect(self._pending.popleft())
+            self.log(f"Saved {len(self.shards)} shard workbooks")
+            tracer.count('output bytes', sum(shard.stat().st_size for shard in self.shards))
+        finally:
+            self.shutdown()
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (also on failure)"""
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+            self._executor = None
+
+    def _flush(self) -> None:
+        """Hand the current shard to a worker (or write it here when running serially)"""
+        job = (self.shard_path(self.output, len(self.shards)), self._sheets)
+        self.shards.append(job[0])
+        logger.info(f"Writing shard {job[0].name} ({len(self._sheets)} sheets, {self._rows} rows)")
+        self._sheets, self._rows = [], 0
+
+        if self._executor is None:
+            with tracer.span('_write_shard', category='file', item=job[0].name):
+                _write_shard(job)
+            return
+
+        while len(self._pending) >= self._workers:
+            self._collect(self._pending.popleft())
+        self._pending.append(self._executor.submit(traced_call, (_write_shard, job, job[0].name)))
+
+    @staticmethod
+    def _collect(future) -> None:
+        """Wait for a shard write, raising its error, and take over its spans"""
+        _, (spans, counters) = future.result()
+        tracer.merge(spans, counters)
@@ -0,0 +1,258 @@
+# -*- coding: UTF-8 -*-
+"""
+Writes diff model objects (Summary table, file diffs) into Excel worksheets
+"""
+from typing import Dict, List, Optional, Tuple
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter, column_index_from_string
+
+from .config import config
+from .diffmodel import DiffRow, FileDiff, SummaryTable
+from .styles import Styles
+from .intraline import IntralineDiff
+from .common import tracer
+
+# Fill colors that count as "no fill" (white or unset)
+BLANK_FILLS = (None, 'FFFFFFFF', '00000000')
+
+
+class DiffSheetWriter:
+    """Writes Summary and per-file diff sheets from the row model"""
+
+    def __init__(self):
+        self.highlight_fonts = IntralineDiff.highlight_fonts()
+
+    def write_summary(self, wb: Workbook, summary: SummaryTable) -> None:
+        """
+        Write the Summary table into the active sheet of the workbook
+
+        Args:
+            wb: Workbook whose active sheet becomes the Summary sheet
+            summary: Summary table to write
+        """
+        ws = wb.active
+        ws.title = "Summary"
+
+        self._write_header(ws, summary.header)
+        for row_idx, entry in enumerate(summary.entries, start=2):
+            for col_idx, text in enumerate(entry.cells, start=1):
+                fill = entry.fills[col_idx - 1] if col_idx <= len(entry.fills) else None
+                self._write_cell(ws, row_idx, col_idx, text, fill)
+
+        self._auto_adjust_columns(ws)
+
+    def write_file_diff(self, wb: Workbook, file_diff: FileDiff, sheet_name: str):
+        """
+        Write a side-by-side file diff into a new worksheet
+
+        Args:
+            wb: Workbook to add sheet to
+            file_diff: Parsed diff of one file pair
+            sheet_name: Name for the new sheet
+
+        Returns:
+            The created worksheet
+        """
+        ws = wb.create_sheet(title=sheet_name[:31])  # Excel limit: 31 chars
+
+        self._write_header(ws, file_diff.header)
+        tracer.count('cells', 4 * len(file_diff))
+        for row_idx, row in enumerate(file_diff.rows, start=2):
+            left_text, right_text = IntralineDiff.render(row, self.highlight_fonts)
+            self._write_cell(ws, row_idx, 1, row.left_no, None)
+            self._write_cell(ws, row_idx, 2, left_text, row.left_fill)
+            self._write_cell(ws, row_idx, 3, row.right_no, None)
+            self._write_cell(ws, row_idx, 4, right_text, row.right_fill)
+
+        return ws
+
+    def _write_header(self, ws, header: List[str]) -> None:
+        """Write header row with header cell styling"""
+        for col_idx, text in enumerate(header, start=1):
+            cell = self._write_cell(ws, 1, col_idx, text, None)
+            Styles.apply(cell, font=Styles.font(bold=True, size=11), alignment=Styles.alignment(),
+                         fill=Styles.fill('DDDDDD'))
+
+    def _write_cell(self, ws, row_idx: int, col_idx: int, value, fill: Optional[str]):
+        """Write single cell value with optional fill and thin border"""
+        excel_cell = ws.cell(row=row_idx, column=col_idx, value=value if value != '' else None)
+        Styles.apply(excel_cell, fill=Styles.fill(fill) if fill else None, border=Styles.border())
+        return excel_cell
+
+    def _auto_adjust_columns(self, ws, max_width: int = 100) -> None:
+        """Auto-adjust column widths based on content"""
+        for column in ws.columns:
+            max_length = 0
+            column_letter = get_column_letter(column[0].column)
+
+            for cell in column:
+                if cell.value:
+                    max_length = max(max_length, len(str(cell.value)))
+
+            adjusted_width = min(max_length + 2, max_width)
+            ws.column_dimensions[column_letter].width = adjusted_width
+
+
+class StreamingSheetWriter:
+    """
+    Writes fully formatted rows into write-only worksheets
+
+    Rows are emitted with the values and styles that DiffSheetWriter plus the
+    formatting passes (ExcelFormatter, line number and Summary hyperlink
+    formatting) give a normal workbook, so no cell has to stay in memory.
+    Column widths are set before the first row as write-only sheets require.
+    """
+
+    def __init__(self):
+        self.no_cols = [column_index_from_string(fmt['col']) for fmt in config.diff_formats['no']]
+        self.code_fmts = {column_index_from_string(fmt['col']): fmt for fmt in config.diff_formats['code']}
+        self.extra_fmts = {column_index_from_string(fmt['col']): fmt for fmt in config.diff_formats['extra']}
+        self.max_col = max([4] + self.no_cols + list(self.code_fmts) + list(self.extra_fmts))
+        # Extra columns show '-' when the first code column has no fill
+        self.first_code_col = column_index_from_string(config.diff_formats['code'][0]['col'])
+
+        self.border = Styles.border('E0E0E0', vertical_only=True)
+        self.header_font = Styles.font(bold=True, size=11)
+        self.header_fill = Styles.fill('DDDDDD')
+        self.line_no_fill = Styles.fill('F0F0F0')
+        self.line_no_font = Styles.font(size=12)
+        self.code_fonts = {col: Styles.font(name=fmt['font']) for col, fmt in self.code_fmts.items() if 'font' in fmt}
+        self.highlight_fonts = IntralineDiff.highlight_fonts()
+
+    def write_summary(self, ws, summary: SummaryTable, hyperlinks: Dict[Tuple[int, int], str]) -> None:
+        """
+        Write the Summary table into a write-only worksheet
+
+        Args:
+            ws: Empty write-only worksheet
+            summary: Summary table to write
+            hyperlinks: Hyperlink targets by (row, column), 1-based
+        """
+        rows = [(summary.header, [])] + [(entry.cells, entry.fills) for entry in summary.entries]
+        self._set_summary_widths(ws, [texts for texts, _ in rows])
+
+        for row_idx, (texts, fills) in enumerate(rows, start=1):
+            cells = []
+            for col_idx, text in enumerate(texts, start=1):
+                cell = WriteOnlyCell(ws, value=text if text != '' else None)
+                if row_idx == 1:
+                    Styles.apply(cell, font=self.header_font, fill=self.header_fill,
+                                 border=Styles.border(), alignment=Styles.alignment())
+                else:
+                    fill = fills[col_idx - 1] if col_idx <= len(fills) else None
+                    Styles.apply(cell, fill=Styles.fill(fill) if fill else None, border=Styles.border())
+                if (row_idx, col_idx) in hyperlinks:
+                    cell.hyperlink = hyperlinks[(row_idx, col_idx)]
+                cells.append(cell)
+            ws.append(cells)
+
+    def write_file_diff(self, ws, file_diff: FileDiff) -> None:
+        """
+        Write a side-by-side file diff into a write-only worksheet
+
+        Args:
+            ws: Empty write-only worksheet
+            file_diff: Parsed diff of one file pair
+        """
+        self.start_diff_sheet(ws, file_diff.header)
+        tracer.count('cells', self.max_col * len(file_diff))
+        for row in file_diff.rows:
+            ws.append(self.diff_row(ws, row, self.line_no_font))
+
+    @staticmethod
+    def discard(wb) -> None:
+        """Close the open sheets of a write-only workbook that will not be saved"""
+        for ws in wb.worksheets:
+            if not ws.closed:
+                ws.close()
+
+    def start_diff_sheet(self, ws, header: Optional[List[str]] = None) -> None:
+        """
+        Set column widths and write the header row of a diff sheet
+
+        Args:
+            ws: Empty write-only worksheet
+            header: Report header texts; None for the compare sheet, which
+                only has the column titles
+        """
+        for formats in config.diff_formats.values():
+            for fmt in formats:
+                if 'width' in fmt:
+                    ws.column_dimensions[fmt['col']].width = fmt['width']
+
+        header = header or []
+        cells = []
+        for col_idx in range(1, max(self.max_col, len(header)) + 1):
+            text = header[col_idx - 1] if col_idx <= len(header) else ''
+            cell = WriteOnlyCell(ws, value=text if text != '' else None)
+            font = fill = alignment = None
+
+            if col_idx <= len(header):
+                font, fill, alignment = self.header_font, self.header_fill, Styles.alignment()
+            if col_idx in self.code_fmts and 'header' in self.code_fmts[col_idx]:
+                cell.value = self.code_fmts[col_idx]['header']
+                font = Styles.font(bold=True)
+            elif col_idx in self.extra_fmts:
+                cell.value = self.extra_fmts[col_idx]['comment']
+                fill, alignment = Styles.fill('CCFFCC'), Styles.alignment()
+
+            Styles.apply(cell, font=font, fill=fill, border=self.border, alignment=alignment)
+            cells.append(cell)
+
+        ws.append(cells)
+
+    def diff_row(self, ws, row: Optional[DiffRow], line_no_font: Optional[Font] = None,
+                 line_no_fill: bool = True, label: Optional[str] = None) -> List[WriteOnlyCell]:
+        """
+        Build one formatted data row of a diff sheet
+
+        Args:
+            ws: Write-only worksheet the row belongs to
+            row: Diff row, or None for an empty row
+            line_no_font: Font for line number cells (None keeps the default)
+            line_no_fill: Whether line number cells get the gray fill
+            label: File name label written to column A instead of a line number
+        """
+        if row is None:
+            values, fills = {}, {}
+        else:
+            left_text, right_text = IntralineDiff.render(row, self.highlight_fonts)
+            values = {1: row.left_no, 2: left_text, 3: row.right_no, 4: right_text}
+            fills = {2: row.left_fill, 4: row.right_fill}
+
+        cells = []
+        for col_idx in range(1, self.max_col + 1):
+            value = values.get(col_idx)
+            cell = WriteOnlyCell(ws, value=value if value != '' else None)
+            font = fill = None
+
+            if col_idx == 1 and label is not None:
+                cell.value = label
+                font, fill = Styles.font(bold=True, size=12), Styles.fill('CCFFFF')
+            elif col_idx in self.no_cols:
+                font = line_no_font
+                fill = self.line_no_fill if line_no_fill else None
+            elif col_idx in self.code_fmts:
+                font = self.code_fonts.get(col_idx)
+                fill = Styles.fill(fills[col_idx]) if fills.get(col_idx) else None
+            elif col_idx in self.extra_fmts and fills.get(self.first_code_col) in BLANK_FILLS:
+                cell.value = '-'
+                fill = Styles.fill('E0E0E0')
+
+            Styles.apply(cell, font=font, fill=fill, border=self.border)
+            cells.append(cell)
+
+        return cells
+
+    def _set_summary_widths(self, ws, rows: List[List[str]], max_width: int = 100) -> None:
+        """Size columns to their longest text, as DiffSheetWriter._auto_adjust_columns does"""
+        max_lengths: Dict[int, int] = {}
+        for texts in rows:
+            for col_idx, text in enumerate(texts, start=1):
+                max_lengths[col_idx] = max(max_lengths.get(col_idx, 0), len(str(text)) if text else 0)
+
+        for col_idx, max_length in max_lengths.items():
+            ws.column_dimensions[get_column_letter(col_idx)].width = min(max_length + 2, max_width)
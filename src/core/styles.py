@@ -0,0 +1,87 @@
+# -*- coding: UTF-8 -*-
+"""
+Shared style registry for Excel output
+
+Style objects are interned (one instance per distinct style) and the style
+index arrays openpyxl stores per cell are memoized per workbook, so styling a
+cell in a hot loop neither allocates style objects nor re-hashes them.
+"""
+from copy import copy
+from functools import lru_cache
+from typing import Optional
+from weakref import WeakKeyDictionary
+
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+
+
+# Memoized style arrays per workbook: (base array, style ids) -> (array, styles)
+_style_arrays: "WeakKeyDictionary" = WeakKeyDictionary()
+
+
+class Styles:
+    """Interned style objects and cached application of style combinations to cells"""
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def fill(color: Optional[str] = None) -> PatternFill:
+        """Solid fill of the color (no fill when color is None)"""
+        if color is None:
+            return PatternFill(fill_type=None)
+        return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def font(name: Optional[str] = None, size: Optional[float] = None,
+             bold: Optional[bool] = None, color: Optional[str] = None) -> Font:
+        """Font with the given attributes (Font() when all are None)"""
+        return Font(name=name, size=size, bold=bold, color=color)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def border(color: Optional[str] = None, vertical_only: bool = False) -> Border:
+        """Thin border on all four sides, or on the left and right only"""
+        side = Side(style='thin', color=color)
+        if vertical_only:
+            return Border(left=side, right=side)
+        return Border(left=side, right=side, top=side, bottom=side)
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def alignment(horizontal: str = 'center', vertical: str = 'center') -> Alignment:
+        """Cell alignment"""
+        return Alignment(horizontal=horizontal, vertical=vertical)
+
+    @staticmethod
+    def apply(cell, font: Optional[Font] = None, fill: Optional[PatternFill] = None,
+              border: Optional[Border] = None, alignment: Optional[Alignment] = None) -> None:
+        """
+        Set the given styles on a cell, keeping its other styles
+
+        The resulting style array is cached per workbook for each starting
+        style and combination, so openpyxl only looks the styles up once.
+        Only pass objects from this registry: they are keyed by identity.
+        """
+        workbook = cell.parent.parent
+        arrays = _style_arrays.get(workbook)
+        if arrays is None:
+            arrays = _style_arrays[workbook] = {}
+
+        # Unstyled cells have no style array yet
+        base = tuple(cell._style) if cell._style is not None else ()
+        key = (base, id(font), id(fill), id(border), id(alignment))
+        cached = arrays.get(key)
+        if cached is not None:
+            cell._style = copy(cached[0])
+            return
+
+        if font is not None:
+            cell.font = font
+        if fill is not None:
+            cell.fill = fill
+        if border is not None:
+            cell.border = border
+        if alignment is not None:
+            cell.alignment = alignment
+
+        # Keep the style objects referenced so their ids stay unique
+        arrays[key] = (copy(cell._style), font, fill, border, alignment)
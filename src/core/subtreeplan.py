@@ -0,0 +1,74 @@
+# -*- coding: UTF-8 -*-
+"""
+Split the files of a folder comparison into subtrees for parallel WinMerge runs
+"""
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+from .prescan import FilePair
+
+
+class SubtreePlanner:
+    """
+    Groups file pairs by folder into balanced, independent comparison jobs
+
+    Pairs start grouped by top-level folder (files at the root form their
+    own group). Groups larger than an even share of the input bytes are
+    split by their next folder level, then the groups are packed into the
+    requested number of jobs, largest first into the lightest job.
+    """
+
+    @staticmethod
+    def plan(pairs: List[FilePair], count: int) -> List[List[FilePair]]:
+        """
+        Split pairs into at most count jobs of similar size
+
+        Returns:
+            Non-empty jobs, each sorted by relative path
+        """
+        if count <= 1 or len(pairs) <= 1:
+            return [sorted(pairs, key=lambda pair: pair.key)] if pairs else []
+
+        sizes = {pair.key: max(pair.size, 1) for pair in pairs}
+        target = sum(sizes.values()) / count
+
+        # (folder prefix, can split further) -> pairs
+        groups = SubtreePlanner._split({(): pairs}, 0)
+        while True:
+            oversized = [(prefix, members) for prefix, members in groups.items()
+                         if SubtreePlanner._splittable(members, len(prefix))
+                         and sum(sizes[pair.key] for pair in members) > target]
+            if not oversized:
+                break
+            for prefix, members in oversized:
+                del groups[prefix]
+                groups.update(SubtreePlanner._split({prefix: members}, len(prefix)))
+
+        jobs: List[List[FilePair]] = [[] for _ in range(count)]
+        job_sizes = [0] * count
+        ordered = sorted(groups.values(), key=lambda members: -sum(sizes[pair.key] for pair in members))
+        for members in ordered:
+            lightest = job_sizes.index(min(job_sizes))
+            jobs[lightest].extend(members)
+            job_sizes[lightest] += sum(sizes[pair.key] for pair in members)
+
+        return [sorted(job, key=lambda pair: pair.key) for job in jobs if job]
+
+    @staticmethod
+    def _split(groups: Dict[Tuple[str, ...], List[FilePair]], depth: int) -> Dict[Tuple[str, ...], List[FilePair]]:
+        """Regroup pairs by their folder component at depth (files directly in the folder stay together)"""
+        result: Dict[Tuple[str, ...], List[FilePair]] = defaultdict(list)
+        for prefix, members in groups.items():
+            for pair in members:
+                parts = pair.key.split('/')
+                if len(parts) - 1 > depth:
+                    result[prefix + (parts[depth],)].append(pair)
+                else:
+                    # Files of the folder itself: the '' component keeps them from splitting again
+                    result[prefix + ('',)].append(pair)
+        return result
+
+    @staticmethod
+    def _splittable(members: List[FilePair], depth: int) -> bool:
+        """Whether a group has subfolders below depth (and more than one pair)"""
+        return len(members) > 1 and any(len(pair.key.split('/')) - 1 > depth for pair in members)
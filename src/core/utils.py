@@ -9,12 +9,22 @@ from pathlib import Path
 from typing import List, Optional, Callable
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from openpyxl.styles import Font, Alignment, PatternFill, Border, Side
 from openpyxl.utils import column_index_from_string
 
 from .config import config
 from .exceptions import FileProcessingError
-from .common import logger
+from .styles import Styles
+from .walker import TreeWalker
+from .cancellation import CancellationToken
+from .common import logger, ProgressLog
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl request number for FICLONE (_IOW(0x94, 9, int))
+_FICLONE = 0x40049409
 
 
 class FileNormalizer:
@@ -33,14 +43,24 @@ class FileNormalizer:
         Returns:
             Normalized filename
         """
-        logger.debug(f"Normalizing filename: {filename}")
         parts = filename.split('.')
         # Remove trailing numeric extension if present (e.g., version numbers)
         return '.'.join(parts[:-1]) if len(parts) >= 3 and parts[-1].isdigit() else filename
     
     @staticmethod
-    def copy_and_normalize(src: Path, dest: Path, progress_callback: Optional[Callable] = None) -> None:
-        """Copy and normalize files from source to destination"""
+    def copy_and_normalize(src: Path, dest: Path, progress_callback: Optional[Callable] = None,
+                           files: Optional[List[Path]] = None,
+                           cancel_token: Optional[CancellationToken] = None) -> None:
+        """
+        Copy and normalize files from source to destination
+        
+        Args:
+            src: Source file or folder
+            dest: Destination folder
+            progress_callback: Optional callback receiving progress messages
+            files: Only copy these files (under src); all files when omitted
+            cancel_token: Stops copying the remaining files once cancelled
+        """
         logger.info(f"Copying and normalizing: {src} -> {dest}")
         
         if not src.exists():
@@ -51,14 +71,18 @@ class FileNormalizer:
             files = [src]
             src_base = src.parent
         elif src.is_dir():
-            files = [f for f in src.rglob('*') if f.is_file()]
+            if files is None:
+                files = [f.path for f in TreeWalker.walk(src)]
             src_base = src
         else:
             raise FileProcessingError(f"Source path is neither file nor directory: {src}")
         
         logger.info(f"Found {len(files)} files to process")
+        progress = ProgressLog(progress_callback, "Copied", len(files))
         
         def copy_file(file: Path) -> None:
+            if cancel_token is not None:
+                cancel_token.check()
             try:
                 norm_name = FileNormalizer.normalize_filename(file.name)
                 
@@ -69,18 +93,67 @@ class FileNormalizer:
                     target_path = dest / rel_path
                 
                 target_path.parent.mkdir(parents=True, exist_ok=True)
-                logger.info(f"Copying: {file} -> {target_path}")
-                shutil.copy2(file, target_path)
+                method = FileNormalizer.stage_file(file, target_path)
+                logger.debug("Staged (%s): %s -> %s", method, file, target_path)
+                progress.update()
                 
-                if progress_callback:
-                    progress_callback(f"Copied: {file.name}")
-                    
             except Exception as e:
                 logger.error(f"Failed to copy file {file}: {e}")
                 raise FileProcessingError(f"Failed to copy file {file}: {e}")
         
         with ThreadPoolExecutor() as executor:
-            executor.map(copy_file, files)
+            # Consume results so that copy failures are raised here
+            list(executor.map(copy_file, files))
+        progress.finish()
+    
+    @staticmethod
+    def needs_rename(files: List[Path]) -> bool:
+        """Check whether any of the files has a versioned name that normalization rewrites"""
+        return any(FileNormalizer.normalize_filename(f.name) != f.name for f in files)
+    
+    @staticmethod
+    def stage_file(src: Path, target: Path) -> str:
+        """
+        Place src at target without duplicating data when possible
+        
+        In 'link' staging mode this tries a reflink (copy-on-write clone),
+        then a hardlink, and only copies when both fail (e.g. across devices).
+        
+        Returns:
+            Method used: 'reflink', 'hardlink' or 'copy'
+        """
+        if config.staging.mode == 'link':
+            if FileNormalizer._reflink(src, target):
+                shutil.copystat(src, target)
+                return 'reflink'
+            try:
+                os.link(src, target)
+                return 'hardlink'
+            except OSError:
+                pass
+        
+        shutil.copy2(src, target)
+        return 'copy'
+    
+    @staticmethod
+    def _reflink(src: Path, target: Path) -> bool:
+        """Clone src to target with the Linux FICLONE ioctl (btrfs, XFS, ...)"""
+        if fcntl is None:
+            return False
+        
+        try:
+            with open(src, 'rb') as src_file, open(target, 'xb') as target_file:
+                try:
+                    fcntl.ioctl(target_file.fileno(), _FICLONE, src_file.fileno())
+                    return True
+                except OSError:
+                    pass
+        except OSError:
+            return False
+        
+        # Clone unsupported on this filesystem: remove the empty target file
+        target.unlink()
+        return False
 
 
 class ExcelFormatter:
@@ -100,8 +173,9 @@ class ExcelFormatter:
                     ws.column_dimensions[col_letter].width = fmt['width']
                 
                 if 'font' in fmt:
+                    font = Styles.font(name=fmt['font'])
                     for cell in ws[col_letter]:
-                        cell.font = Font(name=fmt['font'])
+                        Styles.apply(cell, font=font)
                 
                 if 'comment' in fmt:
                     ExcelFormatter._set_extra_table(ws, fmt, end_row)
@@ -117,7 +191,7 @@ class ExcelFormatter:
         """Set header for column"""
         cell = ws[fmt['col'] + '1']
         cell.value = fmt['header']
-        cell.font = Font(bold=True)
+        Styles.apply(cell, font=Styles.font(bold=True))
     
     @staticmethod
     def _set_extra_table(ws, fmt: dict, end_row: Optional[int] = None) -> None:
@@ -128,38 +202,30 @@ class ExcelFormatter:
         # Set header
         header_cell = ws[fmt['col'] + '1']
         header_cell.value = fmt['comment']
-        header_cell.alignment = Alignment(vertical='center', horizontal='center')
-        header_cell.fill = PatternFill(start_color='CCFFCC', end_color='CCFFCC', fill_type='solid')
+        Styles.apply(header_cell, alignment=Styles.alignment(), fill=Styles.fill('CCFFCC'))
         
-        # Set borders (vertical only for cleaner look)
-        vertical_border = Border(
-            left=Side(style='thin', color='C0C0C0'),
-            right=Side(style='thin', color='C0C0C0')
-            # No top/bottom borders
-        )
+        # Set borders (vertical only for cleaner look, no top/bottom borders)
+        vertical_border = Styles.border('C0C0C0', vertical_only=True)
         
         for i in range(1, end_row + 1):
             cell = ws[fmt['col'] + str(i)]
-            cell.border = vertical_border
+            Styles.apply(cell, border=vertical_border)
         
         # Fill empty cells
+        empty_fill = Styles.fill('E0E0E0')
         for i in range(config.excel.diff_start_row, end_row + 1):
             code_col = config.diff_formats['code'][0]['col']
             code_cell = ws[code_col + str(i)]
             if code_cell.fill.start_color.rgb in ('FFFFFFFF', '00000000'):
                 target_cell = ws[fmt['col'] + str(i)]
                 target_cell.value = '-'
-                target_cell.fill = PatternFill(start_color='E0E0E0', end_color='E0E0E0', fill_type='solid')
+                Styles.apply(target_cell, fill=empty_fill)
     
     @staticmethod
     def _apply_borders_to_sheet(ws, end_row: int) -> None:
         """Apply borders to all cells in the sheet for better visibility"""
-        # Create border style with only vertical lines (no horizontal lines for cleaner look)
-        vertical_only_border = Border(
-            left=Side(style='thin', color='E0E0E0'),
-            right=Side(style='thin', color='E0E0E0')
-            # No top/bottom borders for cleaner horizontal view
-        )
+        # Border style with only vertical lines (no horizontal lines for cleaner look)
+        vertical_only_border = Styles.border('E0E0E0', vertical_only=True)
         
         # Get all columns that have data
         max_col = ws.max_column
@@ -168,7 +234,7 @@ class ExcelFormatter:
         for row in range(1, end_row + 1):
             for col in range(1, max_col + 1):
                 cell = ws.cell(row=row, column=col)
-                cell.border = vertical_only_border
+                Styles.apply(cell, border=vertical_only_border)
 
 
 class PathManager:
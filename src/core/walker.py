@@ -0,0 +1,77 @@
+# -*- coding: UTF-8 -*-
+"""
+Concurrent os.scandir based walker for the input trees
+"""
+import os
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+
+from .config import config
+
+
+class WalkedFile(NamedTuple):
+    """File found by the walker"""
+    path: Path
+    rel: str  # Path relative to the walked root (posix style)
+    stat: os.stat_result
+
+
+class TreeWalker:
+    """
+    Lists the files of a tree with os.scandir, listing directories concurrently
+
+    Stat data comes from the DirEntry (free on Windows, one stat elsewhere)
+    and is handed on so later stages do not stat again. Include/exclude glob
+    patterns are matched against the entry name and its relative path while
+    walking, so excluded folders are never descended into.
+    """
+
+    @staticmethod
+    def matches(name: str, rel: str, patterns: Sequence[str]) -> bool:
+        """Check a name or relative path against glob patterns"""
+        return any(fnmatch(name, pattern) or fnmatch(rel, pattern) for pattern in patterns)
+
+    @staticmethod
+    def walk(root: Path, include: Optional[Sequence[str]] = None,
+             exclude: Optional[Sequence[str]] = None) -> List[WalkedFile]:
+        """
+        List the files under root (symlinked folders are not followed)
+
+        Args:
+            root: Folder to walk
+            include: Patterns a file must match (defaults to config.walk.include; empty = all files)
+            exclude: Patterns of files and folders to skip (defaults to config.walk.exclude)
+
+        Returns:
+            Files sorted by relative path
+        """
+        include = config.walk.include if include is None else include
+        exclude = config.walk.exclude if exclude is None else exclude
+
+        def scan_dir(path: str, rel_prefix: str) -> Tuple[List[WalkedFile], List[Tuple[str, str]]]:
+            files, subdirs = [], []
+            with os.scandir(path) as entries:
+                for entry in entries:
+                    rel = rel_prefix + entry.name
+                    if exclude and TreeWalker.matches(entry.name, rel, exclude):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append((entry.path, rel + '/'))
+                    elif entry.is_file() and (not include or TreeWalker.matches(entry.name, rel, include)):
+                        files.append(WalkedFile(Path(entry.path), rel, entry.stat()))
+            return files, subdirs
+
+        files: List[WalkedFile] = []
+        with ThreadPoolExecutor(max_workers=max(1, config.walk.workers)) as executor:
+            pending = {executor.submit(scan_dir, str(root), '')}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    dir_files, subdirs = future.result()
+                    files.extend(dir_files)
+                    pending.update(executor.submit(scan_dir, path, rel) for path, rel in subdirs)
+
+        files.sort(key=lambda f: f.rel)
+        return files
@@ -2,54 +2,35 @@
 """
 WinMerge integration and Excel conversion module
 """
+import heapq
 import os
-import sys
-import subprocess
 from pathlib import Path
-from typing import Optional, Callable
+from typing import Dict, Iterator, Optional, Callable, Tuple
 
-from openpyxl import load_workbook
-from openpyxl.styles import Font, PatternFill
+from openpyxl import Workbook
 
 from .config import config
-from .exceptions import WinMergeNotFoundError, ExcelProcessingError, FileProcessingError
-from .utils import FileNormalizer, ExcelFormatter, PathManager, clean_output_files
+from .exceptions import ExcelProcessingError, FileProcessingError, OperationCancelledError
+from .cancellation import CancellationToken
+from .utils import ExcelFormatter, PathManager, clean_output_files
+from .diffbackend import DiffBackend, create_backend
+from .prescan import PreScanner, IDENTICAL, CACHED, CLASSIFIED
+from .classify import FileClassifier, BINARY, OVERSIZE, WINDOW
+from .parallel import parallel_map
+from .resultcache import ResultCache, CachedResult
+from .shardwriter import ShardWriter
+from .diffmodel import FileDiff, SummaryEntry, SUMMARY_NAME_COL
+from .sheetwriter import DiffSheetWriter, StreamingSheetWriter
+from .styles import Styles
 from .diffdetailsheetcreater import DiffDetailSheetCreator
-from .common import Timer, logger
+from .filelock import FileLockProbe
+from .common import ProgressLog, Timer, logger, tracer
 
-
-def try_close_excel_file(file_path: Path) -> bool:
-    """
-    Try to close an Excel file if it's open
-    
-    Returns:
-        True if file was closed or not open, False if failed to close
-    """
-    try:
-        import psutil
-        
-        file_path = str(file_path).lower()
-        
-        for proc in psutil.process_iter(['pid', 'name', 'open_files']):
-            try:
-                if proc.info['name'] and 'excel' in proc.info['name'].lower():
-                    if proc.info['open_files']:
-                        for file in proc.info['open_files']:
-                            if file_path in file.path.lower():
-                                logger.info(f"Found Excel process (PID: {proc.info['pid']}) with file open")
-                                # Don't kill the process, just log it
-                                return False
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-        
-        return True
-        
-    except ImportError:
-        logger.debug("psutil not available, skipping Excel process check")
-        return True
-    except Exception as e:
-        logger.warning(f"Error checking Excel processes: {e}")
-        return True
+# Overall progress (percent) at the end of each stage; the per-file sheets
+# advance it from PROGRESS_SCANNED to PROGRESS_SHEETS by files and bytes done
+PROGRESS_SCANNED = 5
+PROGRESS_SHEETS = 85
+PROGRESS_FORMATTED = 95
 
 
 timer_WMX = Timer("WinMergeXlsx")
@@ -57,19 +38,35 @@ class WinMergeXlsx:
     """Main class for WinMerge integration and Excel conversion"""
     
     def __init__(self, base: str, latest: str, output: str = './output.xlsx', 
-                 log_callback: Optional[Callable[[str], None]] = None):
+                 log_callback: Optional[Callable[[str], None]] = None,
+                 cancel_token: Optional[CancellationToken] = None,
+                 progress_callback: Optional[Callable[[int], None]] = None):
         self.base = Path(base).absolute()
         self.latest = Path(latest).absolute()
         self.output = Path(output).absolute()
         self.log_callback = log_callback
+        self.progress_callback = progress_callback
+        self._progress = -1
+        # Input bytes of each changed file by relative path (progress weights)
+        self.pair_bytes: Dict[str, int] = {}
+        self.cancel_token = cancel_token or CancellationToken()
         
         self.output_html = self.output.with_suffix('.html')
         self.output_html_files = self.output_html.with_name(self.output_html.stem + '.files')
         
         self.path_manager = PathManager()
+        self.backend = create_backend(config.winmerge.backend, self.log, self.path_manager, self.cancel_token)
+        self.writer = DiffSheetWriter()
         
         # Sheet name to original filename mapping
         self.sheet_name_to_filename = {}
+        # Relative path (FilePair.key) to the sheet written for the file
+        self.sheet_name_by_key: Dict[str, str] = {}
+        # Sheet name to the hunk index (changed row ranges) of its FileDiff
+        self.hunks_by_sheet = {}
+        
+        self.cache = ResultCache() if config.cache.enabled else None
+        self.shards: Optional[ShardWriter] = None
         
         self._validate_inputs()
         self._setup()
@@ -80,21 +77,59 @@ class WinMergeXlsx:
             self.log_callback(message)
         logger.info(message)
 
+    def report_progress(self, percent: float) -> None:
+        """Pass overall progress (0-100) to the progress callback when its whole percent changes"""
+        percent = max(0, min(100, int(percent)))
+        if self.progress_callback and percent != self._progress:
+            self._progress = percent
+            self.progress_callback(percent)
+
     def generate(self) -> None:
         """Main generation process"""
+        tracer.reset()
         timer_WMX.start(memo="generate")
         try:
-            self._normalize_files()
-            self._generate_html_by_winmerge()
-            self._convert_html_to_xlsx()
-            DiffDetailSheetCreator(str(self.output), sheet_name_to_filename=self.sheet_name_to_filename).generate()
+            self._compare()
+            if config.excel.write_only or config.shard.enabled:
+                self._stream_workbook()
+            else:
+                self._build_workbook()
+                self._process_with_openpyxl()
+                DiffDetailSheetCreator(
+                    self.wb,
+                    sheet_name_to_filename=self.sheet_name_to_filename,
+                    hunks_by_sheet=self.hunks_by_sheet,
+                    cancel_token=self.cancel_token
+                ).generate()
+            self.report_progress(PROGRESS_FORMATTED)
+            self._save_workbook()
+            self.report_progress(100)
             self.log("Generation completed successfully")
+        except OperationCancelledError:
+            self.log("Generation cancelled")
+            # Drop partial output (reports, shards already written)
+            self._clean_output_files()
+            raise
         except Exception as e:
             logger.error(f"Generation failed: {e}")
             raise
         finally:
             self._cleanup()
             timer_WMX.stop()
+            if config.trace.enabled:
+                self._write_trace()
+
+    def _write_trace(self) -> None:
+        """Write the run's spans as Chrome trace JSON next to the output and log the summary table"""
+        trace_path = self.output.with_suffix('.trace.json')
+        try:
+            tracer.write_chrome_trace(trace_path)
+            self.log(f"Trace written: {trace_path}")
+        except OSError as e:
+            logger.warning(f"Failed to write trace {trace_path}: {e}")
+        
+        for line in tracer.summary():
+            logger.info(line)
 
     def _validate_inputs(self) -> None:
         """Validate input parameters"""
@@ -103,9 +138,7 @@ class WinMergeXlsx:
         if not self.latest.exists():
             raise FileProcessingError(f"Latest path does not exist: {self.latest}")
         
-        winmerge_path = Path(config.winmerge.executable_path)
-        if not winmerge_path.exists():
-            raise WinMergeNotFoundError(f"WinMerge not found at: {winmerge_path}")
+        self.backend.validate()
 
     def _setup(self) -> None:
         """Setup application environment"""
@@ -114,80 +147,231 @@ class WinMergeXlsx:
     def _clean_output_files(self) -> None:
         """Clean existing output files"""
         try:
-            clean_output_files(self.output_html, self.output_html_files, self.output)
+            clean_output_files(self.output_html, self.output_html_files, self.output,
+                               *ShardWriter.existing_shards(self.output))
         except Exception as e:
             # Don't fail if cleanup fails - we'll try to overwrite
             logger.warning(f"File cleanup warning: {e}")
             self.log("Note: Output files may be in use. Will attempt to overwrite.")
 
-    def _generate_html_by_winmerge(self) -> None:
-        """Generate HTML report using WinMerge"""
-        self.log("Generating HTML report with WinMerge...")
-        
-        command = config.get_winmerge_command(
-            str(self.normalized_base),
-            str(self.normalized_latest),
-            str(self.output_html)
-        )
-        
-        logger.debug(f"WinMerge command: {' '.join(command)}")
+    @tracer.span("WinMergeXlsx compare")
+    def _compare(self) -> None:
+        """Pre-scan both trees, take cached results and start diffing the remaining pairs"""
+        self.log("Scanning for identical files...")
+        pairs = PreScanner.scan(self.base, self.latest)
+        self.cancel_token.check()
+        self.identical = [pair for pair in pairs if pair.status == IDENTICAL]
+        self.classified = self._classify(pairs)
+        self.cached = self._load_cached(pairs)
+        to_diff = [pair for pair in pairs if pair.needs_diff]
+        self.log(f"{len(self.identical)} identical files skipped, {len(to_diff)} files to compare")
+        windowed = [pair for pair in self.classified if FileClassifier.policy(pair.kind) == WINDOW]
+        listed_only = {pair.key for pair in self.classified} - {pair.key for pair in windowed}
+        self.pair_bytes = {pair.key: pair.size for pair in pairs
+                           if pair.status != IDENTICAL and pair.key not in listed_only}
+        self.report_progress(PROGRESS_SCANNED)
+        
+        self.result = self.backend.compare(self.base, self.latest, pairs, self.output_html)
+        if windowed:
+            self.result.files = heapq.merge(self.result.files, self._iter_windowed(windowed),
+                                            key=lambda file_diff: self.backend.file_order(file_diff.key))
+        if self.cache is not None:
+            self.result.files = self._merge_cached_files(self.result.files)
+
+    def _classify(self, pairs):
+        """Classify changed pairs and return the ones handled by a binary/oversize policy instead of the backend"""
+        if not config.classify.enabled:
+            return []
+        
+        counts = FileClassifier.classify_pairs(pairs)
+        if counts[BINARY] or counts[OVERSIZE]:
+            self.log(f"{counts[BINARY]} binary and {counts[OVERSIZE]} oversize files among the changed files "
+                     f"(policies: binary '{config.classify.binary_policy}', "
+                     f"oversize '{config.classify.oversize_policy}')")
+        return [pair for pair in pairs if pair.status == CLASSIFIED]
+
+    def _iter_windowed(self, pairs):
+        """Diff windowed oversize pairs natively in backend order, adding their Summary entries"""
+        pairs = sorted(pairs, key=lambda pair: self.backend.file_order(pair.key))
+        self.log(f"Comparing {len(pairs)} oversize files (rows around the changes only)...")
+        for entry, file_diff in parallel_map(FileClassifier.windowed_diff, pairs, label=lambda pair: pair.key):
+            self.cancel_token.check()
+            self.result.summary.entries.append(entry)
+            if file_diff is not None:
+                yield file_diff
+
+    def _load_cached(self, pairs):
+        """Mark changed pairs with a cached result as CACHED and return (pair, result) tuples"""
+        self.cache_keys = {}
+        if self.cache is None:
+            return []
+        
+        self.cache_keys = self.cache.keys_for(pairs)
+        pairs_by_key = {pair.key: pair for pair in pairs}
+        
+        cached = []
+        for pair_key, cache_key in self.cache_keys.items():
+            entry = self.cache.get(cache_key)
+            if entry is not None:
+                pair = pairs_by_key[pair_key]
+                pair.status = CACHED
+                if entry.file_diff is not None:
+                    # The cached header holds the paths of the run that stored the entry
+                    entry.file_diff.header = DiffBackend.file_header(pair.left, pair.right)
+                cached.append((pair, entry))
+        
+        self.log(f"{len(cached)} of {len(self.cache_keys)} changed files taken from the result cache")
+        return cached
+
+    def _merge_cached_files(self, files):
+        """
+        Merge cached file diffs into the backend's file diffs in backend order
         
-        try:
-            result = subprocess.run(
-                command,
-                check=True,
-                capture_output=True,
-                text=True,
-                timeout=300  # 5 minutes timeout
-            )
-            self.log("WinMerge HTML generation completed")
-            if result.stdout:
-                logger.debug(f"WinMerge output: {result.stdout}")
-        except subprocess.TimeoutExpired:
-            raise ExcelProcessingError("WinMerge execution timed out after 5 minutes")
-        except subprocess.CalledProcessError as e:
-            error_msg = f"WinMerge execution failed: {e}"
-            if e.stderr:
-                error_msg += f"\nError output: {e.stderr}"
-            raise ExcelProcessingError(error_msg)
+        Fresh results are stored in the cache as they pass through, then the
+        cache is pruned to its size limit.
+        """
+        results_by_key = {}
+        indexed = 0
+        
+        def summary_result(key: str) -> str:
+            # Native backends add Summary entries while their files are consumed
+            nonlocal indexed
+            entries = self.result.summary.entries
+            for entry in entries[indexed:]:
+                results_by_key[entry.key] = entry.result
+            indexed = len(entries)
+            return results_by_key.get(key, '')
+        
+        def fresh_files():
+            stored = set()
+            for file_diff in files:
+                result = summary_result(file_diff.key)
+                if file_diff.key in self.cache_keys and result:
+                    self.cache.put(self.cache_keys[file_diff.key], CachedResult(result, file_diff))
+                    stored.add(file_diff.key)
+                yield file_diff
+            
+            # Pairs compared without a file diff (identical text, binary). A text
+            # difference without one means its report failed to parse: not cached.
+            for pair_key, cache_key in self.cache_keys.items():
+                result = summary_result(pair_key)
+                if pair_key not in stored and result and result != 'Text files are different':
+                    self.cache.put(cache_key, CachedResult(result, None))
+            self.cache.prune()
+        
+        cached_files = sorted(
+            (entry.file_diff for _, entry in self.cached if entry.file_diff is not None),
+            key=lambda file_diff: self.backend.file_order(file_diff.key)
+        )
+        return heapq.merge(fresh_files(), cached_files, key=lambda file_diff: self.backend.file_order(file_diff.key))
+
+    def _finalize_summary(self) -> None:
+        """List identical, cached and classified files in Summary and sort it (once all file diffs are consumed)"""
+        entries = self.result.summary.entries
+        for pair in self.identical:
+            entries.append(DiffBackend.summary_entry(
+                pair.name, SummaryEntry.display_folder(pair.folder), 'Identical', pair.left, pair.right
+            ))
+        for pair, cached in self.cached:
+            entries.append(DiffBackend.summary_entry(
+                pair.name, SummaryEntry.display_folder(pair.folder), cached.result, pair.left, pair.right
+            ))
+        for pair in self.classified:
+            # Windowed pairs got their entries while being diffed
+            if FileClassifier.policy(pair.kind) != WINDOW:
+                entries.append(DiffBackend.summary_entry(
+                    pair.name, SummaryEntry.display_folder(pair.folder), FileClassifier.summary_result(pair),
+                    pair.left, pair.right
+                ))
+        # One separator for all sources, so each folder sorts into one group
+        for entry in entries:
+            entry.normalize_folder()
+        entries.sort(key=lambda entry: (entry.folder, entry.name))
 
-    def _convert_html_to_xlsx(self) -> None:
-        """Convert HTML report to Excel using pure Python (no Excel COM)"""
-        timer_WMX.start(memo="convert_html_to_xlsx")
+    def _build_workbook(self) -> None:
+        """Build the in-memory workbook (Summary + per-file sheets) from the diff result"""
+        timer_WMX.start(memo="build_workbook")
         
         try:
-            from src.converters.html_to_excel import HTMLToExcelConverter
+            self.log("Converting diff results to Excel (no Excel installation required)...")
             
-            self.log("Converting HTML to Excel (no Excel installation required)...")
+            self.wb = Workbook()
+            for sheet_name, file_diff in self._iter_diff_sheets():
+                with tracer.span('write_sheet', category='file', item=sheet_name):
+                    self.writer.write_file_diff(self.wb, file_diff, sheet_name)
+                self.hunks_by_sheet[sheet_name] = file_diff.hunks
             
-            # Create converter
-            converter = HTMLToExcelConverter(log_callback=self.log_callback)
+            # The default first sheet becomes Summary
+            self._finalize_summary()
+            self.writer.write_summary(self.wb, self.result.summary)
             
-            # Convert summary HTML to workbook
-            self.wb = converter.convert_summary_html(self.output_html)
-            
-            # Convert all diff HTML files
-            self._convert_diff_html_files(converter)
+        except OperationCancelledError:
+            raise
+        except Exception as e:
+            raise ExcelProcessingError(f"Excel conversion failed: {e}")
+        finally:
+            timer_WMX.stop()
+
+    def _stream_workbook(self) -> None:
+        """
+        Stream all sheets into a write-only workbook
+        
+        Each file diff is written to its own sheet and to the compare sheet as
+        soon as the backend produces it, with final formatting applied on the
+        way, so memory does not grow with the size of the diffs.
+        
+        In sharded mode (config.shard) the per-file sheets go to shard
+        workbooks written in parallel, and the output workbook becomes an
+        index holding compare and Summary, linked to the shards.
+        """
+        timer_WMX.start(memo="stream_workbook")
+        
+        try:
+            self.log("Streaming diff results to Excel (write-only workbook)...")
             
-            # Check if file is open in Excel before saving
-            if not try_close_excel_file(self.output):
-                self.log("Warning: Excel file is currently open. Attempting to save anyway...")
+            self.wb = Workbook(write_only=True)
+            stream_writer = StreamingSheetWriter()
+            creator = DiffDetailSheetCreator(self.wb, sheet_name_to_filename=self.sheet_name_to_filename,
+                                             cancel_token=self.cancel_token)
+            if config.shard.enabled:
+                self.shards = ShardWriter(self.output, self.log)
             
-            # Save initial version with retry logic
-            self._save_workbook_with_retry(self.wb, self.output)
+            try:
+                for sheet_name, file_diff in self._iter_diff_sheets():
+                    with tracer.span('write_sheet', category='file', item=sheet_name):
+                        if self.shards is None:
+                            stream_writer.write_file_diff(self.wb.create_sheet(title=sheet_name), file_diff)
+                            creator.add_file(sheet_name, file_diff)
+                        else:
+                            shard_file = self.shards.add(sheet_name, file_diff)
+                            creator.add_file(sheet_name, file_diff, self._sheet_link(sheet_name, shard_file))
+                if self.shards is not None:
+                    self.shards.close()
+            finally:
+                if self.shards is not None:
+                    self.shards.shutdown()
             
-            # Now process with openpyxl for formatting
-            self._process_with_openpyxl()
+            # Summary goes right after the compare sheet(s), as in the normal layout
+            self._finalize_summary()
+            summary_ws = self.wb.create_sheet(title="Summary", index=self.wb.index(creator.detail_ws) + 1)
+            stream_writer.write_summary(summary_ws, self.result.summary, self._summary_hyperlinks())
             
-        except PermissionError as e:
-            error_msg = f"Cannot save Excel file. Please close '{self.output.name}' if it's open in Excel."
-            logger.error(error_msg, exc_info=True)
-            raise ExcelProcessingError(error_msg)
+        except OperationCancelledError:
+            StreamingSheetWriter.discard(self.wb)
+            raise
         except Exception as e:
+            StreamingSheetWriter.discard(self.wb)
             raise ExcelProcessingError(f"Excel conversion failed: {e}")
         finally:
             timer_WMX.stop()
 
+    @staticmethod
+    def _sheet_link(sheet_name: str, workbook_file: Optional[str] = None) -> str:
+        """Hyperlink target of a sheet's home cell, in another workbook if given"""
+        if workbook_file is None:
+            return f"{sheet_name}!{config.excel.home_position}"
+        return f"{workbook_file}#'{sheet_name}'!{config.excel.home_position}"
+
     def _save_workbook_with_retry(self, wb, output_path: Path, max_retries: int = 5) -> None:
         """
         Save workbook with retry logic for file locks
@@ -288,100 +472,31 @@ class WinMergeXlsx:
                 f"Please close '{output_path.name}' in Excel and try again."
             )
 
-    def _extract_filename_from_stem(self, stem: str) -> str:
-        """
-        Extract actual filename from HTML file stem.
-        
-        HTML files from WinMerge use pattern: folder1_folder2_..._filename
-        We need to identify where the path ends and filename begins.
-        
-        Strategy:
-        1. Look for file extension (contains '.')
-        2. Scan backwards from extension to find filename pattern
-        3. Consider common folder names (modules, ctrl, tool, etc.) as path components
-        
-        Examples:
-            "modcommon_modules_SPM_SEQ_spm_tbl_rinse.t" -> "spm_tbl_rinse.t"
-            "sc2stb_ctrl_v4_LINK_CTRLA_SP3_2.l" -> "CTRLA_SP3_2.l"
-            "sc2stb_modules_SPM_tool_gui_Gui_Res_spm_en-US.rc" -> "spm_en-US.rc"
-            "sc2stb_etc_cset_file.SP3" -> "cset_file.SP3"
-        """
-        parts = stem.split('_')
-        
-        # Common folder names that are NOT part of filenames
-        folder_keywords = {
-            'modules', 'ctrl', 'tool', 'gui', 'etc', 'src', 'include',
-            'lib', 'bin', 'obj', 'SEQ', 'u', 'v4', 'LINK', 'Res',
-            'modcommon', 'sc2stb', 'Gui'
-        }
-        
-        # Find the extension position (last part with '.')
-        ext_index = -1
-        for i in range(len(parts) - 1, -1, -1):
-            if '.' in parts[i]:
-                ext_index = i
-                break
-        
-        if ext_index == -1:
-            # No extension found, return last part
-            return parts[-1]
-        
-        # Scan backwards from extension to find start of filename
-        # A filename typically starts after a known folder keyword
-        filename_start = 0
-        
-        for i in range(ext_index, -1, -1):
-            part = parts[i]
-            
-            # Check if this part is a folder keyword
-            if part in folder_keywords:
-                filename_start = i + 1
-                break
-            
-            # If we reach the beginning, include from start
-            if i == 0:
-                filename_start = 0
-        
-        # Special case: if filename_start is too close to extension, 
-        # take at least 2 parts before extension
-        if ext_index - filename_start < 1:
-            filename_start = max(0, ext_index - 1)
-        
-        # Build filename from identified parts
-        filename_parts = parts[filename_start:ext_index + 1]
-        filename = '_'.join(filename_parts)
-        
-        return filename
-
-    def _convert_diff_html_files(self, converter) -> None:
-        """Convert all diff HTML files to Excel sheets"""
-        html_files = sorted(self.output_html_files.glob('**/*.html'))
-        self.log(f"Processing {len(html_files)} diff HTML files...")
+    def _iter_diff_sheets(self) -> Iterator[Tuple[str, FileDiff]]:
+        """Assign a unique sheet name to each changed file as the backend produces it"""
+        self.log("Writing diff sheets...")
         
         # Track sheet names to handle duplicates
         used_sheet_names = set()
-        
-        for count, html_file in enumerate(html_files, start=1):
-            # Generate sheet name from file
-            original_name = html_file.stem
-            
-            # Extract filename from path-like stem more reliably
-            # HTML file names follow pattern: folder1_folder2_..._filename.ext
-            # We need to find where the path ends and filename begins
-            filename = self._extract_filename_from_stem(original_name)
-            
-            logger.info(f"[DEBUG] HTML file: {html_file.name}")
-            logger.info(f"[DEBUG] HTML stem (original): '{original_name}'")
-            logger.info(f"[DEBUG] Extracted filename: '{filename}'")
+        progress = ProgressLog(self.log, "Written", unit='sheets')
+        total_files = max(len(self.pair_bytes), 1)
+        total_bytes = max(sum(self.pair_bytes.values()), 1)
+        done_bytes = 0
+        
+        for count, file_diff in enumerate(self.result.files, start=1):
+            self.cancel_token.check()
+            tracer.count('files')
+            tracer.count('rows', len(file_diff))
             
             # Use filename as sheet name (more readable than full path)
+            filename = file_diff.name
             sheet_name = filename
             
             # Handle Excel's 31 character limit for sheet names
             if len(sheet_name) > 31:
                 # Truncate and add counter
                 sheet_name = sheet_name[:28] + f"_{count}"
-                logger.info(f"[DEBUG] Sheet name too long, truncated: '{filename}' -> '{sheet_name}'")
+                logger.debug("Sheet name too long, truncated: '%s' -> '%s'", filename, sheet_name)
             
             # Handle duplicate sheet names
             original_sheet_name = sheet_name
@@ -393,46 +508,66 @@ class WinMergeXlsx:
                 else:
                     sheet_name = f"{original_sheet_name}_{suffix}"
                 suffix += 1
-                logger.info(f"[DEBUG] Duplicate sheet name, adjusted: '{original_sheet_name}' -> '{sheet_name}'")
+                logger.debug("Duplicate sheet name, adjusted: '%s' -> '%s'", original_sheet_name, sheet_name)
             
             used_sheet_names.add(sheet_name)
             
             # Store mapping from sheet name to actual filename
             # (in this case, they should be the same or very similar)
             self.sheet_name_to_filename[sheet_name] = filename
-            logger.info(f"[DEBUG] Final sheet name: '{sheet_name}'")
+            if file_diff.key:
+                self.sheet_name_by_key[file_diff.key] = sheet_name
+            logger.debug("Final sheet name: '%s'", sheet_name)
             
-            converter.convert_html_file(html_file, self.wb, sheet_name)
+            yield sheet_name, file_diff
+            progress.update()
             
-            if count % 10 == 0:
-                self.log(f"Processed {count}/{len(html_files)} files...")
+            # Files without a sheet (identical text, binary) are not counted: progress may jump at the end
+            done_bytes += self.pair_bytes.get(file_diff.key, 0)
+            fraction = (count / total_files + done_bytes / total_bytes) / 2
+            self.report_progress(PROGRESS_SCANNED + (PROGRESS_SHEETS - PROGRESS_SCANNED) * fraction)
+        
+        progress.finish()
+        self.report_progress(PROGRESS_SHEETS)
 
     def _process_with_openpyxl(self) -> None:
-        """Process Excel file using openpyxl for final formatting"""
+        """Apply final formatting to the in-memory workbook"""
         self.log("Applying final formatting with openpyxl...")
         
-        # Reload the workbook to ensure proper processing
-        self.wb = load_workbook(filename=self.output)
         self.summary_ws = self.wb.worksheets[config.excel.summary_ws_num - 1]
         
         self._format_summary_sheet()
         self._format_diff_sheets()
-        self._save_workbook()
 
     def _format_summary_sheet(self) -> None:
         """Format summary sheet"""
         logger.info("Formatting summary sheet")
         
-        for row in self.summary_ws.iter_rows(min_row=config.excel.summary_start_row):
-            name_cell = row[config.excel.summary_name_col_index]
-            if not name_cell.value:
-                break
-                
-            name_cell.hyperlink = f"{name_cell.value}!{config.excel.home_position}"
-            folder_cell = row[config.excel.summary_folder_col_index]
+        for (row, column), hyperlink in self._summary_hyperlinks().items():
+            self.summary_ws.cell(row=row, column=column).hyperlink = hyperlink
+
+    def _summary_hyperlinks(self) -> Dict[Tuple[int, int], str]:
+        """
+        Get Summary hyperlink targets by (row, column) from the Summary table
+        
+        Summary rows are written from row 2, one per entry, in the column
+        layout of SummaryEntry. Each entry links to the sheet written for its
+        file, looked up by relative path; entries without a sheet get no link.
+        Also renames the linked HTML reports.
+        """
+        hyperlinks = {}
+        
+        for row, entry in enumerate(self.result.summary.entries, start=2):
+            sheet_name = self.sheet_name_by_key.get(entry.key)
+            if sheet_name is None:
+                continue
             
-            if folder_cell.value:
-                self._rename_html_files(name_cell.value, folder_cell.value)
+            shard_file = self.shards.sheet_files.get(sheet_name) if self.shards is not None else None
+            hyperlinks[(row, SUMMARY_NAME_COL + 1)] = self._sheet_link(sheet_name, shard_file)
+            if entry.folder:
+                self._rename_html_files(entry.name, entry.folder)
+        
+        return hyperlinks
 
     def _rename_html_files(self, name: str, folder: str) -> None:
         """Rename HTML files for proper linking"""
@@ -448,43 +583,54 @@ class WinMergeXlsx:
         logger.info("Formatting diff sheets")
         
         for ws in self.wb.worksheets[config.excel.diff_start_row - 1:]:
+            self.cancel_token.check()
             self._remove_hyperlinks_from_line_numbers(ws)
             ExcelFormatter.set_worksheet_format(ws)
 
     def _remove_hyperlinks_from_line_numbers(self, ws) -> None:
         """Remove hyperlinks from line number columns"""
+        fill = Styles.fill('F0F0F0')
+        font = Styles.font(size=12)
+        
         for fmt in config.diff_formats['no']:
             col_letter = fmt['col']
             
             for row in range(config.excel.diff_start_row, ws.max_row + 1):
                 cell = ws[f"{col_letter}{row}"]
                 cell.hyperlink = None
-                cell.fill = PatternFill(start_color="F0F0F0", end_color="F0F0F0", fill_type="solid")
-                cell.font = Font(size=12)
+                Styles.apply(cell, fill=fill, font=font)
 
     def _save_workbook(self) -> None:
-        """Save the workbook with retry logic"""
-        self._save_workbook_with_retry(self.wb, self.output)
-        self.log(f"Excel file saved: {self.output}")
-
-    def _normalize_files(self) -> None:
-        """Normalize versioned files and copy to temporary directories"""
-        logger.info("Normalizing files")
+        """Save the workbook with retry logic (the only write of the .xlsx file)"""
+        timer_WMX.start(memo="save_workbook")
         
-        self.temp_base = self.path_manager.create_temp_dir()
-        self.temp_latest = self.path_manager.create_temp_dir()
-
-        FileNormalizer.copy_and_normalize(
-            self.base, self.temp_base, 
-            lambda msg: self.log(f"Base: {msg}")
-        )
-        FileNormalizer.copy_and_normalize(
-            self.latest, self.temp_latest,
-            lambda msg: self.log(f"Latest: {msg}")
-        )
-
-        self.normalized_base = self.temp_base
-        self.normalized_latest = self.temp_latest
+        try:
+            # Last point to stop: the save itself is not interrupted
+            self.cancel_token.check()
+            
+            # Check if the file is open in Excel before saving
+            max_retries = 5
+            reason = FileLockProbe.probe(self.output)
+            if reason:
+                logger.info(f"Output file is in use: {reason}")
+                self.log("Warning: Excel file is currently open. Attempting to save anyway...")
+                if config.excel.find_lock_holder:
+                    pid = FileLockProbe.find_holder(self.output)
+                    if pid is not None:
+                        logger.info(f"Found Excel process (PID: {pid}) with file open")
+                # A lock reported by the probe is not transient: go to the fallbacks quickly
+                max_retries = 1
+            
+            self._save_workbook_with_retry(self.wb, self.output, max_retries)
+            self.log(f"Excel file saved: {self.output}")
+            tracer.count('output bytes', self.output.stat().st_size)
+            
+        except PermissionError:
+            error_msg = f"Cannot save Excel file. Please close '{self.output.name}' if it's open in Excel."
+            logger.error(error_msg, exc_info=True)
+            raise ExcelProcessingError(error_msg)
+        finally:
+            timer_WMX.stop()
 
     def _cleanup(self) -> None:
         """Clean up resources"""
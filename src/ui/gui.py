@@ -1,15 +1,17 @@
 # -*- coding: UTF-8 -*-
-from typing import List, Optional
+import threading
+from typing import List, Optional, Tuple
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
     QTextEdit, QPushButton, QFileDialog, QMessageBox
 )
-from PyQt6.QtGui import QFont, QPainter, QLinearGradient, QColor
+from PyQt6.QtGui import QFont, QPainter, QColor
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QObject, QTimer, QRect
 
 from src.core.winmergexlsx import WinMergeXlsx
 from src.core.config import config
-from src.core.exceptions import ValidationError
+from src.core.exceptions import ValidationError, OperationCancelledError
+from src.core.cancellation import CancellationToken
 
 class DropLineEdit(QLineEdit):
     paths_dropped = pyqtSignal(list)
@@ -34,7 +36,7 @@ class DropLineEdit(QLineEdit):
         self.paths_dropped.emit(new_paths)
 
 
-class FadingProgressBar(QWidget):
+class ProgressBar(QWidget):
     def __init__(self) -> None:
         super().__init__()
         self._value = 0
@@ -65,41 +67,54 @@ class FadingProgressBar(QWidget):
         if self._is_complete:
             painter.fillRect(rect, QColor(0, 255, 0))
         else:
-            range_width = rect.width()
             percent = (self._value - self._minimum) / (self._maximum - self._minimum)
-            center_x = int(range_width * percent)
-
-            fade_width = int(range_width * 5 / (self._maximum - self._minimum))
-            left_x = max(0, center_x - fade_width)
-            right_x = min(range_width, center_x + fade_width)
-
-            gradient = QLinearGradient(left_x, 0, right_x, 0)
-            gradient.setColorAt(0.0, QColor(0, 255, 0, 0))
-            gradient.setColorAt(0.5, QColor(0, 255, 0, 255))
-            gradient.setColorAt(1.0, QColor(0, 255, 0, 0))
-
-            painter.fillRect(QRect(left_x, 0, right_x - left_x, rect.height()), gradient)
+            filled_width = int(rect.width() * min(max(percent, 0.0), 1.0))
+            painter.fillRect(QRect(0, 0, filled_width, rect.height()), QColor(0, 200, 0))
 
         painter.setPen(Qt.GlobalColor.black)
         painter.drawRect(rect)
 
 
 class Worker(QObject):
+    """
+    Runs a comparison in a worker thread
+
+    Log messages and progress are buffered instead of being sent as one
+    signal each; the GUI takes them in batches with take_updates() on a timer.
+    """
     finished = pyqtSignal()
-    log_signal = pyqtSignal(str)
     error_signal = pyqtSignal(str)
-    progress_signal = pyqtSignal(int)
 
     def __init__(self, base: str, latest: str, output: str) -> None:
         super().__init__()
         self.base = base
         self.latest = latest
         self.output = output
+        self.cancel_token = CancellationToken()
+        self._lock = threading.Lock()
+        self._messages: List[str] = []
+        self._progress: Optional[int] = None
 
     def emit_log(self, message: str, progress: Optional[int] = None) -> None:
-        self.log_signal.emit(message)
-        if progress is not None:
-            self.progress_signal.emit(progress)
+        with self._lock:
+            self._messages.append(message)
+            if progress is not None:
+                self._progress = progress
+
+    def set_progress(self, value: int) -> None:
+        with self._lock:
+            self._progress = value
+
+    def take_updates(self) -> Tuple[List[str], Optional[int]]:
+        """Take the buffered messages and the latest progress (called from the GUI thread)"""
+        with self._lock:
+            messages, progress = self._messages, self._progress
+            self._messages, self._progress = [], None
+        return messages, progress
+
+    def cancel(self) -> None:
+        """Request cancellation (safe to call from the GUI thread)"""
+        self.cancel_token.cancel()
 
     def run(self) -> None:
         from src.core.common import logger
@@ -110,12 +125,16 @@ class Worker(QObject):
 
             diff = WinMergeXlsx(
                 self.base, self.latest, self.output,
-                log_callback=log_callback
+                log_callback=log_callback,
+                progress_callback=self.set_progress,
+                cancel_token=self.cancel_token
             )
             diff.generate()
             # Use the actual output path (may have been changed if file was locked)
             actual_output = diff.output
             self.emit_log(f"Completed! Output: {actual_output.name}", 100)
+        except OperationCancelledError:
+            self.emit_log("Cancelled.")
         except Exception as e:
             error_msg = str(e)
             logger.error(f"Worker thread error: {error_msg}", exc_info=True)
@@ -142,9 +161,12 @@ class DiffApp(QWidget):
         """Initialize data structures"""
         self.base_paths: List[str] = []
         self.latest_paths: List[str] = []
-        self.animation_timer = QTimer()
-        self.animation_value = 0
         self.worker_thread = None
+        self.worker = None
+        # Polls the worker's buffered log messages and progress
+        self.update_timer = QTimer()
+        self.update_timer.setInterval(config.ui.log_flush_interval)
+        self.update_timer.timeout.connect(self.flush_worker_updates)
 
     def _init_ui(self) -> None:
         """Initialize user interface"""
@@ -162,11 +184,13 @@ class DiffApp(QWidget):
         self.log_text = QTextEdit()
         self.log_text.setReadOnly(True)
 
-        self.progress_bar = FadingProgressBar()
+        self.progress_bar = ProgressBar()
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setVisible(False)
 
         self.run_button = QPushButton("Run (Compare and Export to Excel)")
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.setEnabled(False)
 
     def setup_layout(self) -> None:
         layout = QVBoxLayout()
@@ -182,13 +206,17 @@ class DiffApp(QWidget):
         layout.addLayout(self.create_path_row("2 Comparison Target Folder", self.latest_input, self.browse_latest))
         layout.addLayout(self.create_path_row("3 Output File", self.output_input, self.browse_output))
 
-        layout.addWidget(self.run_button)
+        run_row = QHBoxLayout()
+        run_row.addWidget(self.run_button)
+        run_row.addWidget(self.cancel_button)
+        layout.addLayout(run_row)
         layout.addWidget(self.progress_bar)
         layout.addWidget(self.log_text)
         self.setLayout(layout)
 
     def setup_connections(self) -> None:
         self.run_button.clicked.connect(self.run_process)
+        self.cancel_button.clicked.connect(self.cancel_process)
         self.base_input.paths_dropped.connect(self.on_base_dropped)
         self.latest_input.paths_dropped.connect(self.on_latest_dropped)
 
@@ -220,6 +248,9 @@ class DiffApp(QWidget):
             QPushButton:hover {
                 background-color: #333;
             }
+            QPushButton:disabled {
+                background-color: #999;
+            }
         """)
 
     def create_path_row(self, label_text: str, line_edit: QLineEdit, browse_func) -> QHBoxLayout:
@@ -261,32 +292,19 @@ class DiffApp(QWidget):
         self.log_text.append(message)
 
     def update_progress(self, value: int) -> None:
-        self.stop_progress_animation()
         self.progress_bar.setValue(value)
         if value >= 100:
             self.progress_bar.setComplete()
 
-    def start_progress_animation(self) -> None:
-        """Start progress bar animation"""
-        if not self.animation_timer.isActive():
-            self.animation_value = 0
-            self.animation_timer.timeout.connect(self.animate_progress)
-            self.animation_timer.start(config.ui.progress_animation_interval)
-
-    def animate_progress(self) -> None:
-        """Animate progress bar"""
-        self.animation_value = (self.animation_value + config.ui.progress_animation_step) % 100
-        self.progress_bar.setValue(self.animation_value)
-
-    def stop_progress_animation(self) -> None:
-        """Stop progress bar animation safely"""
-        if self.animation_timer.isActive():
-            self.animation_timer.stop()
-        try:
-            self.animation_timer.timeout.disconnect(self.animate_progress)
-        except (TypeError, RuntimeError):
-            # Already disconnected or timer doesn't exist
-            pass
+    def flush_worker_updates(self) -> None:
+        """Show the log messages and progress the worker buffered since the last update"""
+        if self.worker is None:
+            return
+        messages, progress = self.worker.take_updates()
+        if messages:
+            self.log("\n".join(messages))
+        if progress is not None:
+            self.update_progress(progress)
 
     def run_process(self) -> None:
         """Run the diff comparison process"""
@@ -298,6 +316,13 @@ class DiffApp(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to start process: {str(e)}")
 
+    def cancel_process(self) -> None:
+        """Cancel the running comparison (the worker stops at the next file)"""
+        if self.worker_thread and self.worker_thread.isRunning():
+            self.log("Cancelling...")
+            self.cancel_button.setEnabled(False)
+            self.worker.cancel()
+
     def _validate_inputs(self) -> None:
         """Validate user inputs"""
         if not self.base_paths:
@@ -310,9 +335,9 @@ class DiffApp(QWidget):
     def _start_worker(self) -> None:
         """Start worker thread"""
         self.run_button.setEnabled(False)
+        self.cancel_button.setEnabled(True)
         self.progress_bar.setValue(0)
         self.progress_bar.setVisible(True)
-        self.start_progress_animation()
         self.log("Starting process...")
 
         self.worker_thread = QThread()
@@ -325,15 +350,15 @@ class DiffApp(QWidget):
 
         # Connect signals
         self.worker_thread.started.connect(self.worker.run)
-        self.worker.log_signal.connect(self.log)
-        self.worker.progress_signal.connect(self.update_progress)
         self.worker.error_signal.connect(self._handle_error)
         self.worker.finished.connect(self._cleanup_worker)
 
+        self.update_timer.start()
         self.worker_thread.start()
 
     def _handle_error(self, error_msg: str) -> None:
         """Handle worker error"""
+        self.flush_worker_updates()
         # Check if it's a permission error and provide helpful message
         if "Permission denied" in error_msg or "close" in error_msg.lower():
             detailed_msg = (
@@ -350,8 +375,9 @@ class DiffApp(QWidget):
 
     def _cleanup_worker(self) -> None:
         """Clean up worker thread"""
-        # Stop animation first (before thread cleanup)
-        self.stop_progress_animation()
+        # Show the last buffered messages before the updates stop
+        self.update_timer.stop()
+        self.flush_worker_updates()
         
         if self.worker_thread:
             self.worker_thread.quit()
@@ -359,17 +385,19 @@ class DiffApp(QWidget):
             self.worker_thread = None
         
         self.run_button.setEnabled(True)
+        self.cancel_button.setEnabled(False)
 
     def closeEvent(self, event) -> None:
         """Handle window close event"""
         from src.core.common import logger
         
-        # Stop any running animation
-        self.stop_progress_animation()
+        self.update_timer.stop()
         
         # Clean up worker thread if running
         if self.worker_thread and self.worker_thread.isRunning():
             logger.info("Stopping worker thread...")
+            # Stop the pipeline (and WinMerge) first so the thread can finish quickly
+            self.worker.cancel()
             self.worker_thread.quit()
             if not self.worker_thread.wait(3000):  # Wait max 3 seconds
                 logger.warning("Worker thread did not stop gracefully, terminating...")
@@ -0,0 +1,83 @@
+# -*- coding: UTF-8 -*-
+"""
+Tests for the windowed diffs of oversize files
+"""
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from src.core.classify import FileClassifier, GAP_TEXT
+from src.core.config import config
+from src.core.diffmodel import FileDiff
+from src.core.prescan import FilePair
+
+
+def make_diff(row_count, hunks):
+    """File diff of row_count rows whose rows in hunks are changed"""
+    changed = {index for start, end in hunks for index in range(start, end)}
+    file_diff = FileDiff(name='big.log')
+    for index in range(row_count):
+        right_text = f"new {index}" if index in changed else f"line {index}"
+        file_diff.append(index + 1, f"line {index}", index + 1, right_text, index in changed)
+    file_diff.hunks = list(hunks)
+    return file_diff
+
+
+class WindowTest(unittest.TestCase):
+
+    def texts(self, file_diff):
+        return [file_diff.row(index).left_text for index in range(len(file_diff))]
+
+    def test_rows_between_windows_become_one_gap(self):
+        windowed = FileClassifier.window(make_diff(20, [(5, 6), (15, 16)]), context=1, max_rows=100)
+        self.assertEqual(self.texts(windowed), [GAP_TEXT, 'line 4', 'line 5', 'line 6', GAP_TEXT,
+                                                'line 14', 'line 15', 'line 16', GAP_TEXT])
+
+    def test_truncated_diff_keeps_max_rows_including_the_gap(self):
+        windowed = FileClassifier.window(make_diff(50, [(0, 50)]), context=0, max_rows=10)
+        self.assertEqual(len(windowed), 10)
+        self.assertEqual(self.texts(windowed)[-2:], ['line 8', GAP_TEXT])
+
+    def test_diff_of_exactly_max_rows_is_not_truncated(self):
+        windowed = FileClassifier.window(make_diff(10, [(0, 10)]), context=0, max_rows=10)
+        self.assertEqual(self.texts(windowed), [f"line {index}" for index in range(10)])
+
+    def test_no_second_gap_after_a_gap_between_windows(self):
+        windowed = FileClassifier.window(make_diff(20, [(2, 3), (10, 12)]), context=0, max_rows=3)
+        self.assertEqual(self.texts(windowed), [GAP_TEXT, 'line 2', GAP_TEXT])
+
+
+
+class WindowedDiffTest(unittest.TestCase):
+
+    def test_large_file_builds_only_the_windowed_rows(self):
+        lines = [f"line {index}" for index in range(200000)]
+        with tempfile.TemporaryDirectory() as tmp:
+            left, right = Path(tmp) / 'left.log', Path(tmp) / 'right.log'
+            left.write_text('\n'.join(lines), encoding='utf-8')
+            lines[100000] = 'changed'
+            right.write_text('\n'.join(lines), encoding='utf-8')
+
+            appended = []
+            append = FileDiff.append
+
+            def counting_append(file_diff, *args, **kwargs):
+                appended.append(file_diff)
+                return append(file_diff, *args, **kwargs)
+
+            with mock.patch.object(FileDiff, 'append', counting_append):
+                entry, windowed = FileClassifier.windowed_diff(FilePair('big.log', left, right))
+
+        context = config.classify.window_lines
+        self.assertEqual(entry.result, 'Text files are different')
+        # Gap, context, the changed row, context, gap: no other FileDiff got a row
+        self.assertEqual(len(windowed), 2 * context + 3)
+        self.assertEqual(len(appended), len(windowed))
+        self.assertTrue(all(file_diff is windowed for file_diff in appended))
+        self.assertEqual(windowed.row(context + 1).right_text, 'changed')
+        self.assertEqual(windowed.hunks, [(context + 1, context + 2)])
+
+
+if __name__ == '__main__':
+    unittest.main()
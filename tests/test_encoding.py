@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+"""
+Tests for encoding detection of compared files and WinMerge reports
+"""
+import codecs
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.converters.html_to_excel import HTMLToExcelConverter, READ_CHUNK_SIZE
+from src.core.common import BoundedCache
+from src.core.diffbackend import NativeBackend
+from src.core.prescan import FilePair
+
+
+class BoundedCacheTest(unittest.TestCase):
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = BoundedCache(2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        cache.get('a')
+        cache.put('c', 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+
+
+class EncodingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_utf16_files_are_diffed_as_text(self):
+        (self.root / 'a').mkdir()
+        (self.root / 'b').mkdir()
+        left, right = self.root / 'a' / 'u.txt', self.root / 'b' / 'u.txt'
+        left.write_bytes(codecs.BOM_UTF16_LE + '一\n二\n'.encode('utf-16-le'))
+        right.write_bytes(codecs.BOM_UTF16_LE + '一\n三\n'.encode('utf-16-le'))
+
+        entry, file_diff = NativeBackend.compare_pair(FilePair('u.txt', left, right))
+        self.assertEqual(entry.result, 'Text files are different')
+        self.assertEqual([file_diff.row(i).right_text for i in range(len(file_diff))], ['一', '三'])
+
+    def test_report_turning_cp932_after_the_first_chunk(self):
+        rows = ['<tr><th></th><th>L</th><th></th><th>R</th></tr>']
+        filler = 'x' * 200
+        line = 1
+        while sum(map(len, rows)) < READ_CHUNK_SIZE + 1000:
+            rows.append(f'<tr><td>{line}</td><td>{filler}</td><td>{line}</td><td>{filler}</td></tr>')
+            line += 1
+        rows.append(f'<tr><td>{line}</td><td>日本語</td><td>{line}</td><td>テキスト</td></tr>')
+        report = self.root / 'report.html'
+        report.write_bytes(f"<html><body><table>{''.join(rows)}</table></body></html>".encode('cp932'))
+
+        file_diff = HTMLToExcelConverter().parse_diff_html(report, 'report.txt')
+        last = file_diff.row(len(file_diff) - 1)
+        self.assertEqual((last.left_text, last.right_text), ('日本語', 'テキスト'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+# -*- coding: UTF-8 -*-
+"""
+Tests for the process pool map used by the per-file stages
+"""
+import time
+import unittest
+
+from src.core.config import config
+from src.core.parallel import parallel_map, IN_FLIGHT_PER_WORKER
+
+
+def _square(n):
+    # Early items finish last, so results arrive out of order
+    time.sleep(0.001 * (20 - n % 20))
+    return n * n
+
+
+def _fail_on_three(n):
+    if n == 3:
+        raise ValueError(n)
+    return n
+
+
+class ParallelMapTest(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = config.parallel.min_items
+        config.parallel.min_items = 1
+
+    def tearDown(self):
+        config.parallel.min_items = self._saved
+
+    def test_results_in_input_order_beyond_the_window(self):
+        items = list(range(2 * IN_FLIGHT_PER_WORKER * 2 + 5))
+        self.assertEqual(list(parallel_map(_square, items, workers=2)), [n * n for n in items])
+
+    def test_worker_error_is_raised(self):
+        with self.assertRaises(ValueError):
+            list(parallel_map(_fail_on_three, list(range(40)), workers=2))
+
+
+if __name__ == '__main__':
+    unittest.main()
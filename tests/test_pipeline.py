@@ -0,0 +1,66 @@
+# -*- coding: UTF-8 -*-
+"""
+Tests for the bounded hand-off between pipelined stages
+"""
+import threading
+import unittest
+
+from src.core.cancellation import CancellationToken
+from src.core.pipeline import PipelineQueue
+
+
+class PipelineQueueTest(unittest.TestCase):
+
+    def consume(self, hand_off: PipelineQueue, timeout: float = 3.0):
+        """Iterate hand_off in a thread; return (items, error, finished in time)"""
+        items, errors = [], []
+
+        def run():
+            try:
+                items.extend(hand_off)
+            except BaseException as e:
+                errors.append(e)
+
+        consumer = threading.Thread(target=run, daemon=True)
+        consumer.start()
+        consumer.join(timeout)
+        return items, errors[0] if errors else None, not consumer.is_alive()
+
+    def test_items_then_end(self):
+        hand_off = PipelineQueue(4, CancellationToken())
+        for item in range(3):
+            hand_off.put(item)
+        hand_off.close()
+
+        items, error, finished = self.consume(hand_off)
+        self.assertTrue(finished)
+        self.assertEqual(items, [0, 1, 2])
+        self.assertIsNone(error)
+
+    def test_producer_error_is_raised_after_queued_items(self):
+        hand_off = PipelineQueue(4, CancellationToken())
+        hand_off.put('a')
+        hand_off.close(RuntimeError('WinMerge failed'))
+
+        items, error, finished = self.consume(hand_off)
+        self.assertTrue(finished)
+        self.assertEqual(items, ['a'])
+        self.assertIsInstance(error, RuntimeError)
+
+    def test_close_with_full_queue_after_cancel_does_not_hang(self):
+        token = CancellationToken()
+        hand_off = PipelineQueue(2, token)
+        hand_off.put(1)
+        hand_off.put(2)
+        token.cancel()
+        hand_off.close(RuntimeError('WinMerge failed'))
+
+        items, error, finished = self.consume(hand_off)
+        self.assertTrue(finished, "consumer blocked after the producer failed")
+        self.assertEqual(items, [1, 2])
+        self.assertIsInstance(error, RuntimeError)
+        self.assertEqual(str(error), 'WinMerge failed')
+
+
+if __name__ == '__main__':
+    unittest.main()
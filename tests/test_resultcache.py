@@ -0,0 +1,81 @@
+# -*- coding: UTF-8 -*-
+"""
+Tests for the options digest that keys the result cache
+"""
+import copy
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.core.config import config
+from src.core.resultcache import ResultCache
+from src.core.winmergexlsx import WinMergeXlsx
+
+
+class OptionsDigestTest(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = copy.deepcopy(config.winmerge)
+
+    def tearDown(self):
+        config.winmerge = self._saved
+
+    def test_scheduling_settings_keep_the_digest(self):
+        digest = ResultCache.options_digest()
+        config.winmerge.max_processes = 7
+        config.winmerge.min_subtree_bytes = 1
+        config.winmerge.timeout_base = 1.0
+        config.winmerge.timeout_per_mb = 1.0
+        config.winmerge.pipeline = not config.winmerge.pipeline
+        config.winmerge.pipeline_queue = 1
+        config.winmerge.report_poll_interval = 1.0
+        self.assertEqual(ResultCache.options_digest(), digest)
+
+    def test_result_settings_change_the_digest(self):
+        digest = ResultCache.options_digest()
+        config.winmerge.options = config.winmerge.options + ['/ignorews']
+        self.assertNotEqual(ResultCache.options_digest(), digest)
+        config.winmerge.options = self._saved.options
+        config.winmerge.backend = 'native'
+        self.assertNotEqual(ResultCache.options_digest(), digest)
+
+
+
+class CachedHeaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = (copy.deepcopy(config.winmerge), copy.deepcopy(config.cache), config.parallel.workers)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        config.winmerge.backend = 'native'
+        config.cache.enabled = True
+        config.cache.directory = str(self.root / 'cache')
+        config.parallel.workers = 1
+
+    def tearDown(self):
+        config.winmerge, config.cache, config.parallel.workers = self._saved
+        self.tmp.cleanup()
+
+    def run_drop(self, name):
+        """Compare a base/latest drop under root/name holding the same contents every time"""
+        for side, text in (('base', 'a\nb\n'), ('latest', 'a\nc\n')):
+            path = self.root / name / side / 'f.c'
+            path.parent.mkdir(parents=True)
+            path.write_text(text, encoding='utf-8')
+        xlsx = WinMergeXlsx(str(self.root / name / 'base'), str(self.root / name / 'latest'),
+                            str(self.root / name / 'out.xlsx'))
+        xlsx.generate()
+        return xlsx
+
+    def test_cache_hit_from_another_drop_shows_its_own_paths(self):
+        self.assertEqual(self.run_drop('drop1').cached, [])
+
+        xlsx = self.run_drop('drop2')
+        self.assertEqual(len(xlsx.cached), 1)
+        header = xlsx.cached[0][1].file_diff.header
+        self.assertEqual(header, ['', str(self.root / 'drop2' / 'base' / 'f.c'), '',
+                                  str(self.root / 'drop2' / 'latest' / 'f.c')])
+
+
+if __name__ == '__main__':
+    unittest.main()
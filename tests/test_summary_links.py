@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+"""
+Tests for the Summary sheet: entry order, folders and hyperlinks to the per-file sheets
+"""
+import tempfile
+import unittest
+from pathlib import Path
+
+from openpyxl import load_workbook
+
+from src.core.config import config
+from src.core.diffmodel import DiffResult, SummaryEntry
+from src.core.prescan import FilePair, IDENTICAL
+from src.core.winmergexlsx import WinMergeXlsx
+
+
+class SummaryLinksTest(unittest.TestCase):
+
+    def setUp(self):
+        self._saved = (config.winmerge.backend, config.parallel.workers)
+        config.winmerge.backend = 'native'
+        config.parallel.workers = 1
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        config.winmerge.backend, config.parallel.workers = self._saved
+        self.tmp.cleanup()
+
+    def write_tree(self, name, files):
+        for relative, text in files.items():
+            path = self.root / name / relative
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(text, encoding='utf-8')
+        return str(self.root / name)
+
+    def test_only_entries_with_a_sheet_are_linked(self):
+        base = self.write_tree('base', {
+            'changed.c': 'a\nb\n',
+            'same.c': 'x\n',
+            'gone.c': 'old\n',
+            'sub/changed.h': '1\n',
+        })
+        latest = self.write_tree('latest', {
+            'changed.c': 'a\nc\n',
+            'same.c': 'x\n',
+            'new.c': 'new\n',
+            'sub/changed.h': '2\n',
+        })
+        output = self.root / 'out.xlsx'
+        WinMergeXlsx(base, latest, str(output)).generate()
+
+        workbook = load_workbook(output)
+        summary = workbook['Summary']
+        links = {}
+        for row in summary.iter_rows(min_row=2):
+            name, result = row[0].value, row[2].value
+            links[name] = (result, row[0].hyperlink.target if row[0].hyperlink else None)
+            self.assertTrue(all(cell.hyperlink is None for cell in row[1:]))
+
+        for name in ('same.c', 'gone.c', 'new.c'):
+            self.assertIsNone(links[name][1], f"{name} ({links[name][0]}) has no sheet to link to")
+        for name in ('changed.c', 'changed.h'):
+            target = links[name][1]
+            self.assertIsNotNone(target, f"{name} is not linked")
+            self.assertIn(target.split('!')[0].strip("'"), workbook.sheetnames)
+
+    def test_report_and_scanned_entries_share_one_folder_separator(self):
+        base = self.write_tree('base', {'a/b/changed.c': '1\n', 'a/b/same.c': 'x\n', 'a/c/same.c': 'y\n'})
+        latest = self.write_tree('latest', {'a/b/changed.c': '2\n', 'a/b/same.c': 'x\n', 'a/c/same.c': 'y\n'})
+        xlsx = WinMergeXlsx(base, latest, str(self.root / 'out.xlsx'))
+        # Changed entry as parsed from a WinMerge report, identical ones from the pre-scan
+        xlsx.result = DiffResult()
+        xlsx.result.summary.entries.append(SummaryEntry(cells=['changed.c', 'a\\b', 'Text files are different']))
+        xlsx.identical = [FilePair(key, Path(base, key), Path(latest, key), status=IDENTICAL)
+                          for key in ('a/c/same.c', 'a/b/same.c')]
+        xlsx.cached, xlsx.classified = [], []
+
+        xlsx._finalize_summary()
+        self.assertEqual([(entry.folder, entry.name) for entry in xlsx.result.summary.entries],
+                         [('a\\b', 'changed.c'), ('a\\b', 'same.c'), ('a\\c', 'same.c')])
+
+
+if __name__ == '__main__':
+    unittest.main()